@@ -0,0 +1,301 @@
+import logging
+import math
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from flask import g, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from sqlalchemy.pool import QueuePool
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# Route classes from most to least important. Each class sheds once the load
+# factor (the worst of in-flight, queue delay and DB pool use, relative to
+# their limits) reaches its threshold, so browsing backs off well before
+# checkout does. rate/burst define the token bucket per caller.
+ROUTE_CLASSES = {
+    'checkout': {'shed_at': 1.0, 'rate': 1.0, 'burst': 10, 'key': 'user'},
+    'auth': {'shed_at': 0.9, 'rate': 0.2, 'burst': 10, 'key': 'ip'},
+    'cart': {'shed_at': 0.8, 'rate': 5.0, 'burst': 30, 'key': 'user'},
+    'admin': {'shed_at': 0.8, 'rate': 2.0, 'burst': 10, 'key': 'user'},
+    'browse': {'shed_at': 0.6, 'rate': 10.0, 'burst': 60, 'key': 'user'},
+    # Long-lived SSE connections: limit reconnect storms, never count as in-flight work
+    'stream': {'shed_at': 0.6, 'rate': 0.5, 'burst': 5, 'key': 'user', 'inflight': False},
+}
+
+ENDPOINT_CLASSES = {
+    'catalog.product_stream': 'stream',
+    # Stripe signs its webhook calls and retries on any failure; None exempts
+    'payments.stripe_webhook': None,
+}
+
+BLUEPRINT_CLASSES = {
+    'payments': 'checkout',
+    'auth': 'auth',
+    'cart': 'cart',
+    'catalog': 'browse',
+    'orders': 'browse',
+}
+
+# Never limited: health checks and the SPA bundle
+EXEMPT_BLUEPRINTS = {'system'}
+
+SHED_RETRY_AFTER = int(os.environ.get('ADMISSION_SHED_RETRY_AFTER', 2))
+
+
+def _load_overrides():
+    """Apply RATE_LIMIT_<CLASS>=<rate>:<burst> environment overrides"""
+    for name, spec in ROUTE_CLASSES.items():
+        value = os.environ.get(f'RATE_LIMIT_{name.upper()}')
+        if not value:
+            continue
+        try:
+            rate, burst = value.split(':')
+            spec['rate'], spec['burst'] = float(rate), int(burst)
+        except ValueError:
+            logger.warning(f"Ignoring malformed RATE_LIMIT_{name.upper()}={value!r}")
+
+
+_load_overrides()
+
+
+class SQLiteBucketStore:
+    """Token buckets in a local SQLite file shared by every worker on the host.
+
+    Each take is one short ``BEGIN IMMEDIATE`` transaction. Connections are
+    opened per thread after fork, and a locked or broken file fails open so
+    the limiter can never take the site down. Waiting out a lock blocks the
+    whole process, so this store suits sync workers; under gevent it is only
+    a fallback and is built with no busy timeout (see get_bucket_store).
+    """
+
+    def __init__(self, path, busy_timeout=0.05):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS buckets '
+                '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def take(self, key, rate, burst, cost=1):
+        """Spend ``cost`` tokens; returns ``(allowed, retry_after_seconds)``"""
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute(
+                'INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+                (key, tokens, now)
+            )
+            # Buckets idle long enough to be full again carry no state
+            if random.random() < 0.001:
+                conn.execute('DELETE FROM buckets WHERE updated < ?', (now - 3600,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+
+class RedisBucketStore:
+    """Token buckets in Redis, updated atomically by a Lua script"""
+
+    SCRIPT = """
+        local rate = tonumber(ARGV[1])
+        local burst = tonumber(ARGV[2])
+        local now = tonumber(ARGV[3])
+        local cost = tonumber(ARGV[4])
+        local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+        local tokens = tonumber(state[1]) or burst
+        local updated = tonumber(state[2]) or now
+        tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+        local allowed = 0
+        if tokens >= cost then
+            tokens = tokens - cost
+            allowed = 1
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+        redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+        return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._script = client.register_script(self.SCRIPT)
+
+    def take(self, key, rate, burst, cost=1):
+        allowed, tokens = self._script(keys=[f'ratelimit:{key}'], args=[rate, burst, time.time(), cost])
+        if allowed:
+            return True, 0.0
+        return False, (cost - float(tokens)) / rate
+
+
+class AdmissionController:
+    """Per-class token-bucket rate limits plus priority-based load shedding"""
+
+    def __init__(self, store, max_inflight, max_queue_ms):
+        self.store = store
+        self.max_inflight = max_inflight
+        self.max_queue_ms = max_queue_ms
+        self._inflight = 0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        with self._lock:
+            self._inflight += 1
+
+    def leave(self):
+        with self._lock:
+            self._inflight -= 1
+
+    def load_factor(self):
+        """Worst of in-flight requests, router queue delay and DB pool use, each as a share of its limit"""
+        factors = [self._inflight / self.max_inflight if self.max_inflight else 0.0]
+
+        # Heroku's router stamps X-Request-Start (ms since epoch) when the request arrives
+        started = request.headers.get('X-Request-Start', '').removeprefix('t=')
+        if started.isdigit() and self.max_queue_ms:
+            factors.append((time.time() * 1000 - int(started)) / self.max_queue_ms)
+
+        pool = _db_pool()
+        if pool is not None:
+            capacity = pool.size() + max(getattr(pool, '_max_overflow', 0), 0)
+            if capacity:
+                factors.append(pool.checkedout() / capacity)
+        return max(factors)
+
+    def check(self, route_class, client_key):
+        """Return a rejection response, or None to admit the request"""
+        spec = ROUTE_CLASSES[route_class]
+
+        if self.load_factor() >= spec['shed_at']:
+            logger.warning(f"Shedding {route_class} request {request.method} {request.path}")
+            return _reject(503, 'Server is busy, please retry shortly', SHED_RETRY_AFTER)
+
+        try:
+            allowed, retry_after = self.store.take(f'{route_class}:{client_key}', spec['rate'], spec['burst'])
+        except Exception as e:
+            logger.error(f"Rate limit store unavailable, admitting request: {e}")
+            return None
+        if not allowed:
+            return _reject(429, 'Too many requests', retry_after)
+        return None
+
+
+def _db_pool():
+    """The engine's QueuePool, or None for pools without a fixed size"""
+    pool = db.engine.pool
+    return pool if isinstance(pool, QueuePool) else None
+
+
+def _reject(status, message, retry_after):
+    response = jsonify({'error': message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def classify(req):
+    """Route class for a request, or None when it is exempt"""
+    if req.method == 'OPTIONS' or req.blueprint in EXEMPT_BLUEPRINTS:
+        return None
+    if req.endpoint in ENDPOINT_CLASSES:
+        return ENDPOINT_CLASSES[req.endpoint]
+    if '/admin/' in req.path or (req.blueprint == 'catalog' and req.method != 'GET'):
+        return 'admin'
+    return BLUEPRINT_CLASSES.get(req.blueprint, 'browse')
+
+
+def client_key(key_type):
+    """Identify the caller by user ID when a valid JWT is present, by IP otherwise"""
+    if key_type == 'user':
+        try:
+            verify_jwt_in_request(optional=True)
+            identity = get_jwt_identity()
+        except Exception:
+            identity = None
+        if identity:
+            return f'user:{identity}'
+    return f'ip:{request.remote_addr or "unknown"}'
+
+
+def _gevent_patched():
+    """Whether gevent has monkey-patched this process (see gunicorn.conf.py)"""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+
+def get_bucket_store():
+    """Redis when RATE_LIMIT_REDIS_URL is set, otherwise a SQLite file shared by local workers.
+
+    Under gevent a SQLite lock wait would stall every greenlet in the worker,
+    so REDIS_URL is used when RATE_LIMIT_REDIS_URL is not set. Without either,
+    the SQLite store never waits: a contended take fails open.
+    """
+    gevent = _gevent_patched()
+    redis_url = os.environ.get('RATE_LIMIT_REDIS_URL') or (os.environ.get('REDIS_URL') if gevent else None)
+    if redis_url:
+        import redis
+        return RedisBucketStore(redis.Redis.from_url(redis_url))
+    path = os.environ.get('RATE_LIMIT_STORE_PATH', os.path.join(tempfile.gettempdir(), 'shopping-ratelimit.db'))
+    if gevent:
+        logger.warning("No Redis for rate limits under gevent; SQLite buckets fail open when contended.")
+        return SQLiteBucketStore(path, busy_timeout=0)
+    return SQLiteBucketStore(path)
+
+
+def init_app(app):
+    """Install admission control as the first before_request hook"""
+    if not app.config['RATE_LIMITS_ENABLED']:
+        return
+
+    controller = AdmissionController(
+        get_bucket_store(),
+        max_inflight=app.config['ADMISSION_MAX_INFLIGHT'],
+        max_queue_ms=app.config['ADMISSION_MAX_QUEUE_MS']
+    )
+    app.extensions['admission'] = controller
+
+    @app.before_request
+    def admit_request():
+        route_class = classify(request)
+        if route_class is None:
+            return None
+        rejection = controller.check(route_class, client_key(ROUTE_CLASSES[route_class]['key']))
+        if rejection is not None:
+            return rejection
+        if ROUTE_CLASSES[route_class].get('inflight', True):
+            controller.enter()
+            g.admitted = True
+        return None
+
+    @app.teardown_request
+    def release_request(exc):
+        if g.pop('admitted', False):
+            controller.leave()
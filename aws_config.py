@@ -1,10 +1,97 @@
 import boto3
 import os
+import threading
+import time
+from collections import OrderedDict
+from botocore.config import Config
 from botocore.exceptions import ClientError, NoCredentialsError
 import logging
 
 logger = logging.getLogger(__name__)
 
+# One client per region/endpoint for the whole process: boto3 clients are
+# thread-safe, and sharing one keeps a single warm connection pool
+S3_MAX_POOL_CONNECTIONS = int(os.environ.get('S3_MAX_POOL_CONNECTIONS', 50))
+S3_CONNECT_TIMEOUT = float(os.environ.get('S3_CONNECT_TIMEOUT', 2))
+S3_READ_TIMEOUT = float(os.environ.get('S3_READ_TIMEOUT', 10))
+# Set for S3-compatible stores (MinIO, LocalStack) in development
+S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')
+
+S3_PRESIGN_CACHE_SIZE = int(os.environ.get('S3_PRESIGN_CACHE_SIZE', 10000))
+# A cached URL is re-signed once less than this share of its lifetime is left,
+# so clients never receive a link that is about to expire
+S3_PRESIGN_REFRESH_FRACTION = float(os.environ.get('S3_PRESIGN_REFRESH_FRACTION', 0.25))
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_s3_client(region_name=None, endpoint_url=None):
+    """Shared S3 client for a region, created on first use"""
+    region_name = region_name or os.environ.get('AWS_REGION', 'us-east-1')
+    endpoint_url = endpoint_url or S3_ENDPOINT_URL
+    key = (region_name, endpoint_url)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                config = Config(
+                    max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                    connect_timeout=S3_CONNECT_TIMEOUT,
+                    read_timeout=S3_READ_TIMEOUT,
+                    retries={'max_attempts': 3, 'mode': 'standard'},
+                    signature_version='s3v4'
+                )
+                # boto3.client() goes through the default session, which is not
+                # thread-safe, so creation is serialized here
+                client = boto3.client('s3', region_name=region_name, endpoint_url=endpoint_url, config=config)
+                _clients[key] = client
+    return client
+
+
+class PresignedUrlCache:
+    """Thread-safe LRU of presigned URLs, keyed by bucket, object and lifetime.
+
+    Signing is local but costs an HMAC chain per URL; a catalog page of
+    private images would otherwise sign every image on every request.
+    """
+
+    def __init__(self, maxsize=S3_PRESIGN_CACHE_SIZE, refresh_fraction=S3_PRESIGN_REFRESH_FRACTION):
+        self.maxsize = maxsize
+        self.refresh_fraction = refresh_fraction
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Cached URL for ``(bucket, object_name, expiration)``, or None when missing or due for refresh"""
+        expiration = key[2]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            url, expires_at = entry
+            if expires_at - time.time() < expiration * self.refresh_fraction:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return url
+
+    def put(self, key, url, signed_at):
+        with self._lock:
+            self._entries[key] = (url, signed_at + key[2])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+presigned_url_cache = PresignedUrlCache()
+
+
 class S3Manager:
     """S3 utility class for image storage"""
     
@@ -13,12 +100,10 @@ class S3Manager:
         self.region_name = region_name or os.environ.get('AWS_REGION', 'us-east-1')
         
         try:
-            self.client = boto3.client('s3', region_name=self.region_name)
-            self.s3_resource = boto3.resource('s3', region_name=self.region_name)
+            self.client = get_s3_client(self.region_name)
         except NoCredentialsError:
             logger.warning("AWS credentials not found. S3 will not be available.")
             self.client = None
-            self.s3_resource = None
     
     def upload_file(self, file_obj, object_name, content_type=None):
         """Upload a file to S3"""
@@ -51,21 +136,50 @@ class S3Manager:
             logger.error(f"Error deleting file from S3: {e}")
             return False
     
+    def _sign(self, object_name, expiration):
+        signed_at = time.time()
+        url = self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket_name, 'Key': object_name},
+            ExpiresIn=expiration
+        )
+        presigned_url_cache.put((self.bucket_name, object_name, expiration), url, signed_at)
+        return url
+    
     def generate_presigned_url(self, object_name, expiration=3600):
-        """Generate a presigned URL for private files"""
+        """Generate a presigned URL for private files, reusing a cached one while it stays fresh"""
         if not self.client or not self.bucket_name:
             return None
             
+        cached = presigned_url_cache.get((self.bucket_name, object_name, expiration))
+        if cached is not None:
+            return cached
         try:
-            response = self.client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': self.bucket_name, 'Key': object_name},
-                ExpiresIn=expiration
-            )
-            return response
+            return self._sign(object_name, expiration)
         except ClientError as e:
             logger.error(f"Error generating presigned URL: {e}")
             return None
+    
+    def generate_presigned_urls(self, object_names, expiration=3600):
+        """Presigned URLs for a list response, as ``{object_name: url}``; cache misses are signed in one pass"""
+        if not self.client or not self.bucket_name:
+            return {}
+            
+        urls = {}
+        missing = []
+        for object_name in dict.fromkeys(name for name in object_names if name):
+            cached = presigned_url_cache.get((self.bucket_name, object_name, expiration))
+            if cached is not None:
+                urls[object_name] = cached
+            else:
+                missing.append(object_name)
+                
+        for object_name in missing:
+            try:
+                urls[object_name] = self._sign(object_name, expiration)
+            except ClientError as e:
+                logger.error(f"Error generating presigned URL for {object_name}: {e}")
+        return urls
 
 def get_aws_config():
     """Get AWS configuration from environment or defaults"""
@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import func, select
+
+from cart_store import current_cart_store
+import categories
+from database import db
+from models import Product
+import product_feed
+
+# Products in the first catalog page of /v1/bootstrap; the SPA loads the
+# rest with /v1/products once the page is interactive
+BOOTSTRAP_PAGE_SIZE = int(os.environ.get('BOOTSTRAP_PAGE_SIZE', 24))
+# How long a worker reuses the catalog page and category facets. Staleness
+# is bounded: the page carries the change-feed ID it was read at, so the
+# SPA's SSE subscription replays any stock/price change made since.
+BOOTSTRAP_CACHE_SECONDS = float(os.environ.get('BOOTSTRAP_CACHE_SECONDS', 15))
+BOOTSTRAP_CACHE_SIZE = int(os.environ.get('BOOTSTRAP_CACHE_SIZE', 256))
+
+
+class TTLCache:
+    """Thread-safe per-worker LRU whose entries expire after ``ttl`` seconds"""
+
+    def __init__(self, ttl=BOOTSTRAP_CACHE_SECONDS, maxsize=BOOTSTRAP_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+storefront_cache = TTLCache()
+
+
+def _cached(key, load):
+    if storefront_cache.ttl <= 0:
+        return load()
+    value = storefront_cache.get(key)
+    if value is None:
+        value = load()
+        storefront_cache.put(key, value)
+    return value
+
+
+def category_facets():
+    """Active product count per category, e.g. ``[{'name': 'Books', 'count': 12}]``.
+
+    Counts cover whole subtrees, so "Electronics" includes "Electronics > Audio".
+    """
+    def flatten(nodes):
+        for node in nodes:
+            if node['product_count']:
+                yield {'name': node['path'], 'count': node['product_count']}
+            yield from flatten(node['children'])
+
+    def load():
+        tree = categories.category_tree()
+        if tree:
+            return list(flatten(tree))
+        # Covered by idx_product_active_category_name
+        rows = db.session.execute(
+            select(Product.category, func.count())
+            .filter_by(is_active=True)
+            .where(Product.category.isnot(None))
+            .group_by(Product.category)
+            .order_by(Product.category)
+        ).all()
+        return [{'name': category, 'count': count} for category, count in rows]
+
+    return _cached(('facets',), load)
+
+
+def catalog_page(category=None, limit=BOOTSTRAP_PAGE_SIZE):
+    """First page of active products by name, with the feed position it was read at"""
+    def load():
+        # Read the feed position first so no change after the snapshot is missed
+        last_event_id = product_feed.latest_id()
+        query = Product.query.filter_by(is_active=True)
+        if category:
+            query = categories.filter_by_category(query, category)
+        products = query.order_by(Product.name).limit(limit + 1).all()
+        return {
+            'products': [product.to_dict() for product in products[:limit]],
+            'has_more': len(products) > limit,
+            'last_event_id': last_event_id
+        }
+
+    if category and categories.normalize_path(category) not in categories.category_ids() and \
+            category not in {facet['name'] for facet in category_facets()}:
+        # Unknown categories are empty; don't let arbitrary input fill the cache
+        return {'products': [], 'has_more': False, 'last_event_id': product_feed.latest_id()}
+    return _cached(('page', category, limit), load)
+
+
+def cart_summary(owner_id):
+    """Cart lines, total and item count for an owner; never cached"""
+    cart_items = current_cart_store().get_items(owner_id)
+    return {
+        'cart_items': [item.to_dict() for item in cart_items],
+        'cart_total': sum(item.total_price for item in cart_items),
+        'item_count': sum(item.quantity for item in cart_items)
+    }
@@ -0,0 +1,437 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import insert, update
+from sqlalchemy.orm import joinedload
+
+from database import db
+from models import CartItem, Product
+
+logger = logging.getLogger(__name__)
+
+GUEST_PREFIX = 'guest:'
+DIRTY_SET_KEY = 'cart:dirty'
+LOADED_FIELD = '_loaded'
+
+
+def is_guest_owner(owner_id):
+    """Check if a cart owner is an anonymous guest"""
+    return owner_id.startswith(GUEST_PREFIX)
+
+
+class CartStore:
+    """Base interface for cart storage backends.
+
+    Owners are user IDs, or ``guest:<token>`` for anonymous carts. Changes are
+    expressed as ``{product_id: quantity}`` where a quantity of 0 removes the
+    line. Backends never commit; the calling route owns the transaction.
+    """
+
+    supports_guests = False
+
+    def get_quantities(self, owner_id):
+        """Return ``{product_id: quantity}`` for the owner's cart"""
+        raise NotImplementedError
+
+    def get_items(self, owner_id, product_ids=None):
+        """Return cart lines exposing ``to_dict()`` and ``total_price``"""
+        raise NotImplementedError
+
+    def apply(self, owner_id, changes):
+        """Set final quantities for the given products"""
+        raise NotImplementedError
+
+    def clear(self, owner_id):
+        """Remove every line from the owner's cart"""
+        raise NotImplementedError
+
+    def flush(self, owner_id):
+        """Persist the owner's cart to the cart_items table"""
+
+    def merge(self, source_owner_id, target_owner_id):
+        """Add the source cart's quantities into the target cart and drop the source"""
+        source = self.get_quantities(source_owner_id)
+        if not source:
+            return
+        target = self.get_quantities(target_owner_id)
+        self.apply(target_owner_id, {
+            product_id: target.get(product_id, 0) + quantity
+            for product_id, quantity in source.items()
+        })
+        self.clear(source_owner_id)
+
+
+class SQLAlchemyCartStore(CartStore):
+    """Cart storage backed directly by the cart_items table"""
+
+    def get_quantities(self, owner_id):
+        rows = db.session.query(CartItem.product_id, CartItem.quantity).filter(
+            CartItem.user_id == owner_id
+        ).all()
+        return {product_id: quantity for product_id, quantity in rows}
+
+    def get_items(self, owner_id, product_ids=None):
+        query = CartItem.query.options(joinedload(CartItem.product)).filter(
+            CartItem.user_id == owner_id
+        )
+        if product_ids is not None:
+            query = query.filter(CartItem.product_id.in_(product_ids))
+        return query.all()
+
+    def apply(self, owner_id, changes):
+        if not changes:
+            return
+
+        existing = {
+            product_id: (item_id, quantity)
+            for item_id, product_id, quantity in db.session.query(
+                CartItem.id, CartItem.product_id, CartItem.quantity
+            ).filter(
+                CartItem.user_id == owner_id,
+                CartItem.product_id.in_(list(changes))
+            ).all()
+        }
+
+        # Bulk statements: one INSERT, one UPDATE and one DELETE at most
+        now = datetime.utcnow()
+        to_insert = []
+        to_update = []
+        to_delete = []
+        for product_id, quantity in changes.items():
+            current = existing.get(product_id)
+            if quantity <= 0:
+                if current:
+                    to_delete.append(product_id)
+            elif current is None:
+                to_insert.append({
+                    'user_id': owner_id,
+                    'product_id': product_id,
+                    'quantity': quantity
+                })
+            elif current[1] != quantity:
+                to_update.append({'id': current[0], 'quantity': quantity, 'updated_at': now})
+
+        if to_insert:
+            db.session.execute(insert(CartItem), to_insert)
+        if to_update:
+            db.session.execute(update(CartItem), to_update)
+        if to_delete:
+            CartItem.query.filter(
+                CartItem.user_id == owner_id,
+                CartItem.product_id.in_(to_delete)
+            ).delete(synchronize_session=False)
+
+    def clear(self, owner_id):
+        CartItem.query.filter_by(user_id=owner_id).delete(synchronize_session=False)
+
+
+class CartLine:
+    """Cart line held outside the database, serialized like CartItem"""
+
+    def __init__(self, product, quantity, added_at, updated_at):
+        self.id = product.id
+        self.product_id = product.id
+        self.product = product
+        self.quantity = quantity
+        self.added_at = added_at
+        self.updated_at = updated_at
+
+    @property
+    def total_price(self):
+        """Calculate total price for this cart line"""
+        return float(self.product.price) * self.quantity
+
+    def to_dict(self):
+        """Convert cart line to dictionary for API responses"""
+        return {
+            'id': self.id,
+            'product_id': self.product_id,
+            'product_name': self.product.name,
+            'product_description': self.product.description,
+            'price': float(self.product.price),
+            'quantity': self.quantity,
+            'total': self.total_price,
+            'added_at': self.added_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'product': self.product.to_dict()
+        }
+
+
+class KVCartStore(CartStore):
+    """Cart storage in a Redis-protocol key-value store with write-behind persistence.
+
+    Each cart is a hash ``cart:<owner>`` of ``product_id -> JSON line``. User
+    carts are read through from cart_items on first access and marked dirty on
+    every change; ``flush`` and ``flush_dirty`` write them back. Guest carts
+    never touch the database and expire after ``guest_ttl`` seconds.
+    """
+
+    supports_guests = True
+
+    def __init__(self, client, sql_store=None, guest_ttl=7 * 24 * 3600):
+        self.client = client
+        self.sql_store = sql_store or SQLAlchemyCartStore()
+        self.guest_ttl = guest_ttl
+
+    @staticmethod
+    def _key(owner_id):
+        return f'cart:{owner_id}'
+
+    def _load(self, owner_id):
+        """Return ``{product_id: line}`` decoded from the store, reading through on a miss"""
+        raw = self.client.hgetall(self._key(owner_id))
+        if not raw and not is_guest_owner(owner_id):
+            raw = self._read_through(owner_id)
+        raw.pop(LOADED_FIELD, None)
+        return {product_id: json.loads(value) for product_id, value in raw.items()}
+
+    def _read_through(self, owner_id):
+        now = time.time()
+        raw = {LOADED_FIELD: '1'}
+        for product_id, quantity in self.sql_store.get_quantities(owner_id).items():
+            raw[product_id] = json.dumps({'q': quantity, 'a': now, 'u': now})
+        self.client.hset(self._key(owner_id), mapping=raw)
+        return raw
+
+    def get_quantities(self, owner_id):
+        return {product_id: line['q'] for product_id, line in self._load(owner_id).items()}
+
+    def get_items(self, owner_id, product_ids=None):
+        lines = self._load(owner_id)
+        if product_ids is not None:
+            lines = {product_id: line for product_id, line in lines.items() if product_id in product_ids}
+        if not lines:
+            return []
+
+        products = {
+            product.id: product
+            for product in Product.query.filter(Product.id.in_(list(lines))).all()
+        }
+        items = []
+        for product_id, line in lines.items():
+            product = products.get(product_id)
+            if product is None:
+                continue
+            items.append(CartLine(
+                product,
+                line['q'],
+                datetime.utcfromtimestamp(line['a']),
+                datetime.utcfromtimestamp(line['u'])
+            ))
+        items.sort(key=lambda item: item.added_at)
+        return items
+
+    def apply(self, owner_id, changes):
+        if not changes:
+            return
+        self._update(owner_id, lambda quantities: changes)
+
+    def merge(self, source_owner_id, target_owner_id):
+        source = self.get_quantities(source_owner_id)
+        if not source:
+            return
+        # Summed against the target as it is at write time, not at read time
+        self._update(target_owner_id, lambda target: {
+            product_id: target.get(product_id, 0) + quantity
+            for product_id, quantity in source.items()
+        })
+        self.clear(source_owner_id)
+
+    def _update(self, owner_id, compute):
+        """Apply ``compute(current_quantities)`` to the cart in one WATCH/MULTI transaction.
+
+        The hash is re-read and the changes recomputed whenever another
+        writer touches the cart between the read and EXEC, so concurrent
+        changes to the same cart are never lost.
+        """
+        key = self._key(owner_id)
+        # Read through before watching, so the transaction only sees a loaded cart
+        self._load(owner_id)
+
+        def transaction(pipe):
+            raw = pipe.hgetall(key)
+            raw.pop(LOADED_FIELD, None)
+            lines = {product_id: json.loads(value) for product_id, value in raw.items()}
+            changes = compute({product_id: line['q'] for product_id, line in lines.items()})
+
+            now = time.time()
+            to_set = {}
+            to_delete = []
+            for product_id, quantity in changes.items():
+                if quantity <= 0:
+                    if product_id in lines:
+                        to_delete.append(product_id)
+                    continue
+                line = lines.get(product_id)
+                added_at = line['a'] if line else now
+                to_set[product_id] = json.dumps({'q': quantity, 'a': added_at, 'u': now})
+
+            pipe.multi()
+            if to_set:
+                pipe.hset(key, mapping=to_set)
+            if to_delete:
+                pipe.hdel(key, *to_delete)
+            self._touch(pipe, owner_id)
+
+        self.client.transaction(transaction, key)
+
+    def clear(self, owner_id):
+        key = self._key(owner_id)
+        self.client.delete(key)
+        if is_guest_owner(owner_id):
+            return
+        # Keep the loaded marker so the next read does not fall back to SQL
+        self.client.hset(key, mapping={LOADED_FIELD: '1'})
+        self.sql_store.clear(owner_id)
+        self.client.srem(DIRTY_SET_KEY, owner_id)
+
+    def _touch(self, client, owner_id):
+        if is_guest_owner(owner_id):
+            client.expire(self._key(owner_id), self.guest_ttl)
+        else:
+            client.sadd(DIRTY_SET_KEY, owner_id)
+
+    def flush(self, owner_id):
+        if is_guest_owner(owner_id):
+            return
+        # Clear the dirty flag first so a concurrent change re-marks the cart
+        self.client.srem(DIRTY_SET_KEY, owner_id)
+        target = self.get_quantities(owner_id)
+        current = self.sql_store.get_quantities(owner_id)
+        changes = {product_id: 0 for product_id in current if product_id not in target}
+        changes.update({
+            product_id: quantity
+            for product_id, quantity in target.items()
+            if current.get(product_id) != quantity
+        })
+        self.sql_store.apply(owner_id, changes)
+
+    def flush_dirty(self, batch_size=100):
+        """Write back up to ``batch_size`` dirty carts; returns the number flushed"""
+        owners = self.client.spop(DIRTY_SET_KEY, batch_size) or []
+        flushed = 0
+        for owner_id in owners:
+            try:
+                self.flush(owner_id)
+                db.session.commit()
+                flushed += 1
+            except Exception as e:
+                logger.error(f"Cart write-behind failed for {owner_id}: {e}")
+                db.session.rollback()
+                self.client.sadd(DIRTY_SET_KEY, owner_id)
+        return flushed
+
+
+class InMemoryKV:
+    """Thread-safe in-process stand-in for the subset of the Redis API used by KVCartStore"""
+
+    def __init__(self):
+        self._data = {}
+        self._expiry = {}
+        # Reentrant so a transaction can call the other methods while holding it
+        self._lock = threading.RLock()
+
+    def transaction(self, func, *watches):
+        """Run ``func`` with this store as the pipeline; the lock stands in for WATCH/MULTI"""
+        with self._lock:
+            func(self)
+            return []
+
+    def multi(self):
+        """Nothing to queue: commands inside a transaction run immediately under the lock"""
+
+    def _get(self, name, default=None):
+        deadline = self._expiry.get(name)
+        if deadline is not None and deadline <= time.time():
+            self._data.pop(name, None)
+            self._expiry.pop(name, None)
+        return self._data.get(name, default)
+
+    def hgetall(self, name):
+        with self._lock:
+            return dict(self._get(name, {}))
+
+    def hset(self, name, mapping):
+        with self._lock:
+            value = self._get(name)
+            if value is None:
+                value = self._data[name] = {}
+            value.update({field: str(item) for field, item in mapping.items()})
+            return len(mapping)
+
+    def hdel(self, name, *fields):
+        with self._lock:
+            value = self._get(name, {})
+            removed = sum(1 for field in fields if value.pop(field, None) is not None)
+            if not value:
+                self._data.pop(name, None)
+            return removed
+
+    def delete(self, *names):
+        with self._lock:
+            removed = 0
+            for name in names:
+                self._expiry.pop(name, None)
+                if self._data.pop(name, None) is not None:
+                    removed += 1
+            return removed
+
+    def expire(self, name, seconds):
+        with self._lock:
+            if self._get(name) is None:
+                return False
+            self._expiry[name] = time.time() + seconds
+            return True
+
+    def sadd(self, name, *values):
+        with self._lock:
+            members = self._get(name)
+            if members is None:
+                members = self._data[name] = set()
+            before = len(members)
+            members.update(values)
+            return len(members) - before
+
+    def srem(self, name, *values):
+        with self._lock:
+            members = self._get(name, set())
+            before = len(members)
+            members.difference_update(values)
+            return before - len(members)
+
+    def smembers(self, name):
+        with self._lock:
+            return set(self._get(name, set()))
+
+    def spop(self, name, count=None):
+        with self._lock:
+            members = self._get(name, set())
+            popped = [members.pop() for _ in range(min(count or 1, len(members)))]
+            return popped if count is not None else (popped[0] if popped else None)
+
+
+def get_cart_store():
+    """Build the cart store selected by CART_STORE ('sql' or 'kv')"""
+    backend = os.environ.get('CART_STORE', 'sql').lower()
+    if backend != 'kv':
+        return SQLAlchemyCartStore()
+
+    guest_ttl = int(os.environ.get('GUEST_CART_TTL', 7 * 24 * 3600))
+    redis_url = os.environ.get('REDIS_URL')
+    if not redis_url:
+        logger.warning("REDIS_URL not set. Using in-process cart store (not shared across workers).")
+        return KVCartStore(InMemoryKV(), guest_ttl=guest_ttl)
+
+    import redis
+    client = redis.Redis.from_url(redis_url, decode_responses=True)
+    return KVCartStore(client, guest_ttl=guest_ttl)
+
+
+def current_cart_store():
+    """Cart store configured on the current app"""
+    return current_app.extensions['cart_store']
@@ -0,0 +1,200 @@
+import logging
+import os
+import time
+
+from sqlalchemy import distinct, func, select
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from ids import new_id
+from models import Category, CategoryClosure, Product, ProductCategory
+
+logger = logging.getLogger(__name__)
+
+# Separator between levels of Product.category, e.g. "Electronics > Audio"
+CATEGORY_PATH_SEPARATOR = ' > '
+CATEGORY_SYNC_BATCH_SIZE = int(os.environ.get('CATEGORY_SYNC_BATCH_SIZE', 1000))
+# How long a worker reuses the path index and the tree; 0 disables the cache
+CATEGORY_CACHE_SECONDS = float(os.environ.get('CATEGORY_CACHE_SECONDS', 15))
+
+# name -> (value, expires_at); a fixed handful of keys, so it never grows
+_cache = {}
+
+
+def split_path(value):
+    """Category names from root to leaf; blank levels are dropped"""
+    return [part.strip() for part in (value or '').split(CATEGORY_PATH_SEPARATOR.strip()) if part.strip()]
+
+
+def normalize_path(value):
+    """Canonical spelling of a category path, or None when it names no category"""
+    return CATEGORY_PATH_SEPARATOR.join(split_path(value)) or None
+
+
+def _get_or_create(name, parent, ancestors):
+    """The child ``name`` of ``parent`` (None for a root), created with its closure rows if missing"""
+    path = name if parent is None else f'{parent.path}{CATEGORY_PATH_SEPARATOR}{name}'
+    category = Category.query.filter_by(path=path).first()
+    if category is not None:
+        return category
+
+    category = Category(
+        id=new_id(),
+        name=name,
+        parent_id=parent.id if parent else None,
+        path=path,
+        depth=len(ancestors)
+    )
+    try:
+        # Savepoint, so a concurrent insert of the same path only loses this node
+        with db.session.begin_nested():
+            db.session.add(category)
+            db.session.flush()
+            db.session.add_all(
+                [CategoryClosure(ancestor_id=category.id, descendant_id=category.id, depth=0)] + [
+                    CategoryClosure(ancestor_id=ancestor.id, descendant_id=category.id, depth=len(ancestors) - i)
+                    for i, ancestor in enumerate(ancestors)
+                ]
+            )
+    except IntegrityError:
+        category = Category.query.filter_by(path=path).one()
+    return category
+
+
+def ensure_path(value):
+    """The leaf category for a path, creating missing levels; None for a blank path"""
+    names = split_path(value)
+    # The full path is mirrored into Product.category and the sales rollups
+    if len(CATEGORY_PATH_SEPARATOR.join(names)) > Product.category.type.length:
+        raise ValueError(f'Category paths are limited to {Product.category.type.length} characters')
+
+    ancestors = []
+    category = None
+    for name in names:
+        category = _get_or_create(name, category, ancestors)
+        ancestors.append(category)
+    return category
+
+
+def _set_category(product, category):
+    """Mirror the leaf's path into Product.category, which listings and reports display"""
+    path = category.path if category else None
+    if product.category != path:
+        product.category = path
+    if product.id is None:
+        product.id = new_id()
+
+
+def link_product(product, value):
+    """Point a product at the category path ``value``, replacing its previous links"""
+    category = ensure_path(value)
+    _set_category(product, category)
+    ProductCategory.query.filter_by(product_id=product.id).delete(synchronize_session=False)
+    if category is not None:
+        db.session.add(ProductCategory(category_id=category.id, product_id=product.id))
+    return category
+
+
+def filter_subtree(query, category_id):
+    """Restrict a Product query to products linked anywhere under ``category_id``.
+
+    A correlated EXISTS rather than ``id IN (...)``, so products can be read
+    in index order (the storefront's name sort) with each one checked by two
+    key lookups: its categories, then the closure row linking one of them to
+    the ancestor.
+    """
+    in_subtree = select(ProductCategory.product_id).join(
+        CategoryClosure, CategoryClosure.descendant_id == ProductCategory.category_id
+    ).where(ProductCategory.product_id == Product.id, CategoryClosure.ancestor_id == category_id)
+    return query.filter(in_subtree.exists())
+
+
+def _cached(name, load):
+    entry = _cache.get(name)
+    if entry is not None and entry[1] > time.monotonic():
+        return entry[0]
+    value = load()
+    if CATEGORY_CACHE_SECONDS > 0:
+        _cache[name] = (value, time.monotonic() + CATEGORY_CACHE_SECONDS)
+    return value
+
+
+def clear_cache():
+    """Drop this worker's cached path index and tree, e.g. after adding products"""
+    _cache.clear()
+
+
+def category_ids():
+    """``{path: id}`` for every node of the tree"""
+    return _cached('ids', lambda: dict(db.session.execute(select(Category.path, Category.id)).all()))
+
+
+def category_tree():
+    """The tree with per-subtree product counts, as served by /v1/categories"""
+    return _cached('tree', build_tree)
+
+
+def filter_by_category(query, value):
+    """Restrict a Product query to the category path ``value`` and everything below it"""
+    category_id = category_ids().get(normalize_path(value))
+    if category_id is None:
+        # Not a node of the tree: keep the plain exact match
+        return query.filter_by(category=value)
+    return filter_subtree(query, category_id)
+
+
+def build_tree():
+    """The whole tree as nested dicts with the number of active products in each subtree"""
+    counts = dict(db.session.execute(
+        select(CategoryClosure.ancestor_id, func.count(distinct(ProductCategory.product_id)))
+        .join(ProductCategory, ProductCategory.category_id == CategoryClosure.descendant_id)
+        .join(Product, Product.id == ProductCategory.product_id)
+        .where(Product.is_active)
+        .group_by(CategoryClosure.ancestor_id)
+    ).all())
+
+    nodes = {}
+    roots = []
+    # Parents sort before their children by path
+    for category in Category.query.order_by(Category.path):
+        node = dict(category.to_dict(), product_count=counts.get(category.id, 0), children=[])
+        nodes[category.id] = node
+        parent = nodes.get(category.parent_id)
+        (parent['children'] if parent else roots).append(node)
+    return roots
+
+
+def sync_products(batch_size=CATEGORY_SYNC_BATCH_SIZE):
+    """Build the tree from every product's category path and relink products to their leaf.
+
+    Idempotent; run after deploying the category tables, or after editing
+    Product.category outside the API. Returns ``(products, categories)``.
+    """
+    leaves = {}
+    processed = 0
+    last_id = None
+    while True:
+        query = Product.query
+        if last_id is not None:
+            query = query.filter(Product.id > last_id)
+        products = query.order_by(Product.id).limit(batch_size).all()
+        if not products:
+            break
+
+        ProductCategory.query.filter(
+            ProductCategory.product_id.in_([product.id for product in products])
+        ).delete(synchronize_session=False)
+        for product in products:
+            path = normalize_path(product.category)
+            if path not in leaves:
+                leaves[path] = ensure_path(path)
+            _set_category(product, leaves[path])
+            if leaves[path] is not None:
+                db.session.add(ProductCategory(category_id=leaves[path].id, product_id=product.id))
+        db.session.commit()
+
+        processed += len(products)
+        last_id = products[-1].id
+        logger.info(f"Linked {processed} products to categories")
+
+    return processed, Category.query.count()
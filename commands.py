@@ -0,0 +1,175 @@
+import json
+import time
+from datetime import datetime, timedelta
+
+import click
+
+from cart_store import current_cart_store
+import categories
+from database import db
+from idempotency import purge_expired
+import maintenance
+from models import Order
+from order_export import EXPORT_FORMATS, generate_export
+import order_archive
+import outbox
+import product_feed
+import query_plans
+import recommendations
+from routes.helpers import parse_date_arg
+import sales_rollup
+import uuid_keys
+
+
+def register_commands(app):
+    """Register the flask CLI commands for database and background jobs"""
+    @app.cli.command()
+    def init_db_command():
+        """Initialize the database."""
+        db.create_all()
+        print('Initialized the database.')
+
+    @app.cli.command('flush-carts')
+    @click.option('--batch-size', default=500, help='Dirty carts to write back per batch.')
+    def flush_carts_command(batch_size):
+        """Write back dirty key-value carts to the cart_items table."""
+        store = current_cart_store()
+        if not hasattr(store, 'flush_dirty'):
+            print('Cart store is SQL-backed; nothing to flush.')
+            return
+        total = 0
+        while True:
+            flushed = store.flush_dirty(batch_size)
+            total += flushed
+            if flushed < batch_size:
+                break
+        print(f'Flushed {total} carts.')
+
+    @app.cli.command('purge-idempotency-keys')
+    @click.option('--batch-size', default=1000, help='Expired keys to delete per batch.')
+    def purge_idempotency_keys_command(batch_size):
+        """Delete expired Idempotency-Key records in batches."""
+        print(f'Purged {purge_expired(batch_size)} expired idempotency keys.')
+
+    @app.cli.command('outbox-worker')
+    @click.option('--batch-size', default=outbox.OUTBOX_BATCH_SIZE, help='Events to claim per batch.')
+    @click.option('--poll-interval', default=1.0, help='Seconds to sleep when the outbox is empty.')
+    @click.option('--once', is_flag=True, help='Drain due events and exit.')
+    def outbox_worker_command(batch_size, poll_interval, once):
+        """Process outbox events for post-payment side effects."""
+        outbox.run_worker(batch_size=batch_size, poll_interval=poll_interval, once=once)
+
+    @app.cli.command('export-orders')
+    @click.option('--format', 'export_format', type=click.Choice(list(EXPORT_FORMATS)), default='ndjson')
+    @click.option('--start', help='Include orders created on or after this ISO date.')
+    @click.option('--end', help='Include orders created before this ISO date.')
+    @click.option('--status', type=click.Choice(Order.VALID_STATUSES))
+    @click.option('--include-items', is_flag=True, help='Include line items.')
+    @click.option('--output', type=click.File('w'), default='-', help='Output file (default stdout).')
+    def export_orders_command(export_format, start, end, status, include_items, output):
+        """Stream orders to a file as NDJSON or CSV."""
+        body = generate_export(
+            export_format,
+            start=parse_date_arg(start),
+            end=parse_date_arg(end),
+            status=status,
+            include_items=include_items
+        )
+        for chunk in body:
+            output.write(chunk)
+
+    @app.cli.command('rebuild-sales-rollups')
+    @click.option('--start', help='First day to rebuild (ISO date). Defaults to all history.')
+    @click.option('--end', help='Day after the last day to rebuild (ISO date).')
+    def rebuild_sales_rollups_command(start, end):
+        """Recompute sales rollup tables from completed orders."""
+        processed = sales_rollup.rebuild(
+            start=parse_date_arg(start).date() if start else None,
+            end=parse_date_arg(end).date() if end else None
+        )
+        print(f'Rebuilt sales rollups from {processed} orders.')
+
+    @app.cli.command('rebuild-related-products')
+    def rebuild_related_products_command():
+        """Recompute "frequently bought together" lists from all completed orders."""
+        processed, products = recommendations.rebuild()
+        print(f'Rebuilt related products for {products} products from {processed} orders.')
+
+    @app.cli.command('sync-categories')
+    @click.option('--batch-size', default=categories.CATEGORY_SYNC_BATCH_SIZE, help='Products to relink per transaction.')
+    def sync_categories_command(batch_size):
+        """Build the category tree from product category paths and relink every product."""
+        products, nodes = categories.sync_products(batch_size=batch_size)
+        print(f'Linked {products} products into a tree of {nodes} categories.')
+
+    @app.cli.command('archive-orders')
+    @click.option('--older-than-days', default=order_archive.ORDER_ARCHIVE_AFTER_DAYS, help='Archive finished orders older than this.')
+    @click.option('--batch-size', default=order_archive.ORDER_ARCHIVE_BATCH_SIZE, help='Orders to move per transaction.')
+    @click.option('--pause', default=0.0, help='Seconds to sleep between batches.')
+    def archive_orders_command(older_than_days, batch_size, pause):
+        """Move cold orders into the compressed orders_archive table."""
+        before = datetime.utcnow() - timedelta(days=older_than_days)
+        stats = order_archive.archive_orders(before, batch_size=batch_size, pause=pause)
+        print(json.dumps(stats, indent=2))
+
+    @app.cli.command('create-order-partitions')
+    @click.option('--months-ahead', default=order_archive.ORDER_PARTITION_MONTHS_AHEAD, help='Future months to pre-create.')
+    def create_order_partitions_command(months_ahead):
+        """Pre-create monthly orders partitions (Postgres only)."""
+        created = order_archive.ensure_partitions(months_ahead)
+        print(f"Created partitions: {', '.join(created) or 'none'}")
+
+    @app.cli.command('sweep')
+    @click.option('--pending-ttl-hours', default=maintenance.PENDING_ORDER_TTL_HOURS, help='Age after which pending orders are reconciled.')
+    @click.option('--cart-ttl-days', default=maintenance.CART_ITEM_TTL_DAYS, help='Age after which untouched cart items are pruned.')
+    @click.option('--batch-size', default=maintenance.SWEEP_BATCH_SIZE, help='Rows per batch/transaction.')
+    @click.option('--pause', default=0.0, help='Seconds to sleep between batches.')
+    @click.option('--stripe-stub', is_flag=True, help='Reconcile against a local stub instead of Stripe.')
+    def sweep_command(pending_ttl_hours, cart_ttl_days, batch_size, pause, stripe_stub):
+        """Expire stale pending orders, prune abandoned carts, expired keys and old product changes."""
+        started = time.monotonic()
+        try:
+            intent_source = maintenance.LocalIntentSource() if stripe_stub else maintenance.get_intent_source()
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+        stats = {
+            'pending_orders': maintenance.expire_pending_orders(
+                intent_source, ttl_hours=pending_ttl_hours, batch_size=batch_size, pause=pause
+            ),
+            'cart_items': maintenance.prune_cart_items(days=cart_ttl_days, batch_size=batch_size, pause=pause),
+            'idempotency_keys': {'deleted': purge_expired(batch_size)},
+            'product_changes': {'deleted': product_feed.prune()},
+            'duration_seconds': round(time.monotonic() - started, 3)
+        }
+        app.logger.info(f"Sweep finished: {json.dumps(stats)}")
+        print(json.dumps(stats, indent=2))
+
+    @app.cli.command('backfill-uuid-keys')
+    @click.option('--batch-size', default=uuid_keys.UUID_BACKFILL_BATCH_SIZE, help='Rows to update per transaction.')
+    @click.option('--pause', default=0.0, help='Seconds to sleep between batches.')
+    @click.option('--status', is_flag=True, help='Only report rows still waiting for a uuid value.')
+    def backfill_uuid_keys_command(batch_size, pause, status):
+        """Fill uuid shadow key columns between the expand and contract migrations (Postgres only)."""
+        if status:
+            print(json.dumps(uuid_keys.pending_rows(), indent=2))
+            return
+        stats = uuid_keys.backfill(batch_size=batch_size, pause=pause)
+        print(json.dumps(stats, indent=2))
+
+    @app.cli.command('explain-hot-queries')
+    @click.option('--query', 'names', multiple=True, type=click.Choice(list(query_plans.HOT_QUERIES)))
+    @click.option('--verbose', is_flag=True, help='Print every plan, not just failing ones.')
+    def explain_hot_queries_command(names, verbose):
+        """Fail if a hot query plan needs a sequential scan or a sort (Postgres/SQLite)."""
+        results = query_plans.check_hot_queries(names)
+        failed = 0
+        for name, result in results.items():
+            status = 'FAIL' if result['problems'] else 'ok'
+            print(f"{status:4} {name}")
+            for problem in result['problems']:
+                print(f"     - {problem}")
+            if verbose or result['problems']:
+                print('\n'.join(f"       {line}" for line in result['plan'].splitlines()))
+            failed += bool(result['problems'])
+        if failed:
+            raise SystemExit(1)
@@ -11,6 +11,6 @@ def init_db(app):
     migrate.init_app(app, db)
     
     # Import models to ensure they're registered with SQLAlchemy
-    from models import User, CartItem, Order, Product
+    from models import User, CartItem, Order, ArchivedOrder, Product, ProductChange, IdempotencyKey, OutboxEvent, SalesDaily, SalesDailyProduct, SalesDailyCategory, ProductPairCount, ProductRelated, Category, CategoryClosure, ProductCategory
     
     return db 
\ No newline at end of file
@@ -0,0 +1,254 @@
+import contextlib
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from flask import g, jsonify, request
+
+import admission
+
+logger = logging.getLogger(__name__)
+
+# Latency budget per admission route class in milliseconds; None means the
+# route only has gunicorn's timeout. Admin tools (exports, profiles) and SSE
+# streams are long-running by design.
+DEADLINE_BUDGETS_MS = {
+    'checkout': 5000,
+    'auth': 2000,
+    'cart': 1000,
+    'browse': 500,
+    'admin': None,
+    'stream': None,
+}
+# Below this a statement is not worth starting
+DEADLINE_MIN_REMAINING_MS = int(os.environ.get('DEADLINE_MIN_REMAINING_MS', 5))
+DEADLINE_RETRY_AFTER = int(os.environ.get('DEADLINE_RETRY_AFTER', 1))
+# SQLite calls the progress handler every this many VM instructions
+SQLITE_PROGRESS_STEPS = 10000
+
+# Postgres errors raised by statement_timeout and lock_timeout
+TIMEOUT_SQLSTATES = {'57014', '55P03'}
+
+
+def _load_overrides():
+    """Apply DEADLINE_<CLASS>_MS=<ms> environment overrides; 0 disables the budget"""
+    for name in DEADLINE_BUDGETS_MS:
+        value = os.environ.get(f'DEADLINE_{name.upper()}_MS')
+        if value is None:
+            continue
+        try:
+            DEADLINE_BUDGETS_MS[name] = int(value) or None
+        except ValueError:
+            logger.warning(f"Ignoring malformed DEADLINE_{name.upper()}_MS={value!r}")
+
+
+_load_overrides()
+
+
+class DeadlineExceeded(Exception):
+    """The current request has spent its latency budget"""
+
+    def __init__(self, stage):
+        super().__init__(f'Request deadline exceeded during {stage}')
+        self.stage = stage
+
+
+class Deadline:
+    """Budget of one request; read by the DB and Stripe hooks through ``deadline_var``"""
+
+    __slots__ = ('route_class', 'budget_ms', 'expires_at', 'exceeded', 'suspended')
+
+    def __init__(self, route_class, budget_ms, elapsed_ms=0.0):
+        self.route_class = route_class
+        self.budget_ms = budget_ms
+        self.expires_at = time.monotonic() + (budget_ms - elapsed_ms) / 1000
+        self.exceeded = None
+        self.suspended = 0
+
+    def remaining_ms(self):
+        return (self.expires_at - time.monotonic()) * 1000
+
+    def mark(self, stage):
+        """Record where the budget ran out; the first stage wins"""
+        if self.exceeded is None:
+            self.exceeded = stage
+
+
+deadline_var = contextvars.ContextVar('deadline', default=None)
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def current():
+    """The active deadline, or None outside a budgeted request or while suspended"""
+    deadline = deadline_var.get()
+    if deadline is None or deadline.suspended:
+        return None
+    return deadline
+
+
+def remaining_seconds():
+    """Seconds left in the current request's budget, or None when it has none"""
+    deadline = current()
+    return None if deadline is None else deadline.remaining_ms() / 1000
+
+
+def check(stage):
+    """Raise DeadlineExceeded when too little budget is left to start ``stage``"""
+    deadline = current()
+    if deadline is not None and deadline.remaining_ms() < DEADLINE_MIN_REMAINING_MS:
+        deadline.mark(stage)
+        raise DeadlineExceeded(stage)
+
+
+def exceeded():
+    """Whether the current request has run out of budget somewhere"""
+    deadline = deadline_var.get()
+    return deadline is not None and deadline.exceeded is not None
+
+
+def mark_exceeded(stage):
+    """Attribute a dependency timeout to the current request's deadline"""
+    deadline = current()
+    if deadline is not None:
+        deadline.mark(stage)
+
+
+@contextlib.contextmanager
+def suspended():
+    """Run bookkeeping (releasing an idempotency key, say) even when the budget is spent"""
+    deadline = deadline_var.get()
+    if deadline is None:
+        yield
+        return
+    deadline.suspended += 1
+    try:
+        yield
+    finally:
+        deadline.suspended -= 1
+
+
+def stats():
+    """Per-worker count of requests failed by their deadline, keyed ``class:stage``"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _after_begin(session, transaction, connection):
+    """Turn the remaining budget into timeouts scoped to the transaction that just started"""
+    deadline = current()
+    if deadline is None:
+        return
+    check('db')
+    if connection.dialect.name == 'postgresql':
+        # SET LOCAL ends with the transaction, so pooled connections come back clean
+        timeout_ms = max(int(deadline.remaining_ms()), 1)
+        connection.exec_driver_sql(f'SET LOCAL statement_timeout = {timeout_ms}')
+        connection.exec_driver_sql(f'SET LOCAL lock_timeout = {timeout_ms}')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    check('db')
+
+
+def _handle_error(context):
+    """Attribute Postgres timeouts and SQLite interrupts to the deadline"""
+    original = context.original_exception
+    if getattr(original, 'pgcode', None) in TIMEOUT_SQLSTATES or 'interrupted' in str(original):
+        mark_exceeded('db')
+
+
+def _sqlite_progress():
+    # SQLite has no statement_timeout; a non-zero return interrupts the statement
+    deadline = current()
+    if deadline is not None and deadline.remaining_ms() <= 0:
+        deadline.mark('db')
+        return 1
+    return 0
+
+
+def _on_connect(dbapi_connection, connection_record):
+    if hasattr(dbapi_connection, 'set_progress_handler'):
+        dbapi_connection.set_progress_handler(_sqlite_progress, SQLITE_PROGRESS_STEPS)
+
+
+def _queue_delay_ms():
+    """Time the request waited in the router, from Heroku's X-Request-Start (ms since epoch)"""
+    started = request.headers.get('X-Request-Start', '').removeprefix('t=')
+    if not started.isdigit():
+        return 0.0
+    return max(time.time() * 1000 - int(started), 0.0)
+
+
+def _timeout_response():
+    response = jsonify({'error': 'Request deadline exceeded, please retry'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(DEADLINE_RETRY_AFTER)
+    return response
+
+
+def init_app(app):
+    """Give each request a latency budget by route class and fail it with a 503 once spent"""
+    if not app.config['DEADLINES_ENABLED']:
+        return
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.orm import Session
+
+    for target, name, listener in (
+        (Session, 'after_begin', _after_begin),
+        (Engine, 'before_cursor_execute', _before_cursor_execute),
+        (Engine, 'handle_error', _handle_error),
+        (Engine, 'connect', _on_connect),
+    ):
+        if not event.contains(target, name, listener):
+            event.listen(target, name, listener)
+
+    @app.before_request
+    def start_deadline():
+        route_class = admission.classify(request)
+        budget_ms = DEADLINE_BUDGETS_MS.get(route_class)
+        if not budget_ms:
+            return None
+        deadline = Deadline(route_class, budget_ms, elapsed_ms=min(_queue_delay_ms(), budget_ms))
+        g.deadline_token = deadline_var.set(deadline)
+        if deadline.remaining_ms() < DEADLINE_MIN_REMAINING_MS:
+            deadline.mark('queue')
+            return _timeout_response()
+        return None
+
+    @app.after_request
+    def enforce_deadline(response):
+        deadline = deadline_var.get()
+        if deadline is None or response.status_code < 400:
+            return response
+        # Route handlers turn dependency errors into 4xx/5xx of their own;
+        # once the budget is gone those are reported as a deadline failure
+        if deadline.exceeded is None and not (response.status_code >= 500 and deadline.remaining_ms() <= 0):
+            return response
+        stage = deadline.exceeded or 'handler'
+        with _stats_lock:
+            _stats[f'{deadline.route_class}:{stage}'] += 1
+        logger.warning(f"Deadline exceeded for {request.method} {request.path} during {stage}", extra={
+            'metric': 'request.deadline_exceeded',
+            'route_class': deadline.route_class,
+            'stage': stage,
+            'budget_ms': deadline.budget_ms,
+            'original_status': response.status_code,
+        })
+        return _timeout_response()
+
+    @app.errorhandler(DeadlineExceeded)
+    def deadline_exceeded(e):
+        return _timeout_response()
+
+    @app.teardown_request
+    def clear_deadline(exc):
+        token = g.pop('deadline_token', None)
+        if token is not None:
+            deadline_var.reset(token)
@@ -5,10 +5,13 @@ import Shop from './components/Shop';
 import SignUp from './components/SignUp';
 import SignIn from './components/SignIn';
 import Cart from './components/Cart';
+import { bootstrapAPI } from './services/api';
 
 function App() {
   const [user, setUser] = useState(null);
   const [token, setToken] = useState(localStorage.getItem('token'));
+  // undefined while loading, null if the request failed
+  const [bootstrap, setBootstrap] = useState(undefined);
 
   useEffect(() => {
     if (token) {
@@ -17,6 +20,17 @@ function App() {
     }
   }, [token]);
 
+  useEffect(() => {
+    let cancelled = false;
+    bootstrapAPI.load()
+      .then((response) => { if (!cancelled) setBootstrap(response.data); })
+      .catch((error) => {
+        console.error('Failed to load bootstrap data:', error);
+        if (!cancelled) setBootstrap(null);
+      });
+    return () => { cancelled = true; };
+  }, [token]);
+
   const login = (userData, accessToken) => {
     setUser(userData);
     setToken(accessToken);
@@ -58,7 +72,7 @@ function App() {
 
         <Routes>
           <Route path="/" element={<Landing />} />
-          <Route path="/shop" element={<Shop token={token} />} />
+          <Route path="/shop" element={<Shop token={token} bootstrap={bootstrap} />} />
           <Route path="/signup" element={
             user ? <Navigate to="/shop" /> : <SignUp onLogin={login} />
           } />
@@ -66,7 +80,7 @@ function App() {
             user ? <Navigate to="/shop" /> : <SignIn onLogin={login} />
           } />
           <Route path="/cart" element={
-            user ? <Cart token={token} /> : <Navigate to="/signin" />
+            user ? <Cart token={token} bootstrap={bootstrap} /> : <Navigate to="/signin" />
           } />
         </Routes>
       </div>
@@ -6,7 +6,7 @@ import CheckoutForm from './CheckoutForm';
 
 let stripePromise = null;
 
-function Cart({ token }) {
+function Cart({ token, bootstrap }) {
   const [cartItems, setCartItems] = useState([]);
   const [cartTotal, setCartTotal] = useState(0);
   const [loading, setLoading] = useState(true);
@@ -19,18 +19,34 @@ function Cart({ token }) {
   useEffect(() => {
     if (token) {
       fetchCart();
-      fetchStripeConfig();
     }
   }, [token]);
 
+  // The publishable key arrives with the bootstrap payload; fall back to
+  // asking for it only if that request failed
+  useEffect(() => {
+    if (!token || bootstrap === undefined) {
+      return;
+    }
+    if (bootstrap) {
+      applyStripeConfig(bootstrap.stripe);
+    } else {
+      fetchStripeConfig();
+    }
+  }, [token, bootstrap]);
+
+  const applyStripeConfig = (config) => {
+    setStripeConfig(config);
+    
+    if (config.publicKey && !stripePromise) {
+      stripePromise = loadStripe(config.publicKey);
+    }
+  };
+
   const fetchStripeConfig = async () => {
     try {
       const response = await paymentAPI.getStripeConfig();
-      setStripeConfig(response.data);
-      
-      if (response.data.publicKey && !stripePromise) {
-        stripePromise = loadStripe(response.data.publicKey);
-      }
+      applyStripeConfig(response.data);
     } catch (error) {
       console.error('Failed to fetch Stripe config:', error);
     }
@@ -53,7 +53,7 @@ function CheckoutForm({ onPaymentSuccess, onPaymentError, cartTotal }) {
         onPaymentError(result.error.message);
       } else {
         // Payment succeeded
-        await paymentAPI.confirmPayment(result.paymentIntent.id);
+        await paymentAPI.confirmPayment(result.paymentIntent.id, `confirm-${result.paymentIntent.id}`);
         onPaymentSuccess({
           paymentIntent: result.paymentIntent,
           orderId: order_id
@@ -1,21 +1,60 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { cartAPI, productAPI, adminAPI } from '../services/api';
 
-function Shop({ token }) {
+function Shop({ token, bootstrap }) {
   const [products, setProducts] = useState([]);
   const [loading, setLoading] = useState({});
   const [pageLoading, setPageLoading] = useState(true);
   const [message, setMessage] = useState('');
   const [error, setError] = useState('');
   const [selectedCategory, setSelectedCategory] = useState('');
+  const [lastEventId, setLastEventId] = useState(null);
+  const [categories, setCategories] = useState([]);
+  const usedBootstrap = useRef(false);
+  const bootstrapReady = bootstrap !== undefined;
 
   useEffect(() => {
+    if (!bootstrapReady) {
+      // App is still loading the first-render data
+      return;
+    }
+    if (bootstrap && !usedBootstrap.current) {
+      usedBootstrap.current = true;
+      setCategories(bootstrap.categories.map((facet) => facet.name));
+      const page = bootstrap.catalog;
+      if (!selectedCategory && page.products.length > 0) {
+        setProducts(page.products);
+        setLastEventId(page.last_event_id);
+        setPageLoading(false);
+        if (page.has_more) {
+          // Show the first page now and load the rest behind it
+          fetchProducts(false);
+        }
+        return;
+      }
+    }
     fetchProducts();
-  }, [selectedCategory]);
+  }, [selectedCategory, bootstrapReady]);
 
-  const fetchProducts = async () => {
+  // Apply live stock/price changes from the point the listing was loaded
+  useEffect(() => {
+    if (lastEventId === null) {
+      return undefined;
+    }
+    return productAPI.subscribeToChanges(lastEventId, (change) => {
+      setProducts((current) => current
+        .map((product) => (product.id === change.id
+          ? { ...product, price: change.price, stock_quantity: change.stock, is_active: change.active }
+          : product))
+        .filter((product) => product.is_active));
+    });
+  }, [lastEventId]);
+
+  const fetchProducts = async (showLoading = true) => {
     try {
-      setPageLoading(true);
+      if (showLoading) {
+        setPageLoading(true);
+      }
       setError('');
       
       const response = await productAPI.getProducts(selectedCategory || null);
@@ -25,14 +64,17 @@ function Shop({ token }) {
         setMessage('No products found. Seeding initial products...');
         try {
           await adminAPI.seedProducts();
+          setCategories([]);
           const seededResponse = await productAPI.getProducts(selectedCategory || null);
           setProducts(seededResponse.data.products);
+          setLastEventId(seededResponse.data.last_event_id);
           setMessage('Products loaded successfully!');
         } catch (seedError) {
           setError('No products available. Please contact administrator.');
         }
       } else {
         setProducts(response.data.products);
+        setLastEventId(response.data.last_event_id);
       }
     } catch (error) {
       console.error('Failed to fetch products:', error);
@@ -64,8 +106,10 @@ function Shop({ token }) {
   };
 
   const getUniqueCategories = () => {
-    const categories = products.map(p => p.category).filter(Boolean);
-    return [...new Set(categories)];
+    if (categories.length > 0) {
+      return categories;
+    }
+    return [...new Set(products.map(p => p.category).filter(Boolean))];
   };
 
   if (pageLoading) {
@@ -123,7 +167,7 @@ function Shop({ token }) {
             <h3>No products available</h3>
             <p>Please check back later or contact us for more information.</p>
             <button 
-              onClick={fetchProducts}
+              onClick={() => fetchProducts()}
               className="btn btn-primary"
             >
               Refresh Products
@@ -20,6 +20,10 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// Retries sent with the same key replay the original response server-side
+const withIdempotencyKey = (idempotencyKey) =>
+  idempotencyKey ? { headers: { 'Idempotency-Key': idempotencyKey } } : {};
+
 export const authAPI = {
   signup: (email, password) => 
     api.post('/v1/signup', { email, password }),
@@ -28,6 +32,15 @@ export const authAPI = {
     api.post('/v1/signin', { email, password }),
 };
 
+// First-render data in one round trip: catalog page, category facets,
+// cart summary (when signed in) and the Stripe publishable key
+export const bootstrapAPI = {
+  load: (category = null) => {
+    const params = category ? { category } : {};
+    return api.get('/v1/bootstrap', { params });
+  },
+};
+
 export const productAPI = {
   getProducts: (category = null) => {
     const params = category ? { category } : {};
@@ -36,6 +49,16 @@ export const productAPI = {
   
   getProduct: (productId) =>
     api.get(`/v1/products/${productId}`),
+  
+  // Live stock/price deltas; EventSource resumes with Last-Event-ID on reconnect,
+  // and stops for good if the server answers 204 (stream disabled).
+  // Returns a function that closes the stream.
+  subscribeToChanges: (lastEventId, onChange) => {
+    const query = lastEventId ? `?last_event_id=${lastEventId}` : '';
+    const source = new EventSource(`${API_BASE_URL}/v1/products/stream${query}`);
+    source.addEventListener('product', (event) => onChange(JSON.parse(event.data)));
+    return () => source.close();
+  },
 };
 
 export const cartAPI = {
@@ -48,22 +71,26 @@ export const cartAPI = {
   removeFromCart: (product_id) =>
     api.delete('/v1/cart/remove', { data: { product_id } }),
   
+  // operations: [{ op: 'add' | 'set' | 'remove', product_id, quantity }]
+  batchUpdate: (operations) =>
+    api.post('/v1/cart/batch', { operations }),
+  
   getCart: () =>
     api.get('/v1/cart'),
   
-  checkout: () =>
-    api.post('/v1/checkout'),
+  checkout: (idempotencyKey) =>
+    api.post('/v1/checkout', null, withIdempotencyKey(idempotencyKey)),
 };
 
 export const paymentAPI = {
   getStripeConfig: () =>
     api.get('/v1/stripe-config'),
   
-  createPaymentIntent: () =>
-    api.post('/v1/create-payment-intent'),
+  createPaymentIntent: (idempotencyKey) =>
+    api.post('/v1/create-payment-intent', null, withIdempotencyKey(idempotencyKey)),
   
-  confirmPayment: (payment_intent_id) =>
-    api.post('/v1/confirm-payment', { payment_intent_id }),
+  confirmPayment: (payment_intent_id, idempotencyKey) =>
+    api.post('/v1/confirm-payment', { payment_intent_id }, withIdempotencyKey(idempotencyKey)),
 };
 
 export const orderAPI = {
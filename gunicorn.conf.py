@@ -0,0 +1,67 @@
+import gc
+import os
+
+# gevent serves each request on a greenlet, so idle /v1/products/stream
+# subscribers cost a socket each instead of a worker. Under sync workers
+# the stream is switched off (see post_fork): a few open tabs would
+# otherwise hold every worker.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# The app is preloaded in the master, so patch before anything imports ssl,
+# threading or socket: the gevent worker's own patching happens after fork,
+# too late for modules and threads (the log listener) the master started
+if worker_class == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+# Defaults mirror the previous Dockerfile command line
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+keepalive = 2
+max_requests = 1000
+max_requests_jitter = 50
+
+# Build the app once in the master and fork workers from it
+preload_app = True
+wsgi_app = 'app:create_app()'
+
+# Modules the app imports lazily; loading them in the master before forking
+# lets every worker share their pages instead of importing a private copy
+PRELOAD_MODULES = ['stripe']
+
+
+def when_ready(server):
+    """Warm lazy imports and freeze the heap before the first fork"""
+    for module in PRELOAD_MODULES:
+        try:
+            __import__(module)
+        except ImportError:
+            server.log.warning(f"Could not preload {module}")
+    # Objects moved to the permanent generation are skipped by the GC, so
+    # collections in workers do not write to (and un-share) inherited pages
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Drop any pooled DB connections inherited from the master"""
+    from database import db
+    app = server.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
+    if server.cfg.worker_class_str == 'sync':
+        app.config['PRODUCT_STREAM_ENABLED'] = False
+
+
+def post_worker_init(worker):
+    """Make psycopg2 yield to other greenlets while waiting on Postgres"""
+    if worker_class != 'gevent':
+        return
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        worker.log.warning("psycogreen not installed; DB calls will block the gevent loop")
+        return
+    patch_psycopg()
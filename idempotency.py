@@ -0,0 +1,215 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, g, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+import deadlines
+from models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 24 * 3600))
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.environ.get('IDEMPOTENCY_WAIT_TIMEOUT', 15))
+# How long an in-progress key stays with the request that claimed it. Longer
+# than gunicorn's worker timeout (120s), so the owner is dead, not slow, by
+# the time a retry takes the key over.
+IDEMPOTENCY_LEASE_SECONDS = int(os.environ.get('IDEMPOTENCY_LEASE_SECONDS', 150))
+MAX_KEY_LENGTH = 255
+
+# Requests running in this process, so local duplicates wait on an event
+# instead of polling the database
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def request_fingerprint():
+    """Hash the method, path and body so a key cannot be reused for a different request"""
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.path.encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def replay(record):
+    """Rebuild the stored response for a completed key"""
+    response = current_app.response_class(
+        record.response_body,
+        status=record.response_status,
+        mimetype=record.response_mimetype
+    )
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _load(user_id, key):
+    # End any open transaction so we see rows committed by other workers
+    db.session.rollback()
+    return IdempotencyKey.query.filter_by(user_id=user_id, key=key).populate_existing().first()
+
+
+def _claim(user_id, key, fingerprint):
+    """Insert an in-progress record; returns (record, True) if claimed or (existing, False)"""
+    record = IdempotencyKey.start(user_id, key, fingerprint, IDEMPOTENCY_KEY_TTL, IDEMPOTENCY_LEASE_SECONDS)
+    db.session.add(record)
+    try:
+        db.session.commit()
+        return record, True
+    except IntegrityError:
+        db.session.rollback()
+        return _load(user_id, key), False
+
+
+def _owned(record_id, locked_until):
+    """The in-progress record while this request still holds its lease, else None"""
+    record = db.session.get(IdempotencyKey, record_id, populate_existing=True)
+    if record is None or record.is_completed or record.locked_until != locked_until:
+        return None
+    return record
+
+
+def _take_over(record):
+    """Claim an abandoned in-progress record; returns it, or None if another request got there first"""
+    locked_until = datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS)
+    # Compare-and-set on the old lease, so only one retry wins the key
+    taken = IdempotencyKey.query.filter_by(
+        id=record.id, status=IdempotencyKey.STATUS_IN_PROGRESS, locked_until=record.locked_until
+    ).update({'locked_until': locked_until}, synchronize_session=False)
+    db.session.commit()
+    if not taken:
+        return None
+    logger.warning(f"Took over idempotency key {record.key} abandoned by an earlier request")
+    return _load(record.user_id, record.key)
+
+
+def _wait_for(user_id, key):
+    """Wait for the original request to finish; returns the completed record or None"""
+    with _inflight_lock:
+        event = _inflight.get((user_id, key))
+    if event is not None:
+        event.wait(IDEMPOTENCY_WAIT_TIMEOUT)
+
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_TIMEOUT
+    delay = 0.05
+    while True:
+        record = _load(user_id, key)
+        if record is None or record.is_completed:
+            return record
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(delay)
+        delay = min(delay * 2, 0.5)
+
+
+def idempotent(view):
+    """Make a JWT-protected POST replayable through the Idempotency-Key header.
+
+    Without the header the view runs as before. With it, the first request
+    runs the view and stores the response per user and key; duplicates get
+    the stored response, waiting for the original if it is still running.
+    Server errors are not stored so the client can retry them, and a key
+    whose request died is taken over once its lease runs out.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'}), 400
+
+        user_id = get_jwt_identity()
+        fingerprint = request_fingerprint()
+
+        for _ in range(3):
+            record, claimed = _claim(user_id, key, fingerprint)
+            if claimed:
+                break
+            if record is None:
+                continue
+            if record.request_fingerprint != fingerprint:
+                return jsonify({'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'}), 422
+            if record.is_expired:
+                db.session.delete(record)
+                db.session.commit()
+                continue
+            if record.is_abandoned:
+                record = _take_over(record)
+                if record is not None:
+                    claimed = True
+                    break
+                continue
+            if not record.is_completed:
+                record = _wait_for(user_id, key)
+                if record is None:
+                    # The original failed and released the key, ran out its lease, or is still running
+                    current = _load(user_id, key)
+                    if current is None or current.is_abandoned:
+                        continue
+                    return jsonify({'error': 'A request with this idempotency key is still in progress'}), 409
+            return replay(record)
+        else:
+            return jsonify({'error': 'Could not acquire idempotency key'}), 409
+
+        # Read before the view runs: its commits and rollbacks expire the record
+        record_id, locked_until = record.id, record.locked_until
+        event = threading.Event()
+        with _inflight_lock:
+            _inflight[(user_id, key)] = event
+        g.idempotency_key = key
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+            # The key must be stored or released even if the view spent the request's budget
+            with deadlines.suspended():
+                db.session.rollback()
+                # Leave the key alone if a retry took it over after our lease ran out
+                record = _owned(record_id, locked_until)
+                if record is not None:
+                    if response.status_code >= 500 or deadlines.exceeded():
+                        db.session.delete(record)
+                    else:
+                        record.mark_completed(response.status_code, response.get_data(as_text=True), response.mimetype)
+                    db.session.commit()
+            return response
+        except Exception:
+            with deadlines.suspended():
+                db.session.rollback()
+                IdempotencyKey.query.filter_by(id=record_id, locked_until=locked_until).delete()
+                db.session.commit()
+            raise
+        finally:
+            with _inflight_lock:
+                _inflight.pop((user_id, key), None)
+            event.set()
+
+    return wrapper
+
+
+def purge_expired(batch_size=1000):
+    """Delete expired keys in batches; returns the number removed"""
+    total = 0
+    while True:
+        ids = [
+            row.id for row in db.session.query(IdempotencyKey.id).filter(
+                IdempotencyKey.expires_at <= datetime.utcnow()
+            ).limit(batch_size)
+        ]
+        if not ids:
+            break
+        IdempotencyKey.query.filter(IdempotencyKey.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        total += len(ids)
+        if len(ids) < batch_size:
+            break
+    if total:
+        logger.info(f"Purged {total} expired idempotency keys")
+    return total
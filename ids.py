@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+import uuid
+
+from sqlalchemy import LargeBinary, String
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.types import TypeDecorator
+
+NIL_UUID = '00000000-0000-0000-0000-000000000000'
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+
+def uuid7():
+    """Generate a time-ordered UUIDv7 (RFC 9562).
+
+    The first 48 bits are the Unix time in milliseconds, so keys generated
+    later sort later and inserts land at the right edge of B-tree indexes.
+    A 12-bit counter in rand_a keeps IDs from one process monotonic within
+    the same millisecond; the remaining 62 bits are random.
+    """
+    global _last_ms, _counter
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_ms:
+            _last_ms = now_ms
+            _counter = int.from_bytes(os.urandom(2), 'big') & 0x7FF
+        else:
+            _counter += 1
+            if _counter > 0xFFF:
+                # Counter exhausted: borrow the next millisecond
+                _last_ms += 1
+                _counter = 0
+        timestamp_ms = _last_ms
+        counter = _counter
+
+    rand_b = int.from_bytes(os.urandom(8), 'big') & 0x3FFFFFFFFFFFFFFF
+    value = (timestamp_ms & 0xFFFFFFFFFFFF) << 80
+    value |= 0x7 << 76
+    value |= counter << 64
+    value |= 0x2 << 62
+    value |= rand_b
+    return uuid.UUID(int=value)
+
+
+def new_id():
+    """New primary key as a canonical UUID string"""
+    return str(uuid7())
+
+
+class UUIDKey(TypeDecorator):
+    """UUID column exposed to Python as a canonical string.
+
+    Stored as native ``uuid`` on Postgres, 16 raw bytes on SQLite and
+    ``VARCHAR(36)`` elsewhere, so the API keeps returning string IDs.
+    Malformed input binds as the nil UUID, which never matches a real key,
+    so lookups with garbage IDs behave like "not found" instead of erroring.
+    """
+
+    impl = String(36)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=False))
+        if dialect.name == 'sqlite':
+            return dialect.type_descriptor(LargeBinary(16))
+        return dialect.type_descriptor(String(36))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            parsed = value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+        except ValueError:
+            parsed = uuid.UUID(NIL_UUID)
+        if dialect.name == 'sqlite':
+            return parsed.bytes
+        return str(parsed)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, (bytes, memoryview)):
+            return str(uuid.UUID(bytes=bytes(value)))
+        return str(value)
@@ -0,0 +1,215 @@
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+from sqlalchemy import and_, or_, update
+
+from database import db
+from models import CartItem, Order, Product
+import outbox
+import product_feed
+from stripe_client import get_stripe
+
+logger = logging.getLogger(__name__)
+
+PENDING_ORDER_TTL_HOURS = int(os.environ.get('PENDING_ORDER_TTL_HOURS', 24))
+CART_ITEM_TTL_DAYS = int(os.environ.get('CART_ITEM_TTL_DAYS', 30))
+SWEEP_BATCH_SIZE = int(os.environ.get('SWEEP_BATCH_SIZE', 500))
+# Most intents one sweep batch will page through in the list window
+STRIPE_LIST_MAX_INTENTS = int(os.environ.get('STRIPE_LIST_MAX_INTENTS', 1000))
+
+# Stripe intent statuses that will never turn into a payment
+ABANDONED_INTENT_STATUSES = {'canceled', 'requires_payment_method', 'requires_confirmation', 'requires_action'}
+# Pseudo-status for an intent Stripe says does not exist
+INTENT_MISSING = 'missing'
+
+
+def _unix_utc(value):
+    """Unix timestamp of a naive UTC datetime (``datetime.utcnow()`` values)"""
+    return int(value.replace(tzinfo=timezone.utc).timestamp())
+
+
+class StripeIntentSource:
+    """PaymentIntent status lookups: a capped list per batch, then one retrieve per intent it missed"""
+
+    def statuses(self, intent_ids, created_from, created_to):
+        """Return ``{intent_id: status}`` for the wanted intents listed in the window.
+
+        Paging stops once every wanted intent is found or after
+        STRIPE_LIST_MAX_INTENTS, so a busy window costs a bounded number of
+        calls and only the batch's statuses are kept.
+        """
+        wanted = set(intent_ids)
+        found = {}
+        intents = get_stripe().PaymentIntent.list(
+            created={'gte': _unix_utc(created_from), 'lte': _unix_utc(created_to)},
+            limit=100
+        )
+        for intent in islice(intents.auto_paging_iter(), STRIPE_LIST_MAX_INTENTS):
+            if intent['id'] in wanted:
+                found[intent['id']] = intent['status']
+                if len(found) == len(wanted):
+                    break
+        return found
+
+    def retrieve(self, intent_id):
+        """Status of one intent, INTENT_MISSING if Stripe has no such intent, None if it could not be read"""
+        stripe = get_stripe()
+        try:
+            return stripe.PaymentIntent.retrieve(intent_id)['status']
+        except stripe.error.InvalidRequestError as e:
+            if e.code == 'resource_missing':
+                return INTENT_MISSING
+            logger.error(f"Could not retrieve payment intent {intent_id}: {e}")
+        except stripe.error.StripeError as e:
+            logger.error(f"Could not retrieve payment intent {intent_id}: {e}")
+        return None
+
+
+class LocalIntentSource:
+    """Offline stand-in for Stripe, for development only (`flask sweep --stripe-stub`)"""
+
+    def __init__(self, statuses=None):
+        self._statuses = dict(statuses or {})
+
+    def statuses(self, intent_ids, created_from, created_to):
+        return {intent_id: self._statuses[intent_id] for intent_id in intent_ids if intent_id in self._statuses}
+
+    def retrieve(self, intent_id):
+        return self._statuses.get(intent_id)
+
+
+def get_intent_source():
+    """Stripe-backed intent lookups; refuses to run without a secret key"""
+    if not os.environ.get('STRIPE_SECRET_KEY'):
+        raise RuntimeError('STRIPE_SECRET_KEY is not set; pass --stripe-stub to reconcile against a local stub')
+    return StripeIntentSource()
+
+
+def _complete_paid_order(order_id):
+    """Complete a pending order whose payment succeeded without a confirm call"""
+    order = Order.query.filter_by(id=order_id, status=Order.STATUS_PENDING).with_for_update().first()
+    if order is None:
+        return False
+    order.mark_completed()
+    # The cart may have changed since checkout, so take quantities from the order
+    items = json.loads(order.items or '[]')
+    for item in items:
+        db.session.execute(
+            update(Product)
+            .where(Product.id == item['product_id'], Product.stock_quantity >= item['quantity'])
+            .values(stock_quantity=Product.stock_quantity - item['quantity'])
+        )
+    product_feed.record({item['product_id'] for item in items})
+    outbox.enqueue('order.completed', order.to_event_payload())
+    return True
+
+
+def expire_pending_orders(intent_source, ttl_hours=PENDING_ORDER_TTL_HOURS,
+                          batch_size=SWEEP_BATCH_SIZE, pause=0.0):
+    """Reconcile pending orders older than the TTL against Stripe in bounded batches.
+
+    Each batch reads a page of candidates with keyset pagination, releases the
+    transaction before calling Stripe, then applies guarded updates that only
+    touch rows still pending, so no lock is held across the network call.
+    Orders are only cancelled on a definite answer: an abandoned or missing
+    intent, or no intent at all. Intents whose status cannot be read stay
+    pending for the next sweep.
+    """
+    stats = {'scanned': 0, 'completed': 0, 'cancelled': 0, 'still_pending': 0, 'unknown': 0, 'batches': 0}
+    cutoff = datetime.utcnow() - timedelta(hours=ttl_hours)
+    cursor = None
+
+    while True:
+        query = db.session.query(
+            Order.id, Order.stripe_payment_intent_id, Order.created_at
+        ).filter(Order.status == Order.STATUS_PENDING, Order.created_at < cutoff)
+        if cursor:
+            query = query.filter(or_(
+                Order.created_at > cursor[0],
+                and_(Order.created_at == cursor[0], Order.id > cursor[1])
+            ))
+        rows = query.order_by(Order.created_at, Order.id).limit(batch_size).all()
+        db.session.rollback()
+        if not rows:
+            break
+
+        cursor = (rows[-1].created_at, rows[-1].id)
+        stats['batches'] += 1
+        stats['scanned'] += len(rows)
+
+        statuses = {}
+        intent_ids = [row.stripe_payment_intent_id for row in rows if row.stripe_payment_intent_id]
+        if intent_ids:
+            window_start = rows[0].created_at - timedelta(minutes=5)
+            window_end = rows[-1].created_at + timedelta(minutes=5)
+            statuses = intent_source.statuses(intent_ids, window_start, window_end)
+
+        to_cancel = []
+        for row in rows:
+            if not row.stripe_payment_intent_id:
+                # Checkout never reached Stripe, so nothing can pay for it
+                to_cancel.append(row.id)
+                continue
+            status = statuses.get(row.stripe_payment_intent_id)
+            if status is None:
+                # Outside the list window (clock skew, edited orders): ask directly
+                status = intent_source.retrieve(row.stripe_payment_intent_id)
+            if status == 'succeeded':
+                if _complete_paid_order(row.id):
+                    stats['completed'] += 1
+            elif status == INTENT_MISSING or status in ABANDONED_INTENT_STATUSES:
+                to_cancel.append(row.id)
+            elif status is None:
+                stats['unknown'] += 1
+            else:
+                stats['still_pending'] += 1
+
+        if to_cancel:
+            result = db.session.execute(
+                update(Order)
+                .where(Order.id.in_(to_cancel), Order.status == Order.STATUS_PENDING)
+                .values(status=Order.STATUS_CANCELLED, updated_at=datetime.utcnow())
+            )
+            stats['cancelled'] += result.rowcount
+        db.session.commit()
+
+        if len(rows) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    return stats
+
+
+def prune_cart_items(days=CART_ITEM_TTL_DAYS, batch_size=SWEEP_BATCH_SIZE, pause=0.0):
+    """Delete cart items untouched for ``days`` days, one small batch per transaction"""
+    stats = {'deleted': 0, 'batches': 0}
+    cutoff = datetime.utcnow() - timedelta(days=days)
+
+    while True:
+        ids = [
+            row.id for row in db.session.query(CartItem.id)
+            .filter(CartItem.updated_at < cutoff)
+            .limit(batch_size)
+        ]
+        if not ids:
+            db.session.rollback()
+            break
+        result = db.session.execute(
+            CartItem.__table__.delete().where(
+                CartItem.id.in_(ids), CartItem.updated_at < cutoff
+            )
+        )
+        db.session.commit()
+        stats['deleted'] += result.rowcount
+        stats['batches'] += 1
+        if len(ids) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    return stats
@@ -0,0 +1,40 @@
+"""Add outbox_events for the transactional outbox
+
+Revision ID: 2b5d8f3c0a17
+Revises: 1a4c7e2b9f06
+Create Date: 2026-10-19 08:40:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b5d8f3c0a17'
+down_revision = '1a4c7e2b9f06'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('outbox_events'):
+        return
+    op.create_table(
+        'outbox_events',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('event_type', sa.String(length=100), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('available_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_outbox_status_available', 'outbox_events', ['status', 'available_at'])
+
+
+def downgrade():
+    op.drop_index('idx_outbox_status_available', table_name='outbox_events')
+    op.drop_table('outbox_events')
@@ -0,0 +1,140 @@
+"""Partition orders by month on created_at and add orders_archive
+
+Revision ID: 3f1c2a9b7d10
+Revises: 4c6e9a1d2b38
+Create Date: 2026-10-19 09:00:00.000000
+
+On Postgres the existing orders table is swapped for a table partitioned by
+RANGE (created_at) with one partition per month plus a default partition.
+The primary key becomes (id, created_at) because Postgres requires the
+partition key in every unique constraint. Rows are copied in the same
+transaction, so run this during a quiet window on large tables. Future
+partitions are created by `flask create-order-partitions`.
+
+Other databases keep a plain orders table; only orders_archive is added.
+"""
+from datetime import date, datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9b7d10'
+down_revision = '4c6e9a1d2b38'
+branch_labels = None
+depends_on = None
+
+ORDER_INDEXES = {
+    'idx_order_user': 'user_id',
+    'idx_order_status': 'status',
+    'idx_order_payment_intent': 'stripe_payment_intent_id',
+    'idx_order_created': 'created_at',
+}
+MONTHS_AHEAD = 3
+
+
+def _add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_orders_table(partitioned):
+    op.execute(f"""
+        CREATE TABLE orders (
+            id VARCHAR(36) NOT NULL,
+            user_id VARCHAR(36) NOT NULL REFERENCES users (id),
+            total_amount NUMERIC(10, 2) NOT NULL,
+            status VARCHAR(50) NOT NULL,
+            stripe_payment_intent_id VARCHAR(255),
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            updated_at TIMESTAMP WITHOUT TIME ZONE,
+            items TEXT NOT NULL,
+            PRIMARY KEY ({'id, created_at' if partitioned else 'id'})
+        ){' PARTITION BY RANGE (created_at)' if partitioned else ''}
+    """)
+    for name, column in ORDER_INDEXES.items():
+        op.execute(f"CREATE INDEX {name} ON orders ({column})")
+
+
+def _rename_old_orders_table():
+    op.execute("ALTER TABLE orders RENAME TO orders_old")
+    op.execute("ALTER TABLE orders_old RENAME CONSTRAINT orders_pkey TO orders_old_pkey")
+    for name in ORDER_INDEXES:
+        op.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_old")
+
+
+def _copy_from_old_orders_table():
+    op.execute("""
+        INSERT INTO orders (id, user_id, total_amount, status, stripe_payment_intent_id,
+                            created_at, updated_at, items)
+        SELECT id, user_id, total_amount, status, stripe_payment_intent_id,
+               COALESCE(created_at, updated_at, now()), updated_at, items
+        FROM orders_old
+    """)
+    op.execute("DROP TABLE orders_old")
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not inspector.has_table('orders_archive'):
+        op.create_table(
+            'orders_archive',
+            sa.Column('id', sa.String(length=36), nullable=False),
+            sa.Column('user_id', sa.String(length=36), nullable=False),
+            sa.Column('status', sa.String(length=50), nullable=False),
+            sa.Column('total_amount', sa.Numeric(10, 2), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('archived_at', sa.DateTime(), nullable=True),
+            sa.Column('payload', sa.LargeBinary(), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('idx_order_archive_user_created', 'orders_archive', ['user_id', 'created_at'])
+
+    if bind.dialect.name != 'postgresql' or not inspector.has_table('orders'):
+        return
+
+    already_partitioned = bind.execute(sa.text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'orders'"
+    )).scalar()
+    if already_partitioned:
+        return
+
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM orders")).scalar() or datetime.utcnow()
+    first_month = date(oldest.year, oldest.month, 1)
+    last_month = _add_months(datetime.utcnow().date(), MONTHS_AHEAD)
+
+    _rename_old_orders_table()
+    _create_orders_table(partitioned=True)
+    op.execute("CREATE TABLE orders_default PARTITION OF orders DEFAULT")
+
+    month = first_month
+    while month <= last_month:
+        op.execute(
+            f"CREATE TABLE orders_p{month.year:04d}_{month.month:02d} PARTITION OF orders "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+
+    _copy_from_old_orders_table()
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        partitioned = bind.execute(sa.text(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = 'orders'"
+        )).scalar()
+        if partitioned:
+            _rename_old_orders_table()
+            _create_orders_table(partitioned=False)
+            # Dropping the partitioned parent drops every partition with it
+            _copy_from_old_orders_table()
+
+    op.drop_index('idx_order_archive_user_created', table_name='orders_archive')
+    op.drop_table('orders_archive')
@@ -0,0 +1,62 @@
+"""Add daily sales rollup tables
+
+Revision ID: 4c6e9a1d2b38
+Revises: 2b5d8f3c0a17
+Create Date: 2026-10-19 08:50:00.000000
+
+Fill them for existing orders with `flask rebuild-sales-rollups`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c6e9a1d2b38'
+down_revision = '2b5d8f3c0a17'
+branch_labels = None
+depends_on = None
+
+
+def _metrics():
+    return [
+        sa.Column('units', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Numeric(12, 2), nullable=False),
+        sa.Column('order_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    ]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('sales_daily'):
+        op.create_table(
+            'sales_daily',
+            sa.Column('day', sa.Date(), nullable=False),
+            *_metrics(),
+            sa.PrimaryKeyConstraint('day')
+        )
+    if not inspector.has_table('sales_daily_product'):
+        op.create_table(
+            'sales_daily_product',
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('product_id', sa.String(length=36), nullable=False),
+            sa.Column('category', sa.String(length=100), nullable=True),
+            *_metrics(),
+            sa.PrimaryKeyConstraint('day', 'product_id')
+        )
+        op.create_index('idx_sales_product_product_day', 'sales_daily_product', ['product_id', 'day'])
+    if not inspector.has_table('sales_daily_category'):
+        op.create_table(
+            'sales_daily_category',
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('category', sa.String(length=100), nullable=False),
+            *_metrics(),
+            sa.PrimaryKeyConstraint('day', 'category')
+        )
+
+
+def downgrade():
+    op.drop_table('sales_daily_category')
+    op.drop_index('idx_sales_product_product_day', table_name='sales_daily_product')
+    op.drop_table('sales_daily_product')
+    op.drop_table('sales_daily')
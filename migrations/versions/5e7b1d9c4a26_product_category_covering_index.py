@@ -0,0 +1,53 @@
+"""Cover the storefront subtree filter's per-product category lookup
+
+Revision ID: 5e7b1d9c4a26
+Revises: 9d4b2f7c3e18
+Create Date: 2026-10-19 20:00:00.000000
+
+The storefront's category listing walks active products in name order
+(idx_product_active_name) and checks each with a correlated EXISTS. The
+(product_id, category_id) index answers that check from the index alone;
+it replaces the narrower idx_product_category_product. On Postgres both
+are built and dropped CONCURRENTLY outside the migration transaction.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e7b1d9c4a26'
+down_revision = '9d4b2f7c3e18'
+branch_labels = None
+depends_on = None
+
+NEW_INDEX = ('idx_product_category_product_category', ['product_id', 'category_id'])
+OLD_INDEX = ('idx_product_category_product', ['product_id'])
+
+
+def _existing_indexes():
+    """Index names on product_categories, or None when init-db has not created it yet"""
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('product_categories'):
+        return None
+    return {index['name'] for index in inspector.get_indexes('product_categories')}
+
+
+def _swap(create, drop):
+    existing = _existing_indexes()
+    if existing is None:
+        return
+    with op.get_context().autocommit_block():
+        name, columns = create
+        if name not in existing:
+            op.create_index(name, 'product_categories', columns, postgresql_concurrently=True)
+        name, _ = drop
+        if name in existing:
+            op.drop_index(name, table_name='product_categories', postgresql_concurrently=True)
+
+
+def upgrade():
+    _swap(NEW_INDEX, OLD_INDEX)
+
+
+def downgrade():
+    _swap(OLD_INDEX, NEW_INDEX)
@@ -0,0 +1,95 @@
+"""Add uuid shadow columns for the text primary and foreign keys
+
+Revision ID: 7a2d4e8c1b05
+Revises: 3f1c2a9b7d10
+Create Date: 2026-10-19 12:00:00.000000
+
+Expand step of the online switch from VARCHAR(36) keys to native uuid on
+Postgres. Every key column gets a nullable ``<column>_uuid`` shadow, a
+trigger that fills it on INSERT/UPDATE, and a NOT VALID ``IS NOT NULL``
+check that the contract step validates. All of these are catalog-only
+changes, so this revision takes brief locks and no table rewrite.
+
+Deploy this revision on its own, run `flask backfill-uuid-keys` to fill in
+existing rows while the app keeps serving, then upgrade to b9e3f5a1c7d2.
+
+Other databases have nothing to expand; SQLite is converted in place by
+the contract revision.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a2d4e8c1b05'
+down_revision = '3f1c2a9b7d10'
+branch_labels = None
+depends_on = None
+
+KEY_COLUMNS = {
+    'users': ['id'],
+    'products': ['id'],
+    'cart_items': ['id', 'user_id', 'product_id'],
+    'orders': ['id', 'user_id'],
+    'orders_archive': ['id', 'user_id'],
+    'idempotency_keys': ['id', 'user_id'],
+    'outbox_events': ['id'],
+    'sales_daily_product': ['product_id'],
+}
+
+
+def _text_key_tables(bind):
+    """Tables whose key columns are still stored as text"""
+    rows = bind.execute(sa.text(
+        "SELECT table_name, column_name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND data_type = 'character varying'"
+    )).all()
+    text_columns = {(table, column) for table, column in rows}
+    return [
+        table for table, columns in KEY_COLUMNS.items()
+        if all((table, column) in text_columns for column in columns)
+    ]
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    for table in _text_key_tables(bind):
+        columns = KEY_COLUMNS[table]
+        for column in columns:
+            op.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column}_uuid uuid")
+            op.execute(
+                f"ALTER TABLE {table} ADD CONSTRAINT {table}_{column}_uuid_not_null "
+                f"CHECK ({column}_uuid IS NOT NULL) NOT VALID"
+            )
+
+        assignments = ' '.join(f"NEW.{column}_uuid := NEW.{column}::uuid;" for column in columns)
+        op.execute(f"""
+            CREATE OR REPLACE FUNCTION {table}_uuid_sync() RETURNS trigger AS $$
+            BEGIN
+                {assignments}
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        op.execute(
+            f"CREATE TRIGGER {table}_uuid_sync BEFORE INSERT OR UPDATE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION {table}_uuid_sync()"
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    inspector = sa.inspect(bind)
+    for table, columns in KEY_COLUMNS.items():
+        if not inspector.has_table(table):
+            continue
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_uuid_sync ON {table}")
+        op.execute(f"DROP FUNCTION IF EXISTS {table}_uuid_sync()")
+        for column in columns:
+            op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS {column}_uuid")
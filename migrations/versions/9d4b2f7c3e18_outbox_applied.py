@@ -0,0 +1,38 @@
+"""Add outbox_applied markers for idempotent event handlers
+
+Revision ID: 9d4b2f7c3e18
+Revises: c2d8f4a6e1b9
+Create Date: 2026-10-19 19:00:00.000000
+
+Events already handled before this revision have no marker, so a late
+redelivery of one of them is still applied again; `flask
+rebuild-sales-rollups` and `flask rebuild-related-products` correct that.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from ids import UUIDKey
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4b2f7c3e18'
+down_revision = 'c2d8f4a6e1b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('outbox_applied'):
+        return
+    op.create_table(
+        'outbox_applied',
+        sa.Column('consumer', sa.String(length=50), nullable=False),
+        sa.Column('event_type', sa.String(length=100), nullable=False),
+        sa.Column('subject_id', UUIDKey(), nullable=False),
+        sa.Column('applied_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('consumer', 'event_type', 'subject_id')
+    )
+
+
+def downgrade():
+    op.drop_table('outbox_applied')
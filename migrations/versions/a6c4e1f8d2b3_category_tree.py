@@ -0,0 +1,130 @@
+"""Add category tree with closure table and product links
+
+Revision ID: a6c4e1f8d2b3
+Revises: f3a9c2e7b5d1
+Create Date: 2026-10-19 17:00:00.000000
+
+The tree is built from the existing products.category values and every
+product is linked to its leaf, so subtree filters see products created
+before this revision. `flask sync-categories` repeats the same work for
+rows edited outside the API later.
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+from ids import UUIDKey, new_id
+
+SEPARATOR = ' > '
+MAX_PATH_LENGTH = 100
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c4e1f8d2b3'
+down_revision = 'f3a9c2e7b5d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('categories'):
+        op.create_table(
+            'categories',
+            sa.Column('id', UUIDKey(), nullable=False),
+            sa.Column('name', sa.String(length=100), nullable=False),
+            sa.Column('parent_id', UUIDKey(), nullable=True),
+            sa.Column('path', sa.String(length=100), nullable=False),
+            sa.Column('depth', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['parent_id'], ['categories.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('path')
+        )
+        op.create_index('idx_category_parent', 'categories', ['parent_id'])
+    if not inspector.has_table('category_closure'):
+        op.create_table(
+            'category_closure',
+            sa.Column('ancestor_id', UUIDKey(), nullable=False),
+            sa.Column('descendant_id', UUIDKey(), nullable=False),
+            sa.Column('depth', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['ancestor_id'], ['categories.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['descendant_id'], ['categories.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+        )
+        op.create_index('idx_category_closure_descendant', 'category_closure', ['descendant_id', 'ancestor_id'])
+    if not inspector.has_table('product_categories'):
+        op.create_table(
+            'product_categories',
+            sa.Column('category_id', UUIDKey(), nullable=False),
+            sa.Column('product_id', UUIDKey(), nullable=False),
+            sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('category_id', 'product_id')
+        )
+        op.create_index('idx_product_category_product', 'product_categories', ['product_id'])
+
+    # On a fresh database init-db creates products afterwards; nothing to link
+    if inspector.has_table('products'):
+        _backfill(op.get_bind())
+
+
+def _backfill(bind):
+    """Create a node for every category path in use and link its products"""
+    products = sa.table('products', sa.column('id', UUIDKey()), sa.column('category', sa.String()))
+    categories = sa.table(
+        'categories', sa.column('id', UUIDKey()), sa.column('name', sa.String()), sa.column('parent_id', UUIDKey()),
+        sa.column('path', sa.String()), sa.column('depth', sa.Integer()), sa.column('created_at', sa.DateTime())
+    )
+    closure = sa.table(
+        'category_closure', sa.column('ancestor_id', UUIDKey()), sa.column('descendant_id', UUIDKey()),
+        sa.column('depth', sa.Integer())
+    )
+    links = sa.table('product_categories', sa.column('category_id', UUIDKey()), sa.column('product_id', UUIDKey()))
+
+    if bind.execute(sa.select(sa.func.count()).select_from(links)).scalar():
+        return
+
+    node_ids = dict(bind.execute(sa.select(categories.c.path, categories.c.id)).all())
+    now = datetime.utcnow()
+    values = bind.execute(
+        sa.select(products.c.category).where(products.c.category.isnot(None)).distinct()
+    ).scalars().all()
+    for value in values:
+        names = [part.strip() for part in value.split(SEPARATOR.strip()) if part.strip()]
+        path = SEPARATOR.join(names)
+        if not names or len(path) > MAX_PATH_LENGTH:
+            continue
+
+        ancestors = []
+        for depth, name in enumerate(names):
+            node_path = SEPARATOR.join(names[:depth + 1])
+            if node_path not in node_ids:
+                node_id = new_id()
+                bind.execute(categories.insert().values(
+                    id=node_id, name=name, parent_id=ancestors[-1] if ancestors else None,
+                    path=node_path, depth=depth, created_at=now
+                ))
+                bind.execute(closure.insert(), [{'ancestor_id': node_id, 'descendant_id': node_id, 'depth': 0}] + [
+                    {'ancestor_id': ancestor_id, 'descendant_id': node_id, 'depth': depth - i}
+                    for i, ancestor_id in enumerate(ancestors)
+                ])
+                node_ids[node_path] = node_id
+            ancestors.append(node_ids[node_path])
+
+        bind.execute(links.insert().from_select(
+            ['category_id', 'product_id'],
+            sa.select(sa.literal(node_ids[path], UUIDKey()), products.c.id).where(products.c.category == value)
+        ))
+        if value != path:
+            bind.execute(products.update().where(products.c.category == value).values(category=path))
+
+
+def downgrade():
+    op.drop_index('idx_product_category_product', table_name='product_categories')
+    op.drop_table('product_categories')
+    op.drop_index('idx_category_closure_descendant', table_name='category_closure')
+    op.drop_table('category_closure')
+    op.drop_index('idx_category_parent', table_name='categories')
+    op.drop_table('categories')
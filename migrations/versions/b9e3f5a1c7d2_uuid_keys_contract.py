@@ -0,0 +1,233 @@
+"""Swap text primary and foreign keys for native uuid / 16-byte blobs
+
+Revision ID: b9e3f5a1c7d2
+Revises: 7a2d4e8c1b05
+Create Date: 2026-10-19 12:30:00.000000
+
+Contract step of the online switch to uuid keys. Run it after
+`flask backfill-uuid-keys` has filled in the shadow columns.
+
+On Postgres:
+  1. Fill any shadow values the backfill missed and validate the NOT NULL
+     checks (SHARE UPDATE EXCLUSIVE, writes keep flowing).
+  2. Build every index and PK/unique constraint on the shadow columns with
+     CREATE INDEX CONCURRENTLY.
+  3. In one short transaction under lock_timeout: drop the foreign keys,
+     drop the text columns, rename the shadows into place, attach the new
+     indexes as constraints and re-add the foreign keys NOT VALID.
+  4. Validate the foreign keys outside the swap transaction.
+
+Partitioned orders cannot build indexes concurrently on the parent or
+attach constraints USING INDEX, so its key indexes are rebuilt inside the
+swap transaction; schedule this revision for a quiet window if orders is
+large.
+
+On SQLite the text keys are rewritten in place as 16-byte blobs, which is
+what UUIDKey binds there. This is a single offline UPDATE per table and is
+meant for development databases.
+"""
+import re
+import uuid
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9e3f5a1c7d2'
+down_revision = '7a2d4e8c1b05'
+branch_labels = None
+depends_on = None
+
+KEY_COLUMNS = {
+    'users': ['id'],
+    'products': ['id'],
+    'cart_items': ['id', 'user_id', 'product_id'],
+    'orders': ['id', 'user_id'],
+    'orders_archive': ['id', 'user_id'],
+    'idempotency_keys': ['id', 'user_id'],
+    'outbox_events': ['id'],
+    'sales_daily_product': ['product_id'],
+}
+LOCK_TIMEOUT = '5s'
+
+
+def _shadowed_tables(bind):
+    """Tables whose shadow uuid columns were added by the expand revision"""
+    rows = bind.execute(sa.text(
+        "SELECT table_name, column_name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND data_type = 'uuid'"
+    )).all()
+    uuid_columns = {(table, column) for table, column in rows}
+    return [
+        table for table, columns in KEY_COLUMNS.items()
+        if all((table, f'{column}_uuid') in uuid_columns for column in columns)
+    ]
+
+
+def _is_partitioned(bind, table):
+    return bind.execute(
+        sa.text("SELECT relkind = 'p' FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+        {'table': table}
+    ).scalar()
+
+
+def _key_indexes(bind, table, columns):
+    """Indexes on any of the key columns, with the PK/unique constraint they back"""
+    return bind.execute(sa.text("""
+        SELECT ic.relname AS name, pg_get_indexdef(i.indexrelid) AS definition,
+               con.conname AS constraint_name, pg_get_constraintdef(con.oid) AS constraint_definition
+        FROM pg_index i
+        JOIN pg_class ic ON ic.oid = i.indexrelid
+        LEFT JOIN pg_constraint con
+            ON con.conindid = i.indexrelid AND con.conrelid = i.indrelid AND con.contype IN ('p', 'u')
+        WHERE i.indrelid = CAST(:table AS regclass)
+          AND EXISTS (
+              SELECT 1 FROM pg_attribute a
+              WHERE a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey) AND a.attname = ANY(:columns)
+          )
+    """), {'table': table, 'columns': columns}).all()
+
+
+def _foreign_keys(bind, tables):
+    """Top-level foreign keys declared on the given tables"""
+    return bind.execute(sa.text("""
+        SELECT cl.relname AS table_name, con.conname AS name, pg_get_constraintdef(con.oid) AS definition
+        FROM pg_constraint con
+        JOIN pg_class cl ON cl.oid = con.conrelid
+        WHERE con.contype = 'f' AND con.conparentid = 0 AND cl.relname = ANY(:tables)
+    """), {'tables': tables}).all()
+
+
+def _shadow_index_sql(index, columns):
+    """CREATE INDEX CONCURRENTLY for the same index over the shadow columns"""
+    head, _, tail = index.definition.partition(' USING ')
+    head = head.replace(f' INDEX {index.name} ON ', f' INDEX CONCURRENTLY {index.name}_uuid ON ', 1)
+    tail = re.sub(r'\b(' + '|'.join(columns) + r')\b', r'\1_uuid', tail)
+    return f'{head} USING {tail}'
+
+
+def _upgrade_postgresql(bind):
+    tables = _shadowed_tables(bind)
+    if not tables:
+        return
+
+    # 1. Catch rows the backfill missed and prove the shadows are complete
+    for table in tables:
+        columns = KEY_COLUMNS[table]
+        assignments = ', '.join(f'{column}_uuid = {column}::uuid' for column in columns)
+        missing = ' OR '.join(f'{column}_uuid IS NULL' for column in columns)
+        op.execute(f"UPDATE {table} SET {assignments} WHERE {missing}")
+        for column in columns:
+            op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {table}_{column}_uuid_not_null")
+
+    partitioned = {table for table in tables if _is_partitioned(bind, table)}
+    indexes = {table: _key_indexes(bind, table, KEY_COLUMNS[table]) for table in tables}
+    foreign_keys = _foreign_keys(bind, tables)
+
+    # 2. Build replacement indexes without blocking writes
+    with op.get_context().autocommit_block():
+        for table in tables:
+            if table in partitioned:
+                continue
+            for index in indexes[table]:
+                op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}_uuid")
+                op.execute(_shadow_index_sql(index, KEY_COLUMNS[table]))
+
+    # 3. Swap columns in one short transaction
+    op.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+    for fk in foreign_keys:
+        op.execute(f"ALTER TABLE {fk.table_name} DROP CONSTRAINT {fk.name}")
+
+    for table in tables:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_uuid_sync ON {table}")
+        op.execute(f"DROP FUNCTION IF EXISTS {table}_uuid_sync()")
+        for column in KEY_COLUMNS[table]:
+            op.execute(f"ALTER TABLE {table} DROP COLUMN {column}")
+            op.execute(f"ALTER TABLE {table} RENAME COLUMN {column}_uuid TO {column}")
+            # The validated check lets SET NOT NULL skip the table scan
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL")
+            op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {table}_{column}_uuid_not_null")
+
+        for index in indexes[table]:
+            if table in partitioned:
+                if index.constraint_name:
+                    op.execute(
+                        f"ALTER TABLE {table} ADD CONSTRAINT {index.constraint_name} "
+                        f"{index.constraint_definition}"
+                    )
+                else:
+                    op.execute(index.definition.replace(' ON ONLY ', ' ON ', 1))
+                continue
+            op.execute(f"ALTER INDEX {index.name}_uuid RENAME TO {index.name}")
+            if index.constraint_name:
+                kind = 'PRIMARY KEY' if index.constraint_definition.startswith('PRIMARY KEY') else 'UNIQUE'
+                op.execute(
+                    f"ALTER TABLE {table} ADD CONSTRAINT {index.constraint_name} "
+                    f"{kind} USING INDEX {index.name}"
+                )
+
+    for fk in foreign_keys:
+        # Partitioned tables do not support NOT VALID foreign keys
+        not_valid = '' if fk.table_name in partitioned else ' NOT VALID'
+        op.execute(f"ALTER TABLE {fk.table_name} ADD CONSTRAINT {fk.name} {fk.definition}{not_valid}")
+
+    # 4. Check existing rows against the foreign keys without blocking writes
+    with op.get_context().autocommit_block():
+        for fk in foreign_keys:
+            if fk.table_name not in partitioned:
+                op.execute(f"ALTER TABLE {fk.table_name} VALIDATE CONSTRAINT {fk.name}")
+
+
+def _convert_sqlite(bind, converter, source_type):
+    """Rewrite key columns in place with a Python function registered on the connection"""
+    bind.connection.driver_connection.create_function('uuid_key_convert', 1, converter, deterministic=True)
+    inspector = sa.inspect(bind)
+    for table, columns in KEY_COLUMNS.items():
+        if not inspector.has_table(table):
+            continue
+        for column in columns:
+            op.execute(
+                f"UPDATE {table} SET {column} = uuid_key_convert({column}) "
+                f"WHERE typeof({column}) = '{source_type}'"
+            )
+
+
+def _text_to_blob(value):
+    try:
+        return uuid.UUID(value).bytes
+    except ValueError:
+        return value
+
+
+def _blob_to_text(value):
+    return str(uuid.UUID(bytes=value)) if len(value) == 16 else value
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        _upgrade_postgresql(bind)
+    elif bind.dialect.name == 'sqlite':
+        _convert_sqlite(bind, _text_to_blob, 'text')
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        _convert_sqlite(bind, _blob_to_text, 'blob')
+        return
+    if bind.dialect.name != 'postgresql':
+        return
+
+    # Changing the type rewrites each table, so this runs offline
+    inspector = sa.inspect(bind)
+    tables = [table for table in KEY_COLUMNS if inspector.has_table(table)]
+    foreign_keys = _foreign_keys(bind, tables)
+    for fk in foreign_keys:
+        op.execute(f"ALTER TABLE {fk.table_name} DROP CONSTRAINT {fk.name}")
+    for table in tables:
+        for column in KEY_COLUMNS[table]:
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE VARCHAR(36) USING {column}::text")
+    for fk in foreign_keys:
+        op.execute(f"ALTER TABLE {fk.table_name} ADD CONSTRAINT {fk.name} {fk.definition}")
@@ -0,0 +1,46 @@
+"""Add a lease to in-progress idempotency keys
+
+Revision ID: c2d8f4a6e1b9
+Revises: a6c4e1f8d2b3
+Create Date: 2026-10-19 18:00:00.000000
+
+Keys already in progress get a lease starting now, so a key left behind by
+a dead worker can be taken over once it runs out instead of blocking
+retries until the key's TTL.
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+LEASE_SECONDS = 150
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2d8f4a6e1b9'
+down_revision = 'a6c4e1f8d2b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    # On a fresh database init-db creates the table, with the column, from the models
+    if not inspector.has_table('idempotency_keys'):
+        return
+    if 'locked_until' not in {column['name'] for column in inspector.get_columns('idempotency_keys')}:
+        op.add_column('idempotency_keys', sa.Column('locked_until', sa.DateTime(), nullable=True))
+
+    keys = sa.table('idempotency_keys', sa.column('status', sa.String()), sa.column('locked_until', sa.DateTime()))
+    op.execute(
+        keys.update()
+        .where(keys.c.status == 'in_progress', keys.c.locked_until.is_(None))
+        .values(locked_until=datetime.utcnow() + timedelta(seconds=LEASE_SECONDS))
+    )
+
+
+def downgrade():
+    if not sa.inspect(op.get_bind()).has_table('idempotency_keys'):
+        return
+    with op.batch_alter_table('idempotency_keys') as batch_op:
+        batch_op.drop_column('locked_until')
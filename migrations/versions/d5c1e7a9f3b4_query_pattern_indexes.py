@@ -0,0 +1,126 @@
+"""Composite and partial indexes for the hot query paths
+
+Revision ID: d5c1e7a9f3b4
+Revises: b9e3f5a1c7d2
+Create Date: 2026-10-19 14:00:00.000000
+
+  * orders (user_id, created_at) serves the order history filter and its
+    created_at DESC sort; it replaces idx_order_user.
+  * orders (status, created_at, id) serves status filters and the pending
+    sweeper's keyset walk; it replaces idx_order_status.
+  * products (category, name) and (name), both WHERE is_active, serve the
+    storefront listing with and without a category; idx_product_active
+    (a boolean) is dropped.
+  * cart_items (updated_at) serves the abandoned cart sweep.
+  * idx_cart_user_product duplicates the uq_user_product unique index.
+
+On Postgres every index is built and dropped CONCURRENTLY outside the
+migration transaction. The partitioned orders table cannot do that on the
+parent, so its indexes are created ON ONLY the parent, built concurrently
+on each partition and attached. Check the result with
+`flask explain-hot-queries`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5c1e7a9f3b4'
+down_revision = 'b9e3f5a1c7d2'
+branch_labels = None
+depends_on = None
+
+NEW_INDEXES = [
+    ('idx_order_user_created', 'orders', ['user_id', 'created_at'], None),
+    ('idx_order_status_created', 'orders', ['status', 'created_at', 'id'], None),
+    ('idx_product_active_category_name', 'products', ['category', 'name'], 'is_active'),
+    ('idx_product_active_name', 'products', ['name'], 'is_active'),
+    ('idx_cart_updated', 'cart_items', ['updated_at'], None),
+]
+OLD_INDEXES = [
+    ('idx_order_user', 'orders', ['user_id']),
+    ('idx_order_status', 'orders', ['status']),
+    ('idx_product_active', 'products', ['is_active']),
+    ('idx_cart_user_product', 'cart_items', ['user_id', 'product_id']),
+]
+
+
+def _existing_indexes(bind, table):
+    """Index names on ``table``, or None when the table does not exist yet.
+
+    On a fresh database `flask init-db` creates the tables, with these
+    indexes, from the models; there is nothing for this revision to do.
+    """
+    inspector = sa.inspect(bind)
+    if not inspector.has_table(table):
+        return None
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def _partitions(bind, table):
+    """Partition names when ``table`` is a partitioned Postgres table, else None"""
+    partitioned = bind.execute(sa.text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :table"
+    ), {'table': table}).scalar()
+    if not partitioned:
+        return None
+    return bind.execute(sa.text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table ORDER BY c.relname"
+    ), {'table': table}).scalars().all()
+
+
+def _create_partitioned_index(name, table, columns, partitions):
+    """Build a partitioned index without locking writes: per-partition concurrent builds, then attach"""
+    column_list = ', '.join(columns)
+    op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} ({column_list})")
+    for partition in partitions:
+        child = f"{partition}_{name}"[:63]
+        op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {child} ON {partition} ({column_list})")
+        op.execute(f"ALTER INDEX {name} ATTACH PARTITION {child}")
+
+
+def _create_index(bind, name, table, columns, where):
+    existing = _existing_indexes(bind, table)
+    if existing is None or name in existing:
+        return
+    if bind.dialect.name == 'postgresql':
+        partitions = _partitions(bind, table)
+        if partitions is not None:
+            _create_partitioned_index(name, table, columns, partitions)
+            return
+    op.create_index(
+        name, table, columns,
+        postgresql_concurrently=True,
+        postgresql_where=sa.text(where) if where else None,
+        sqlite_where=sa.text(f'{where} = 1') if where else None
+    )
+
+
+def _drop_index(bind, name, table):
+    existing = _existing_indexes(bind, table)
+    if existing is None or name not in existing:
+        return
+    # DROP INDEX CONCURRENTLY does not work on partitioned indexes
+    concurrently = bind.dialect.name == 'postgresql' and _partitions(bind, table) is None
+    op.drop_index(name, table_name=table, postgresql_concurrently=concurrently)
+
+
+def upgrade():
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in NEW_INDEXES:
+            _create_index(bind, name, table, columns, where)
+        for name, table, _ in OLD_INDEXES:
+            _drop_index(bind, name, table)
+
+
+def downgrade():
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        for name, table, columns in OLD_INDEXES:
+            _create_index(bind, name, table, columns, None)
+        for name, table, _, _ in NEW_INDEXES:
+            _drop_index(bind, name, table)
@@ -0,0 +1,38 @@
+"""Add product_changes log for the live product feed
+
+Revision ID: e8f2b6d4a1c7
+Revises: d5c1e7a9f3b4
+Create Date: 2026-10-19 15:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from ids import UUIDKey
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8f2b6d4a1c7'
+down_revision = 'd5c1e7a9f3b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('product_changes'):
+        return
+    op.create_table(
+        'product_changes',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+        sa.Column('product_id', UUIDKey(), nullable=False),
+        sa.Column('price', sa.Numeric(10, 2), nullable=False),
+        sa.Column('stock_quantity', sa.Integer(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_product_changes_created', 'product_changes', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('idx_product_changes_created', table_name='product_changes')
+    op.drop_table('product_changes')
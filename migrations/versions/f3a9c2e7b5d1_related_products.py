@@ -0,0 +1,47 @@
+"""Add co-occurrence tables for "frequently bought together"
+
+Revision ID: f3a9c2e7b5d1
+Revises: e8f2b6d4a1c7
+Create Date: 2026-10-19 16:00:00.000000
+
+Populate them with `flask rebuild-related-products`; the outbox worker
+keeps them current from then on.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from ids import UUIDKey
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9c2e7b5d1'
+down_revision = 'e8f2b6d4a1c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('product_pair_counts'):
+        op.create_table(
+            'product_pair_counts',
+            sa.Column('product_id', UUIDKey(), nullable=False),
+            sa.Column('related_id', UUIDKey(), nullable=False),
+            sa.Column('count', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('product_id', 'related_id')
+        )
+        op.create_index('idx_pair_product_count', 'product_pair_counts', ['product_id', 'count', 'related_id'])
+    if not inspector.has_table('product_related'):
+        op.create_table(
+            'product_related',
+            sa.Column('product_id', UUIDKey(), nullable=False),
+            sa.Column('neighbours', sa.Text(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('product_id')
+        )
+
+
+def downgrade():
+    op.drop_table('product_related')
+    op.drop_index('idx_pair_product_count', table_name='product_pair_counts')
+    op.drop_table('product_pair_counts')
@@ -1,6 +1,13 @@
 from .user import User
 from .cart import CartItem
 from .order import Order
+from .archive import ArchivedOrder
 from .product import Product
+from .product_change import ProductChange
+from .idempotency import IdempotencyKey
+from .outbox import AppliedEvent, OutboxEvent
+from .sales import SalesDaily, SalesDailyProduct, SalesDailyCategory
+from .recommendation import ProductPairCount, ProductRelated
+from .category import Category, CategoryClosure, ProductCategory
 
-__all__ = ['User', 'CartItem', 'Order', 'Product'] 
\ No newline at end of file
+__all__ = ['User', 'CartItem', 'Order', 'ArchivedOrder', 'Product', 'ProductChange', 'IdempotencyKey', 'OutboxEvent', 'AppliedEvent', 'SalesDaily', 'SalesDailyProduct', 'SalesDailyCategory', 'ProductPairCount', 'ProductRelated', 'Category', 'CategoryClosure', 'ProductCategory'] 
\ No newline at end of file
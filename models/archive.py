@@ -0,0 +1,47 @@
+from datetime import datetime
+import json
+import zlib
+from database import db
+from ids import UUIDKey
+
+class ArchivedOrder(db.Model):
+    """Cold order moved out of the orders table, stored as compressed JSON"""
+    
+    __tablename__ = 'orders_archive'
+    
+    id = db.Column(UUIDKey, primary_key=True)
+    user_id = db.Column(UUIDKey, nullable=False)
+    status = db.Column(db.String(50), nullable=False)
+    total_amount = db.Column(db.Numeric(10, 2), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # zlib-compressed JSON of Order.to_dict()
+    payload = db.Column(db.LargeBinary, nullable=False)
+
+    # Indexes
+    __table_args__ = (
+        db.Index('idx_order_archive_user_created', 'user_id', 'created_at'),
+    )
+
+    @classmethod
+    def row_from_order(cls, order):
+        """Build an insert row for an Order"""
+        return {
+            'id': order.id,
+            'user_id': order.user_id,
+            'status': order.status,
+            'total_amount': order.total_amount,
+            'created_at': order.created_at,
+            'archived_at': datetime.utcnow(),
+            'payload': zlib.compress(json.dumps(order.to_dict(), separators=(',', ':')).encode())
+        }
+
+    def to_dict(self):
+        """Convert archived order to the same shape as Order.to_dict()"""
+        data = json.loads(zlib.decompress(self.payload))
+        data['archived'] = True
+        return data
+
+    def __repr__(self):
+        return f'<ArchivedOrder {self.id}: ${self.total_amount} ({self.status})>'
@@ -1,15 +1,15 @@
 from datetime import datetime
-import uuid
 from database import db
+from ids import UUIDKey, new_id
 
 class CartItem(db.Model):
     """Cart item model for user shopping carts"""
     
     __tablename__ = 'cart_items'
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
-    product_id = db.Column(db.String(36), db.ForeignKey('products.id'), nullable=False)
+    id = db.Column(UUIDKey, primary_key=True, default=new_id)
+    user_id = db.Column(UUIDKey, db.ForeignKey('users.id'), nullable=False)
+    product_id = db.Column(UUIDKey, db.ForeignKey('products.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False, default=1)
     added_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -19,7 +19,7 @@ class CartItem(db.Model):
 
     # Indexes
     __table_args__ = (
-        db.Index('idx_cart_user_product', 'user_id', 'product_id'),
+        db.Index('idx_cart_updated', 'updated_at'),
         db.UniqueConstraint('user_id', 'product_id', name='uq_user_product'),
     )
 
@@ -0,0 +1,71 @@
+from datetime import datetime
+from database import db
+from ids import UUIDKey, new_id
+
+class Category(db.Model):
+    """Node in the category tree; ``path`` is the full name, e.g. ``Electronics > Audio``"""
+
+    __tablename__ = 'categories'
+
+    id = db.Column(UUIDKey, primary_key=True, default=new_id)
+    name = db.Column(db.String(100), nullable=False)
+    parent_id = db.Column(UUIDKey, db.ForeignKey('categories.id'), nullable=True)
+    path = db.Column(db.String(100), nullable=False, unique=True)
+    depth = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Indexes
+    __table_args__ = (
+        db.Index('idx_category_parent', 'parent_id'),
+    )
+
+    def to_dict(self):
+        """Convert category to dictionary for API responses"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'parent_id': self.parent_id,
+            'path': self.path,
+            'depth': self.depth
+        }
+
+    def __repr__(self):
+        return f'<Category {self.path}>'
+
+
+class CategoryClosure(db.Model):
+    """Every ancestor/descendant pair in the category tree, including each node with itself"""
+
+    __tablename__ = 'category_closure'
+
+    ancestor_id = db.Column(UUIDKey, db.ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True)
+    descendant_id = db.Column(UUIDKey, db.ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True)
+    depth = db.Column(db.Integer, nullable=False)
+
+    # Indexes
+    __table_args__ = (
+        # Ancestors of a node, for breadcrumbs and re-parenting
+        db.Index('idx_category_closure_descendant', 'descendant_id', 'ancestor_id'),
+    )
+
+    def __repr__(self):
+        return f'<CategoryClosure {self.ancestor_id} -> {self.descendant_id} ({self.depth})>'
+
+
+class ProductCategory(db.Model):
+    """Link from a product to a category it is listed in"""
+
+    __tablename__ = 'product_categories'
+
+    # Key order serves the per-category counts: category first, then its products
+    category_id = db.Column(UUIDKey, db.ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True)
+    product_id = db.Column(UUIDKey, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+
+    # Indexes
+    __table_args__ = (
+        # Covers the subtree filter's per-product lookup of its categories
+        db.Index('idx_product_category_product_category', 'product_id', 'category_id'),
+    )
+
+    def __repr__(self):
+        return f'<ProductCategory {self.product_id} in {self.category_id}>'
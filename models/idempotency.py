@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+from database import db
+from ids import UUIDKey, new_id
+
+class IdempotencyKey(db.Model):
+    """Stored outcome of a POST made with an Idempotency-Key header"""
+    
+    __tablename__ = 'idempotency_keys'
+    
+    id = db.Column(UUIDKey, primary_key=True, default=new_id)
+    user_id = db.Column(UUIDKey, nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    request_fingerprint = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='in_progress')
+    response_status = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    response_mimetype = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    # While in progress, the owning request's lease; a later request may take the key over after it
+    locked_until = db.Column(db.DateTime)
+
+    # Indexes
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='uq_idempotency_user_key'),
+        db.Index('idx_idempotency_expires', 'expires_at'),
+    )
+
+    # Status constants
+    STATUS_IN_PROGRESS = 'in_progress'
+    STATUS_COMPLETED = 'completed'
+
+    @classmethod
+    def start(cls, user_id, key, request_fingerprint, ttl_seconds, lease_seconds):
+        """Create an in-progress record expiring after ttl_seconds, leased for lease_seconds"""
+        now = datetime.utcnow()
+        return cls(
+            user_id=user_id,
+            key=key,
+            request_fingerprint=request_fingerprint,
+            status=cls.STATUS_IN_PROGRESS,
+            expires_at=now + timedelta(seconds=ttl_seconds),
+            locked_until=now + timedelta(seconds=lease_seconds)
+        )
+
+    @property
+    def is_completed(self):
+        """Check if the original request has finished"""
+        return self.status == self.STATUS_COMPLETED
+
+    @property
+    def is_expired(self):
+        """Check if the stored response is past its TTL"""
+        return self.expires_at <= datetime.utcnow()
+
+    @property
+    def is_abandoned(self):
+        """Check if an in-progress request outlived its lease, i.e. its worker died"""
+        return not self.is_completed and self.locked_until is not None and self.locked_until <= datetime.utcnow()
+
+    def mark_completed(self, status_code, body, mimetype):
+        """Store the final response"""
+        self.status = self.STATUS_COMPLETED
+        self.locked_until = None
+        self.response_status = status_code
+        self.response_body = body
+        self.response_mimetype = mimetype
+
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key} ({self.status})>'
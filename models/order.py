@@ -1,14 +1,14 @@
 from datetime import datetime
-import uuid
 from database import db
+from ids import UUIDKey, new_id
 
 class Order(db.Model):
     """Order model for completed purchases"""
     
     __tablename__ = 'orders'
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    id = db.Column(UUIDKey, primary_key=True, default=new_id)
+    user_id = db.Column(UUIDKey, db.ForeignKey('users.id'), nullable=False)
     total_amount = db.Column(db.Numeric(10, 2), nullable=False)
     status = db.Column(db.String(50), nullable=False, default='pending')
     stripe_payment_intent_id = db.Column(db.String(255), nullable=True)
@@ -20,8 +20,9 @@ class Order(db.Model):
 
     # Indexes
     __table_args__ = (
-        db.Index('idx_order_user', 'user_id'),
-        db.Index('idx_order_status', 'status'),
+        db.Index('idx_order_user_created', 'user_id', 'created_at'),
+        # Status filters, and the pending-order sweeper's (created_at, id) keyset walk
+        db.Index('idx_order_status_created', 'status', 'created_at', 'id'),
         db.Index('idx_order_payment_intent', 'stripe_payment_intent_id'),
         db.Index('idx_order_created', 'created_at'),
     )
@@ -48,6 +49,15 @@ class Order(db.Model):
             'items': self.items
         }
 
+    def to_event_payload(self):
+        """Compact payload for outbox events about this order"""
+        return {
+            'order_id': self.id,
+            'user_id': self.user_id,
+            'status': self.status,
+            'total_amount': float(self.total_amount)
+        }
+
     @property
     def is_completed(self):
         """Check if order is completed"""
@@ -68,5 +78,10 @@ class Order(db.Model):
         self.status = self.STATUS_FAILED
         self.updated_at = datetime.utcnow()
 
+    def mark_refunded(self):
+        """Mark order as refunded"""
+        self.status = self.STATUS_REFUNDED
+        self.updated_at = datetime.utcnow()
+
     def __repr__(self):
         return f'<Order {self.id}: ${self.total_amount} ({self.status})>' 
\ No newline at end of file
@@ -0,0 +1,67 @@
+from datetime import datetime
+import json
+from database import db
+from ids import UUIDKey, new_id
+
+class OutboxEvent(db.Model):
+    """Side effect recorded in the same transaction as the change that caused it"""
+    
+    __tablename__ = 'outbox_events'
+    
+    id = db.Column(UUIDKey, primary_key=True, default=new_id)
+    event_type = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    available_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+
+    # Indexes
+    __table_args__ = (
+        db.Index('idx_outbox_status_available', 'status', 'available_at'),
+    )
+
+    # Status constants
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    @property
+    def data(self):
+        """Decoded event payload"""
+        return json.loads(self.payload)
+
+    def to_dict(self):
+        """Convert event to dictionary for API responses"""
+        return {
+            'id': self.id,
+            'event_type': self.event_type,
+            'payload': self.data,
+            'status': self.status,
+            'attempts': self.attempts,
+            'available_at': self.available_at.isoformat(),
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat(),
+            'processed_at': self.processed_at.isoformat() if self.processed_at else None
+        }
+
+    def __repr__(self):
+        return f'<OutboxEvent {self.event_type} ({self.status})>'
+
+
+class AppliedEvent(db.Model):
+    """Marker that a handler has applied one event about a subject, so redeliveries are skipped"""
+
+    __tablename__ = 'outbox_applied'
+
+    consumer = db.Column(db.String(50), primary_key=True)
+    event_type = db.Column(db.String(100), primary_key=True)
+    subject_id = db.Column(UUIDKey, primary_key=True)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<AppliedEvent {self.consumer} {self.event_type} {self.subject_id}>'
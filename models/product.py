@@ -1,13 +1,13 @@
 from datetime import datetime
-import uuid
 from database import db
+from ids import UUIDKey, new_id
 
 class Product(db.Model):
     """Product model for storing shop products"""
     
     __tablename__ = 'products'
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(UUIDKey, primary_key=True, default=new_id)
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     price = db.Column(db.Numeric(10, 2), nullable=False)
@@ -21,8 +21,12 @@ class Product(db.Model):
     # Indexes
     __table_args__ = (
         db.Index('idx_product_category', 'category'),
-        db.Index('idx_product_active', 'is_active'),
         db.Index('idx_product_name', 'name'),
+        # Storefront listing: active products, optionally by category, sorted by name
+        db.Index('idx_product_active_category_name', 'category', 'name',
+                 postgresql_where=db.text('is_active'), sqlite_where=db.text('is_active = 1')),
+        db.Index('idx_product_active_name', 'name',
+                 postgresql_where=db.text('is_active'), sqlite_where=db.text('is_active = 1')),
     )
 
     def to_dict(self):
@@ -0,0 +1,33 @@
+from datetime import datetime
+from database import db
+from ids import UUIDKey
+
+class ProductChange(db.Model):
+    """Append-only log of product stock/price changes, read by the SSE feed"""
+    
+    __tablename__ = 'product_changes'
+    
+    # Sequential so it doubles as the SSE event ID clients resume from
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    product_id = db.Column(UUIDKey, nullable=False)
+    price = db.Column(db.Numeric(10, 2), nullable=False)
+    stock_quantity = db.Column(db.Integer, nullable=False)
+    is_active = db.Column(db.Boolean, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Indexes
+    __table_args__ = (
+        db.Index('idx_product_changes_created', 'created_at'),
+    )
+
+    def to_event(self):
+        """Compact delta sent to stream subscribers"""
+        return {
+            'id': self.product_id,
+            'price': float(self.price),
+            'stock': self.stock_quantity,
+            'active': self.is_active
+        }
+
+    def __repr__(self):
+        return f'<ProductChange {self.id}: {self.product_id}>'
@@ -0,0 +1,41 @@
+from datetime import datetime
+import json
+from database import db
+from ids import UUIDKey
+
+class ProductPairCount(db.Model):
+    """Number of completed orders containing both products, stored in both directions"""
+
+    __tablename__ = 'product_pair_counts'
+
+    product_id = db.Column(UUIDKey, primary_key=True)
+    related_id = db.Column(UUIDKey, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    # Indexes
+    __table_args__ = (
+        # Serves the top-K refresh for one product without a sort
+        db.Index('idx_pair_product_count', 'product_id', 'count', 'related_id'),
+    )
+
+    def __repr__(self):
+        return f'<ProductPairCount {self.product_id} -> {self.related_id}: {self.count}>'
+
+
+class ProductRelated(db.Model):
+    """Precomputed top-K "frequently bought together" list for one product"""
+
+    __tablename__ = 'product_related'
+
+    product_id = db.Column(UUIDKey, primary_key=True)
+    # JSON list of {"product_id": ..., "count": ...}, highest count first
+    neighbours = db.Column(db.Text, nullable=False, default='[]')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def data(self):
+        """Decoded neighbour list"""
+        return json.loads(self.neighbours)
+
+    def __repr__(self):
+        return f'<ProductRelated {self.product_id}>'
@@ -0,0 +1,85 @@
+from datetime import datetime
+from database import db
+from ids import UUIDKey
+
+class SalesDaily(db.Model):
+    """Sales rollup per day, maintained incrementally from order events"""
+    
+    __tablename__ = 'sales_daily'
+    
+    day = db.Column(db.Date, primary_key=True)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        """Convert rollup row to dictionary for API responses"""
+        return {
+            'day': self.day.isoformat(),
+            'units': self.units,
+            'revenue': float(self.revenue),
+            'order_count': self.order_count
+        }
+
+    def __repr__(self):
+        return f'<SalesDaily {self.day}: ${self.revenue}>'
+
+
+class SalesDailyProduct(db.Model):
+    """Sales rollup per day and product, maintained incrementally from order events"""
+    
+    __tablename__ = 'sales_daily_product'
+    
+    day = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(UUIDKey, primary_key=True)
+    category = db.Column(db.String(100))
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Indexes
+    __table_args__ = (
+        db.Index('idx_sales_product_product_day', 'product_id', 'day'),
+    )
+
+    def to_dict(self):
+        """Convert rollup row to dictionary for API responses"""
+        return {
+            'day': self.day.isoformat(),
+            'product_id': self.product_id,
+            'category': self.category,
+            'units': self.units,
+            'revenue': float(self.revenue),
+            'order_count': self.order_count
+        }
+
+    def __repr__(self):
+        return f'<SalesDailyProduct {self.day} {self.product_id}: ${self.revenue}>'
+
+
+class SalesDailyCategory(db.Model):
+    """Sales rollup per day and category, maintained alongside SalesDaily"""
+    
+    __tablename__ = 'sales_daily_category'
+    
+    day = db.Column(db.Date, primary_key=True)
+    category = db.Column(db.String(100), primary_key=True)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        """Convert rollup row to dictionary for API responses"""
+        return {
+            'day': self.day.isoformat(),
+            'category': self.category,
+            'units': self.units,
+            'revenue': float(self.revenue),
+            'order_count': self.order_count
+        }
+
+    def __repr__(self):
+        return f'<SalesDailyCategory {self.day} {self.category}: ${self.revenue}>'
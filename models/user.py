@@ -1,14 +1,14 @@
 from datetime import datetime
-import uuid
 from werkzeug.security import generate_password_hash, check_password_hash
 from database import db
+from ids import UUIDKey, new_id
 
 class User(db.Model):
     """User model for authentication and account management"""
     
     __tablename__ = 'users'
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(UUIDKey, primary_key=True, default=new_id)
     email = db.Column(db.String(255), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
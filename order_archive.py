@@ -0,0 +1,144 @@
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+
+from database import db
+from models import ArchivedOrder, Order
+
+logger = logging.getLogger(__name__)
+
+ORDER_ARCHIVE_AFTER_DAYS = int(os.environ.get('ORDER_ARCHIVE_AFTER_DAYS', 365))
+ORDER_ARCHIVE_BATCH_SIZE = int(os.environ.get('ORDER_ARCHIVE_BATCH_SIZE', 500))
+ORDER_PARTITION_MONTHS_AHEAD = int(os.environ.get('ORDER_PARTITION_MONTHS_AHEAD', 3))
+
+# Pending orders are still live and are never archived
+ARCHIVABLE_STATUSES = [
+    Order.STATUS_COMPLETED, Order.STATUS_FAILED, Order.STATUS_CANCELLED, Order.STATUS_REFUNDED
+]
+
+
+def month_start(value):
+    """First day of the month containing ``value``"""
+    return date(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    """First day of the month ``months`` after ``value``'s month"""
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    """Name of the monthly orders partition, e.g. orders_p2024_01"""
+    return f'orders_p{month.year:04d}_{month.month:02d}'
+
+
+def is_partitioned():
+    """Check if orders is a partitioned Postgres table"""
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return False
+    return bool(db.session.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'orders'"
+    )).scalar())
+
+
+def ensure_partitions(months_ahead=ORDER_PARTITION_MONTHS_AHEAD):
+    """Create monthly partitions from this month through ``months_ahead``; returns created names"""
+    if not is_partitioned():
+        return []
+
+    created = []
+    current = month_start(datetime.utcnow())
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(month)
+        exists = db.session.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar()
+        if exists:
+            continue
+        db.session.execute(text(
+            f"CREATE TABLE {name} PARTITION OF orders "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        ))
+        created.append(name)
+    db.session.commit()
+    return created
+
+
+def drop_empty_partitions(before):
+    """Drop monthly partitions that end on or before ``before`` and hold no rows"""
+    if not is_partitioned():
+        return []
+
+    dropped = []
+    names = db.session.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'orders' AND c.relname LIKE 'orders_p%' ORDER BY c.relname"
+    )).scalars().all()
+    for name in names:
+        try:
+            year, month = int(name[8:12]), int(name[13:15])
+        except ValueError:
+            continue
+        if add_months(date(year, month, 1), 1) > before:
+            continue
+        if db.session.execute(text(f"SELECT 1 FROM {name} LIMIT 1")).scalar():
+            continue
+        db.session.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    db.session.commit()
+    return dropped
+
+
+def archive_orders(before, batch_size=ORDER_ARCHIVE_BATCH_SIZE, pause=0.0):
+    """Move finished orders created before ``before`` into orders_archive.
+
+    Each batch copies rows into the archive and deletes them from orders in
+    one short transaction, so an interrupted run never loses or duplicates
+    an order. Emptied monthly partitions are dropped afterwards on Postgres.
+    """
+    stats = {'archived': 0, 'batches': 0, 'dropped_partitions': []}
+
+    while True:
+        orders = Order.query.filter(
+            Order.created_at < before,
+            Order.status.in_(ARCHIVABLE_STATUSES)
+        ).order_by(Order.created_at).limit(batch_size).all()
+        if not orders:
+            db.session.rollback()
+            break
+
+        db.session.execute(
+            ArchivedOrder.__table__.insert(),
+            [ArchivedOrder.row_from_order(order) for order in orders]
+        )
+        ids = [order.id for order in orders]
+        Order.query.filter(Order.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        db.session.expunge_all()
+
+        stats['archived'] += len(ids)
+        stats['batches'] += 1
+        if len(ids) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    stats['dropped_partitions'] = drop_empty_partitions(month_start(before))
+    logger.info(f"Archived {stats['archived']} orders created before {before.isoformat()}")
+    return stats
+
+
+def default_horizon():
+    """Cutoff datetime for archival based on ORDER_ARCHIVE_AFTER_DAYS"""
+    return datetime.utcnow() - timedelta(days=ORDER_ARCHIVE_AFTER_DAYS)
+
+
+def archived_orders_for_user(user_id):
+    """Archived orders for a user, newest first"""
+    return ArchivedOrder.query.filter_by(user_id=user_id).order_by(ArchivedOrder.created_at.desc()).all()
@@ -0,0 +1,152 @@
+import csv
+import heapq
+import io
+import json
+import os
+import zlib
+from operator import itemgetter
+
+from sqlalchemy import null, select
+
+from database import db
+from models import ArchivedOrder, Order, User
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+EXPORT_YIELD_PER = int(os.environ.get('EXPORT_YIELD_PER', 1000))
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+ORDER_COLUMNS = [
+    'id', 'user_id', 'user_email', 'status', 'total_amount',
+    'stripe_payment_intent_id', 'created_at', 'updated_at'
+]
+ITEM_COLUMNS = ['product_id', 'product_name', 'price', 'quantity', 'item_total']
+
+
+def _export_rows(model, columns, start, end, status):
+    """Stream ``columns`` of ``model`` joined to the user's email, in (created_at, id) order"""
+    query = select(model.created_at, model.id, User.email, *columns).outerjoin(User, User.id == model.user_id)
+    if start:
+        query = query.where(model.created_at >= start)
+    if end:
+        query = query.where(model.created_at < end)
+    if status:
+        query = query.where(model.status == status)
+    query = query.order_by(model.created_at, model.id).execution_options(yield_per=EXPORT_YIELD_PER)
+    return db.session.execute(query)
+
+
+def iter_orders(start=None, end=None, status=None, include_items=False):
+    """Yield orders, live and archived, as plain dicts in created_at order without loading them all.
+
+    Rows are fetched through a server-side cursor in batches of
+    EXPORT_YIELD_PER, selecting columns rather than ORM entities so nothing
+    accumulates in the session identity map. Archived orders are decoded from
+    their payload and merged in, so archiving does not drop them from exports.
+    """
+    live = (
+        (created_at, order_id, {
+            'user_id': user_id,
+            'user_email': email,
+            'status': order_status,
+            'total_amount': float(total_amount),
+            'stripe_payment_intent_id': payment_intent_id,
+            'created_at': created_at.isoformat() if created_at else None,
+            'updated_at': updated_at.isoformat() if updated_at else None,
+            'items': items,
+        })
+        for created_at, order_id, email, user_id, order_status, total_amount, payment_intent_id, updated_at, items
+        in _export_rows(Order, [
+            Order.user_id, Order.status, Order.total_amount, Order.stripe_payment_intent_id,
+            Order.updated_at, Order.items if include_items else null()
+        ], start, end, status)
+    )
+    archived = (
+        (created_at, order_id, _archived_order(email, json.loads(zlib.decompress(payload))))
+        for created_at, order_id, email, payload
+        in _export_rows(ArchivedOrder, [ArchivedOrder.payload], start, end, status)
+    )
+
+    # Archived orders are older, but the export window can straddle the cutoff
+    for _, order_id, fields in heapq.merge(live, archived, key=itemgetter(0, 1)):
+        order = {'id': order_id, **fields}
+        items = order.pop('items')
+        if include_items:
+            order['items'] = [
+                {
+                    'product_id': item.get('product_id'),
+                    'product_name': item.get('product_name'),
+                    'price': item.get('price'),
+                    'quantity': item.get('quantity'),
+                    'item_total': item.get('total'),
+                }
+                for item in json.loads(items or '[]')
+            ]
+        yield order
+
+
+def _archived_order(email, data):
+    """Export fields for an archived order from its Order.to_dict() payload"""
+    return {
+        'user_id': data.get('user_id'),
+        'user_email': email,
+        'status': data.get('status'),
+        'total_amount': data.get('total_amount'),
+        'stripe_payment_intent_id': data.get('stripe_payment_intent_id'),
+        'created_at': data.get('created_at'),
+        'updated_at': data.get('updated_at'),
+        'items': data.get('items'),
+    }
+
+
+def _chunked(lines):
+    """Group small strings into larger chunks to cut per-write overhead"""
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def _ndjson_lines(orders):
+    for order in orders:
+        yield json.dumps(order, separators=(',', ':')) + '\n'
+
+
+def _csv_lines(orders, include_items):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writerow(ORDER_COLUMNS + (ITEM_COLUMNS if include_items else []))
+    yield flush()
+    for order in orders:
+        base = [order[column] for column in ORDER_COLUMNS]
+        if include_items:
+            # One row per line item, repeating the order columns
+            for item in order['items'] or [{}]:
+                writer.writerow(base + [item.get(column) for column in ITEM_COLUMNS])
+        else:
+            writer.writerow(base)
+        yield flush()
+
+
+def generate_export(export_format, start=None, end=None, status=None, include_items=False):
+    """Yield the export body in chunks for the given format"""
+    orders = iter_orders(start=start, end=end, status=status, include_items=include_items)
+    if export_format == 'csv':
+        return _chunked(_csv_lines(orders, include_items))
+    return _chunked(_ndjson_lines(orders))
@@ -0,0 +1,154 @@
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from models import AppliedEvent, OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 50))
+OUTBOX_LEASE_SECONDS = int(os.environ.get('OUTBOX_LEASE_SECONDS', 300))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 8))
+OUTBOX_BACKOFF_BASE = float(os.environ.get('OUTBOX_BACKOFF_BASE', 2))
+OUTBOX_BACKOFF_MAX = float(os.environ.get('OUTBOX_BACKOFF_MAX', 600))
+
+_handlers = {}
+
+
+def register_handler(event_type):
+    """Register a function to run for each event of ``event_type``.
+
+    Handlers receive the decoded payload and run inside the transaction that
+    marks the event done, so their database writes commit atomically with it.
+    """
+    def decorator(func):
+        _handlers.setdefault(event_type, []).append(func)
+        return func
+    return decorator
+
+
+def enqueue(event_type, payload):
+    """Add an event to the current session; it is committed with the caller's transaction"""
+    event = OutboxEvent(event_type=event_type, payload=json.dumps(payload))
+    db.session.add(event)
+    return event
+
+
+def first_delivery(consumer, event_type, subject_id):
+    """Record that ``consumer`` applied ``event_type`` for ``subject_id``; False if it already had.
+
+    Delivery is at least once, so handlers whose writes are not idempotent
+    (counter increments) call this first. The marker commits or rolls back
+    with the handler's own writes.
+    """
+    try:
+        with db.session.begin_nested():
+            db.session.add(AppliedEvent(consumer=consumer, event_type=event_type, subject_id=subject_id))
+    except IntegrityError:
+        logger.info(f"Skipping duplicate {event_type} for {subject_id} in {consumer}")
+        return False
+    return True
+
+
+def backoff_delay(attempts):
+    """Exponential backoff with jitter for the given attempt count"""
+    delay = min(OUTBOX_BACKOFF_BASE * (2 ** (attempts - 1)), OUTBOX_BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def claim_batch(batch_size=OUTBOX_BATCH_SIZE):
+    """Lease up to ``batch_size`` due events; returns their IDs.
+
+    Rows are selected with ``FOR UPDATE SKIP LOCKED`` so concurrent workers
+    never claim the same event. Events whose lease ran out (a worker died
+    mid-batch) are claimed again. Every claim counts as an attempt, so an
+    event that keeps killing its worker still fails after OUTBOX_MAX_ATTEMPTS.
+    """
+    now = datetime.utcnow()
+    events = OutboxEvent.query.filter(
+        or_(
+            and_(OutboxEvent.status == OutboxEvent.STATUS_PENDING, OutboxEvent.available_at <= now),
+            and_(OutboxEvent.status == OutboxEvent.STATUS_PROCESSING, OutboxEvent.locked_until < now),
+        )
+    ).order_by(OutboxEvent.available_at).limit(batch_size).with_for_update(skip_locked=True).all()
+
+    locked_until = now + timedelta(seconds=OUTBOX_LEASE_SECONDS)
+    claimed = []
+    for event in events:
+        if event.status == OutboxEvent.STATUS_PROCESSING:
+            event.last_error = 'Lease expired before the worker finished'
+            if event.attempts >= OUTBOX_MAX_ATTEMPTS:
+                event.status = OutboxEvent.STATUS_FAILED
+                event.locked_until = None
+                logger.error(f"Outbox event {event.id} ({event.event_type}) failed permanently: lease expired")
+                continue
+        event.attempts += 1
+        event.status = OutboxEvent.STATUS_PROCESSING
+        event.locked_until = locked_until
+        claimed.append(event.id)
+    db.session.commit()
+    return claimed
+
+
+def process_event(event_id):
+    """Run handlers for one claimed event; returns True on success"""
+    event = db.session.get(OutboxEvent, event_id)
+    if event is None or event.status != OutboxEvent.STATUS_PROCESSING:
+        return False
+
+    try:
+        payload = event.data
+        for handler in _handlers.get(event.event_type, []):
+            handler(payload)
+        event.status = OutboxEvent.STATUS_DONE
+        event.processed_at = datetime.utcnow()
+        event.locked_until = None
+        db.session.commit()
+        return True
+    except Exception as e:
+        db.session.rollback()
+        event = db.session.get(OutboxEvent, event_id)
+        event.last_error = str(e)[:2000]
+        event.locked_until = None
+        if event.attempts >= OUTBOX_MAX_ATTEMPTS:
+            event.status = OutboxEvent.STATUS_FAILED
+            logger.error(f"Outbox event {event_id} ({event.event_type}) failed permanently: {e}")
+        else:
+            event.status = OutboxEvent.STATUS_PENDING
+            event.available_at = datetime.utcnow() + timedelta(seconds=backoff_delay(event.attempts))
+            logger.warning(f"Outbox event {event_id} ({event.event_type}) failed, attempt {event.attempts}: {e}")
+        db.session.commit()
+        return False
+
+
+def run_batch(batch_size=OUTBOX_BATCH_SIZE):
+    """Claim and process one batch; returns (claimed, succeeded)"""
+    event_ids = claim_batch(batch_size)
+    succeeded = sum(1 for event_id in event_ids if process_event(event_id))
+    return len(event_ids), succeeded
+
+
+def run_worker(batch_size=OUTBOX_BATCH_SIZE, poll_interval=1.0, once=False):
+    """Process events until interrupted, sleeping when the outbox is empty"""
+    logger.info(f"Outbox worker started (batch size {batch_size})")
+    while True:
+        try:
+            claimed, succeeded = run_batch(batch_size)
+        except Exception as e:
+            logger.error(f"Outbox batch error: {e}")
+            db.session.rollback()
+            claimed = 0
+        else:
+            if claimed:
+                logger.info(f"Outbox processed {succeeded}/{claimed} events")
+        if once and claimed < batch_size:
+            return
+        if claimed < batch_size:
+            time.sleep(poll_interval)
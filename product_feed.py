@@ -0,0 +1,233 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event, insert, inspect, select
+from sqlalchemy.orm import Session
+
+from database import db
+from models import Product, ProductChange
+
+logger = logging.getLogger(__name__)
+
+TRACKED_ATTRIBUTES = ('stock_quantity', 'price', 'is_active')
+PRODUCT_STREAM_POLL_INTERVAL = float(os.environ.get('PRODUCT_STREAM_POLL_INTERVAL', 1.0))
+PRODUCT_STREAM_MAX_SECONDS = int(os.environ.get('PRODUCT_STREAM_MAX_SECONDS', 60))
+PRODUCT_STREAM_HEARTBEAT = int(os.environ.get('PRODUCT_STREAM_HEARTBEAT', 15))
+PRODUCT_CHANGE_RETENTION_HOURS = int(os.environ.get('PRODUCT_CHANGE_RETENTION_HOURS', 24))
+FEED_BUFFER_SIZE = 2000
+FETCH_LIMIT = 500
+# A missing ID younger than this may belong to a transaction that has not
+# committed yet, so the poller waits for it instead of skipping past
+GAP_GRACE_SECONDS = 5
+RETRY_MS = 3000
+
+
+@event.listens_for(Session, 'after_flush')
+def _log_product_changes(session, flush_context):
+    """Append a change row for every product whose stock, price or status was flushed"""
+    rows = []
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Product):
+            continue
+        if obj not in session.new:
+            state = inspect(obj)
+            if not any(state.attrs[name].history.has_changes() for name in TRACKED_ATTRIBUTES):
+                continue
+        rows.append({
+            'product_id': obj.id,
+            'price': obj.price,
+            'stock_quantity': obj.stock_quantity or 0,
+            'is_active': bool(obj.is_active),
+            'created_at': datetime.utcnow()
+        })
+    if rows:
+        session.connection().execute(insert(ProductChange), rows)
+
+
+def record(product_ids):
+    """Log the current state of products changed by bulk UPDATE statements"""
+    if not product_ids:
+        return
+    db.session.execute(insert(ProductChange).from_select(
+        ['product_id', 'price', 'stock_quantity', 'is_active', 'created_at'],
+        select(Product.id, Product.price, Product.stock_quantity, Product.is_active, db.literal(datetime.utcnow()))
+        .where(Product.id.in_(list(product_ids)))
+    ))
+
+
+def fetch_changes(after_id, upto_id=None, limit=FETCH_LIMIT):
+    """Change rows with IDs after ``after_id``, stopping at a gap that may still be filled"""
+    query = select(ProductChange).where(ProductChange.id > after_id)
+    if upto_id is not None:
+        query = query.where(ProductChange.id <= upto_id)
+    rows = db.session.execute(query.order_by(ProductChange.id).limit(limit)).scalars().all()
+
+    if upto_id is not None:
+        return rows
+    grace = datetime.utcnow() - timedelta(seconds=GAP_GRACE_SECONDS)
+    expected = after_id + 1
+    for index, row in enumerate(rows):
+        if row.id != expected and row.created_at > grace:
+            return rows[:index]
+        expected = row.id + 1
+    return rows
+
+
+def latest_id():
+    """Highest change ID written so far"""
+    return db.session.execute(select(db.func.max(ProductChange.id))).scalar() or 0
+
+
+def prune(hours=PRODUCT_CHANGE_RETENTION_HOURS, batch_size=5000):
+    """Delete change rows older than the retention window; returns the number removed"""
+    cutoff = datetime.utcnow() - timedelta(hours=hours)
+    total = 0
+    while True:
+        ids = db.session.execute(
+            select(ProductChange.id).where(ProductChange.created_at < cutoff).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            db.session.rollback()
+            break
+        ProductChange.query.filter(ProductChange.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        total += len(ids)
+        if len(ids) < batch_size:
+            break
+    return total
+
+
+class ChangeFeed:
+    """Per-process fan-out of the product change log to stream subscribers.
+
+    One background poller reads new rows and keeps the latest
+    ``FEED_BUFFER_SIZE`` as pre-encoded events, so the database sees one
+    query per poll interval however many clients are connected. Subscribers
+    that resume from before the buffer catch up with a bounded query.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._buffer = deque()
+        self._floor = 0
+        self._head = 0
+        self._condition = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        # Started on first use so the poller thread and the condition belong
+        # to the forked worker, and are green when it is gevent-patched.
+        # self._lock is created with the app in the preloaded master, so it
+        # stays a native lock: nothing that can yield (DB I/O, starting a
+        # thread) may run while it is held, or a second greenlet waiting on
+        # it would block the whole worker.
+        if self._condition is not None:
+            return
+        with self.app.app_context():
+            try:
+                head = latest_id()
+            finally:
+                db.session.remove()
+        with self._lock:
+            if self._condition is not None:
+                return
+            self._floor = self._head = head
+            self._condition = threading.Condition()
+        threading.Thread(target=self._run, name='product-feed', daemon=True).start()
+
+    def _run(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    try:
+                        rows = fetch_changes(self._head)
+                        events = _encode(rows)
+                    finally:
+                        db.session.remove()
+                if events:
+                    self._publish(events)
+            except Exception as e:
+                logger.error(f"Product feed poll failed: {e}")
+            time.sleep(PRODUCT_STREAM_POLL_INTERVAL)
+
+    def _publish(self, events):
+        with self._condition:
+            self._buffer.extend(events)
+            while len(self._buffer) > FEED_BUFFER_SIZE:
+                self._floor = self._buffer.popleft()[0]
+            self._head = events[-1][0]
+            self._condition.notify_all()
+
+    def head(self):
+        """Newest event ID the feed has seen"""
+        self._start()
+        return self._head
+
+    def read(self, after_id, timeout):
+        """Events after ``after_id``, waiting up to ``timeout`` seconds for new ones.
+
+        Several changes to one product are coalesced into its latest state.
+        """
+        self._start()
+        if after_id < self._floor:
+            with self.app.app_context():
+                try:
+                    rows = fetch_changes(after_id, upto_id=self._floor)
+                    events = _encode(rows)
+                finally:
+                    db.session.remove()
+            if events:
+                return _coalesce(events)
+            after_id = self._floor
+
+        with self._condition:
+            if self._head <= after_id:
+                self._condition.wait(timeout)
+            # Subscribers are usually caught up, so walk back from the newest event
+            events = []
+            for item in reversed(self._buffer):
+                if item[0] <= after_id:
+                    break
+                events.append(item)
+        return _coalesce(reversed(events))
+
+
+def _encode(rows):
+    """``(event_id, product_id, data)`` tuples, serialized once for every subscriber"""
+    return [(row.id, row.product_id, json.dumps(row.to_event(), separators=(',', ':'))) for row in rows]
+
+
+def _coalesce(events):
+    """Keep only the newest event per product, in event ID order"""
+    latest = {}
+    for item in events:
+        latest.pop(item[1], None)
+        latest[item[1]] = item
+    return [(event_id, data) for event_id, _, data in latest.values()]
+
+
+def sse_stream(feed, after_id):
+    """Yield SSE frames until PRODUCT_STREAM_MAX_SECONDS; clients reconnect with Last-Event-ID"""
+    deadline = time.monotonic() + PRODUCT_STREAM_MAX_SECONDS
+    if after_id is None:
+        after_id = feed.head()
+    yield f'retry: {RETRY_MS}\n\n'
+    while time.monotonic() < deadline:
+        events = feed.read(after_id, timeout=min(PRODUCT_STREAM_HEARTBEAT, max(deadline - time.monotonic(), 0)))
+        if not events:
+            yield ': keep-alive\n\n'
+            continue
+        for event_id, data in events:
+            yield f'id: {event_id}\nevent: product\ndata: {data}\n\n'
+        after_id = events[-1][0]
+
+
+def current_feed():
+    """Product change feed configured on the current app"""
+    return current_app.extensions['product_feed']
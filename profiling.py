@@ -0,0 +1,406 @@
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Profiles and snapshots are written to a directory every worker can read,
+# so a result can be fetched from whichever worker serves the next request
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'shopping-profiles'))
+PROFILE_MAX_SECONDS = int(os.environ.get('PROFILE_MAX_SECONDS', 60))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', 10))
+PROFILE_KEEP_FILES = int(os.environ.get('PROFILE_KEEP_FILES', 20))
+TRACEMALLOC_FRAMES = int(os.environ.get('TRACEMALLOC_FRAMES', 10))
+
+ARTIFACT_ID_PATTERN = re.compile(r'^\d+-[0-9a-f]{8}$')
+PROFILE_FORMATS = {
+    'collapsed': ('text/plain', 'collapsed.txt'),
+    'speedscope': ('application/json', 'speedscope.json'),
+}
+SNAPSHOT_GROUPINGS = ('lineno', 'filename', 'traceback')
+
+# Leaf frames of threads blocked waiting for work rather than running
+IDLE_FRAMES = {
+    ('threading.py', 'wait'),
+    ('selectors.py', 'select'),
+    ('queue.py', 'get'),
+    ('handlers.py', 'dequeue'),
+    ('socket.py', 'accept'),
+    ('sync.py', 'wait'),
+}
+
+# Allocations made by tracemalloc itself and by imports are noise in a leak hunt
+SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+]
+
+_SITE_PACKAGES = f'site-packages{os.sep}'
+_APP_ROOT = os.path.dirname(os.path.abspath(__file__)) + os.sep
+
+
+class ProfilerBusy(Exception):
+    """A profile is already running on this worker"""
+
+
+def _native(module, name):
+    """The unpatched function when gevent has monkey-patched ``module``.
+
+    The sampler has to run on a real OS thread: a greenlet would only ever
+    see its own frame, since others cannot run while it samples.
+    """
+    monkey = sys.modules.get('gevent.monkey')
+    if monkey is not None and monkey.is_module_patched(module):
+        return monkey.get_original(module, name)
+    return getattr(__import__(module), name)
+
+
+_profile_lock = _native('_thread', 'allocate_lock')()
+
+
+def _artifact_path(kind, artifact_id, suffix):
+    return os.path.join(PROFILE_DIR, f'{kind}-{artifact_id}.{suffix}')
+
+
+def _new_artifact_id():
+    return f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+
+
+def _write_json(path, data):
+    # Written then renamed so readers in other workers never see half a file
+    partial = f'{path}.tmp'
+    with open(partial, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(partial, path)
+
+
+def _prune(kind):
+    """Keep only the newest PROFILE_KEEP_FILES artifacts of one kind"""
+    prefix = f'{kind}-'
+    ids = {}
+    for filename in os.listdir(PROFILE_DIR):
+        if filename.startswith(prefix) and not filename.endswith('.tmp'):
+            artifact_id = filename[len(prefix):].split('.', 1)[0]
+            mtime = os.path.getmtime(os.path.join(PROFILE_DIR, filename))
+            ids[artifact_id] = max(mtime, ids.get(artifact_id, 0))
+    for artifact_id in sorted(ids, key=ids.get, reverse=True)[PROFILE_KEEP_FILES:]:
+        for filename in os.listdir(PROFILE_DIR):
+            if filename.startswith(f'{prefix}{artifact_id}.'):
+                try:
+                    os.remove(os.path.join(PROFILE_DIR, filename))
+                except FileNotFoundError:
+                    pass
+
+
+def _short_path(path):
+    if path.startswith(_APP_ROOT):
+        return path[len(_APP_ROOT):]
+    index = path.rfind(_SITE_PACKAGES)
+    if index != -1:
+        return path[index + len(_SITE_PACKAGES):]
+    return os.path.basename(path)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({_short_path(code.co_filename)}:{frame.f_lineno})'
+
+
+def _is_idle(frame):
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+
+def _collect(seconds, interval, include_idle):
+    """Sample every thread's stack; returns ``(Counter of root-first stacks, sample count)``"""
+    sleep = _native('time', 'sleep')
+    own_ident = _native('_thread', 'get_ident')()
+    stacks = Counter()
+    samples = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident or (not include_idle and _is_idle(frame)):
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(thread_names.get(ident, f'thread-{ident}'))
+            stacks[tuple(reversed(labels))] += 1
+        samples += 1
+        sleep(interval)
+    return stacks, samples
+
+
+def _collapsed(stacks):
+    """Brendan Gregg's collapsed format, readable by flamegraph.pl and speedscope"""
+    return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in stacks.most_common())
+
+
+def _speedscope(stacks, interval_ms, name):
+    """A speedscope.app sampled profile, one weighted sample per distinct stack"""
+    frames, frame_index, samples, weights = [], {}, [], []
+    for stack, count in stacks.most_common():
+        sample = []
+        for label in stack:
+            if label not in frame_index:
+                frame_index[label] = len(frames)
+                frames.append({'name': label})
+            sample.append(frame_index[label])
+        samples.append(sample)
+        weights.append(count * interval_ms)
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'exporter': 'shopping-profiler',
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': sum(weights),
+            'samples': samples,
+            'weights': weights,
+        }],
+    }
+
+
+def _run_profile(profile_id, meta, interval_ms, include_idle):
+    try:
+        stacks, samples = _collect(meta['seconds'], interval_ms / 1000, include_idle)
+        with open(_artifact_path('profile', profile_id, PROFILE_FORMATS['collapsed'][1]), 'w') as f:
+            f.write(_collapsed(stacks))
+        _write_json(
+            _artifact_path('profile', profile_id, PROFILE_FORMATS['speedscope'][1]),
+            _speedscope(stacks, interval_ms, f"worker {meta['pid']} {meta['started_at']}")
+        )
+        meta.update(status='done', samples=samples, stacks=len(stacks))
+    except Exception as e:
+        logger.error(f"Profile {profile_id} failed: {e}")
+        meta.update(status='failed', error=str(e))
+    finally:
+        meta['finished_at'] = datetime.utcnow().isoformat()
+        _write_json(_artifact_path('profile', profile_id, 'json'), meta)
+        _profile_lock.release()
+
+
+def start_profile(seconds, interval_ms=PROFILE_SAMPLE_INTERVAL_MS, include_idle=False):
+    """Sample this worker's stacks for ``seconds`` on a background thread; returns the profile metadata.
+
+    The request that starts a profile returns straight away, so a sync
+    worker goes on serving (and being sampled during) later requests.
+    """
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise ValueError(f'seconds must be between 1 and {PROFILE_MAX_SECONDS}')
+    if not 1 <= interval_ms <= 1000:
+        raise ValueError('interval_ms must be between 1 and 1000')
+    if not _profile_lock.acquire(False):
+        raise ProfilerBusy(f'A profile is already running on worker {os.getpid()}')
+
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        _prune('profile')
+        profile_id = _new_artifact_id()
+        meta = {
+            'profile_id': profile_id,
+            'pid': os.getpid(),
+            'status': 'running',
+            'seconds': seconds,
+            'interval_ms': interval_ms,
+            'include_idle': include_idle,
+            'started_at': datetime.utcnow().isoformat(),
+        }
+        _write_json(_artifact_path('profile', profile_id, 'json'), meta)
+        _native('_thread', 'start_new_thread')(_run_profile, (profile_id, dict(meta), interval_ms, include_idle))
+    except Exception:
+        _profile_lock.release()
+        raise
+    return meta
+
+
+def profile_status(profile_id):
+    """Metadata for a profile run by any worker, or None when unknown"""
+    if not ARTIFACT_ID_PATTERN.match(profile_id):
+        return None
+    try:
+        with open(_artifact_path('profile', profile_id, 'json')) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return None
+    # A worker recycled by max_requests mid-profile never finishes it
+    if meta['status'] == 'running' and not _process_alive(meta['pid']):
+        meta['status'] = 'abandoned'
+    return meta
+
+
+def profile_output_path(profile_id, output_format):
+    """Path of a finished profile in ``output_format`` (see PROFILE_FORMATS)"""
+    return _artifact_path('profile', profile_id, PROFILE_FORMATS[output_format][1])
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def start_tracing(frames=TRACEMALLOC_FRAMES):
+    """Start tracemalloc on this worker; a no-op when it is already tracing"""
+    if not 1 <= frames <= 100:
+        raise ValueError('frames must be between 1 and 100')
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    return tracing_status()
+
+
+def stop_tracing():
+    """Stop tracemalloc on this worker and free its traces"""
+    tracemalloc.stop()
+    return tracing_status()
+
+
+def tracing_status():
+    status = {'pid': os.getpid(), 'tracing': tracemalloc.is_tracing()}
+    if status['tracing']:
+        current, peak = tracemalloc.get_traced_memory()
+        status.update(
+            frames=tracemalloc.get_traceback_limit(),
+            traced_bytes=current,
+            traced_peak_bytes=peak,
+            overhead_bytes=tracemalloc.get_tracemalloc_memory()
+        )
+    return status
+
+
+def _statistic(stat):
+    entry = {
+        'location': [f'{_short_path(frame.filename)}:{frame.lineno}' for frame in stat.traceback],
+        'size_bytes': stat.size,
+        'count': stat.count,
+    }
+    if isinstance(stat, tracemalloc.StatisticDiff):
+        entry.update(size_diff_bytes=stat.size_diff, count_diff=stat.count_diff)
+    return entry
+
+
+def take_snapshot(limit=20, group_by='lineno'):
+    """Dump a tracemalloc snapshot of this worker; returns its ID and top allocation sites"""
+    if not tracemalloc.is_tracing():
+        raise RuntimeError(f'tracemalloc is not running on worker {os.getpid()}')
+    snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    _prune('tracemalloc')
+    snapshot_id = _new_artifact_id()
+    snapshot.dump(_artifact_path('tracemalloc', snapshot_id, 'snap'))
+    stats = snapshot.statistics(group_by)
+    return {
+        'snapshot_id': snapshot_id,
+        'pid': os.getpid(),
+        'total_bytes': sum(stat.size for stat in stats),
+        'top': [_statistic(stat) for stat in stats[:limit]],
+    }
+
+
+def diff_snapshots(base_id, current_id, limit=20, group_by='lineno'):
+    """Allocation sites that grew the most between two snapshots, from any worker"""
+    snapshots = []
+    for snapshot_id in (base_id, current_id):
+        if not ARTIFACT_ID_PATTERN.match(snapshot_id or ''):
+            raise LookupError(f'Unknown snapshot {snapshot_id}')
+        try:
+            snapshots.append(tracemalloc.Snapshot.load(_artifact_path('tracemalloc', snapshot_id, 'snap')))
+        except FileNotFoundError:
+            raise LookupError(f'Unknown snapshot {snapshot_id}')
+    stats = snapshots[1].compare_to(snapshots[0], group_by)
+    return {
+        'base': base_id,
+        'current': current_id,
+        'same_worker': base_id.split('-')[0] == current_id.split('-')[0],
+        'size_diff_bytes': sum(stat.size_diff for stat in stats),
+        'top': [_statistic(stat) for stat in stats[:limit]],
+    }
+
+
+def _proc_status(pid):
+    """VmRSS/VmHWM in bytes and the thread count from /proc/<pid>/status"""
+    fields = {}
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('VmRSS', 'VmHWM', 'Threads', 'PPid'):
+                fields[key] = int(value.split()[0])
+    return {
+        'pid': pid,
+        'rss_bytes': fields.get('VmRSS', 0) * 1024,
+        'peak_rss_bytes': fields.get('VmHWM', 0) * 1024,
+        'threads': fields.get('Threads'),
+        'ppid': fields.get('PPid'),
+    }
+
+
+def _sibling_workers():
+    """PIDs of every worker forked by this worker's gunicorn master"""
+    master = os.getppid()
+    try:
+        with open(f'/proc/{master}/cmdline', 'rb') as f:
+            if b'gunicorn' not in f.read():
+                return [os.getpid()]
+    except OSError:
+        return [os.getpid()]
+    pids = []
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    # The command name may contain spaces, so split after it
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == master:
+                        pids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    return sorted(pids)
+
+
+def memory_report():
+    """RSS of every gunicorn worker plus GC and tracemalloc state of this one"""
+    import gc
+    import resource
+
+    if os.path.exists('/proc/self/status'):
+        workers = []
+        for pid in _sibling_workers():
+            try:
+                workers.append(_proc_status(pid))
+            except OSError:
+                continue
+    else:
+        # No /proc (macOS dev machines): peak RSS of this process only
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        workers = [{'pid': os.getpid(), 'rss_bytes': None, 'peak_rss_bytes': peak if sys.platform == 'darwin' else peak * 1024}]
+
+    return {
+        'pid': os.getpid(),
+        'workers': workers,
+        'gc': {
+            'counts': gc.get_count(),
+            'frozen': gc.get_freeze_count(),
+            'objects': len(gc.get_objects()),
+        },
+        'tracemalloc': tracing_status(),
+    }
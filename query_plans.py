@@ -0,0 +1,107 @@
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, text
+
+import categories
+from database import db
+from ids import NIL_UUID
+from models import ArchivedOrder, CartItem, CategoryClosure, Order, Product, ProductCategory, ProductPairCount
+
+
+# The statements hot request paths issue, with placeholder values. Plans are
+# checked with sequential scans and sorts disabled where the database allows,
+# so a failure means no index can serve the query at all.
+HOT_QUERIES = {
+    'storefront_products': lambda: Product.query.filter_by(is_active=True).order_by(Product.name).statement,
+    'storefront_products_by_category': lambda: categories.filter_subtree(
+        Product.query.filter_by(is_active=True), NIL_UUID
+    ).order_by(Product.name).statement,
+    'category_subtree_products': lambda: select(ProductCategory.product_id).join(
+        CategoryClosure, CategoryClosure.descendant_id == ProductCategory.category_id
+    ).where(CategoryClosure.ancestor_id == NIL_UUID),
+    'orders_for_user': lambda: Order.query.filter_by(user_id=NIL_UUID).order_by(Order.created_at.desc()).statement,
+    'archived_orders_for_user': lambda: ArchivedOrder.query.filter_by(user_id=NIL_UUID).order_by(
+        ArchivedOrder.created_at.desc()
+    ).statement,
+    'order_by_payment_intent': lambda: Order.query.filter_by(stripe_payment_intent_id='pi_sample').statement,
+    'pending_orders_sweep': lambda: select(Order.id, Order.stripe_payment_intent_id, Order.created_at).where(
+        Order.status == Order.STATUS_PENDING, Order.created_at < datetime.utcnow() - timedelta(hours=24)
+    ).order_by(Order.created_at, Order.id).limit(500),
+    'related_top_k': lambda: select(ProductPairCount.related_id, ProductPairCount.count).where(
+        ProductPairCount.product_id == NIL_UUID, ProductPairCount.count > 0
+    ).order_by(ProductPairCount.count.desc(), ProductPairCount.related_id.desc()).limit(20),
+    'cart_for_user': lambda: CartItem.query.filter_by(user_id=NIL_UUID).statement,
+    'stale_cart_items': lambda: select(CartItem.id).where(
+        CartItem.updated_at < datetime.utcnow() - timedelta(days=30)
+    ).limit(500),
+}
+
+
+def _compile(statement, dialect):
+    """Render a statement and its bind values the way the driver will receive them"""
+    compiled = statement.compile(dialect=dialect)
+    params = {}
+    for name, value in compiled.construct_params().items():
+        processor = compiled.binds[name].type.bind_processor(dialect)
+        params[name] = processor(value) if processor else value
+    if compiled.positiontup:
+        return str(compiled), tuple(params[name] for name in compiled.positiontup)
+    return str(compiled), params
+
+
+def _postgresql_problems(plan):
+    problems = []
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        if node['Node Type'] == 'Seq Scan':
+            problems.append(f"sequential scan on {node.get('Relation Name')}")
+        elif node['Node Type'] == 'Sort':
+            problems.append(f"sort on {', '.join(node.get('Sort Key', []))}")
+        nodes.extend(node.get('Plans', []))
+    return problems
+
+
+def _sqlite_problems(rows):
+    problems = []
+    for row in rows:
+        detail = row[-1]
+        if detail.startswith('SCAN ') and ' INDEX ' not in detail:
+            problems.append(f"full scan: {detail}")
+        elif detail.startswith('USE TEMP B-TREE'):
+            problems.append(f"sort: {detail}")
+    return problems
+
+
+def explain(statement):
+    """Return ``(plan_text, problems)`` for a statement on the current database"""
+    connection = db.session.connection()
+    dialect = connection.dialect
+    sql, params = _compile(statement, dialect)
+
+    if dialect.name == 'postgresql':
+        connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        connection.exec_driver_sql('SET LOCAL enable_sort = off')
+        plan = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {sql}', params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return json.dumps(plan, indent=2), _postgresql_problems(plan)
+
+    if dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}', params).all()
+        return '\n'.join(row[-1] for row in rows), _sqlite_problems(rows)
+
+    raise ValueError(f'Plan checks are not supported on {dialect.name}')
+
+
+def check_hot_queries(names=None):
+    """Explain each hot query; returns ``{name: {'plan': ..., 'problems': [...]}}``"""
+    results = {}
+    for name, build in HOT_QUERIES.items():
+        if names and name not in names:
+            continue
+        plan, problems = explain(build())
+        results[name] = {'plan': plan, 'problems': problems}
+    db.session.rollback()
+    return results
@@ -0,0 +1,221 @@
+import json
+import logging
+import os
+import zlib
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import select
+
+from database import db
+from models import ArchivedOrder, Order, Product, ProductPairCount, ProductRelated
+from outbox import first_delivery, register_handler
+
+logger = logging.getLogger(__name__)
+
+RELATED_TOP_K = int(os.environ.get('RELATED_TOP_K', 20))
+# Pairs grow with the square of an order's size, so bulk orders are capped
+RELATED_MAX_ITEMS_PER_ORDER = int(os.environ.get('RELATED_MAX_ITEMS_PER_ORDER', 50))
+RELATED_YIELD_PER = int(os.environ.get('RELATED_YIELD_PER', 1000))
+# Distinct pairs held in memory during a rebuild before they are written out
+RELATED_FLUSH_PAIRS = int(os.environ.get('RELATED_FLUSH_PAIRS', 50000))
+WRITE_CHUNK = 1000
+
+
+def order_products(items_json):
+    """Distinct product IDs in an order's line items"""
+    product_ids = []
+    for item in json.loads(items_json or '[]'):
+        product_id = item.get('product_id')
+        if product_id and product_id not in product_ids:
+            product_ids.append(product_id)
+    return product_ids[:RELATED_MAX_ITEMS_PER_ORDER]
+
+
+def _pairs(product_ids):
+    return ((a, b) for a in product_ids for b in product_ids if a != b)
+
+
+def _upsert(model, index_elements, rows, set_):
+    """Insert rows, resolving key conflicts with ``set_(stmt)`` where the dialect allows"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return False
+    for start in range(0, len(rows), WRITE_CHUNK):
+        stmt = insert(model).values(rows[start:start + WRITE_CHUNK])
+        db.session.execute(stmt.on_conflict_do_update(index_elements=index_elements, set_=set_(stmt)))
+    return True
+
+
+def _add_counts(deltas):
+    """Add ``{(product_id, related_id): delta}`` into product_pair_counts"""
+    # Sorted so concurrent outbox workers lock shared rows in the same order
+    rows = [
+        {'product_id': a, 'related_id': b, 'count': delta}
+        for (a, b), delta in sorted(deltas.items()) if delta
+    ]
+    if not rows:
+        return
+    if _upsert(ProductPairCount, ['product_id', 'related_id'], rows,
+               lambda stmt: {'count': ProductPairCount.count + stmt.excluded.count}):
+        return
+
+    # Portable fallback: lock and update existing rows, insert the rest
+    for row in rows:
+        record = db.session.get(ProductPairCount, (row['product_id'], row['related_id']), with_for_update=True)
+        if record is None:
+            db.session.add(ProductPairCount(**row))
+        else:
+            record.count += row['count']
+
+
+def _store_neighbours(product_id, neighbours):
+    """Replace one product's top-K list"""
+    if not neighbours:
+        ProductRelated.query.filter_by(product_id=product_id).delete(synchronize_session=False)
+        return
+    row = {'product_id': product_id, 'neighbours': json.dumps(neighbours), 'updated_at': datetime.utcnow()}
+    if _upsert(ProductRelated, ['product_id'], [row],
+               lambda stmt: {'neighbours': stmt.excluded.neighbours, 'updated_at': stmt.excluded.updated_at}):
+        return
+    db.session.merge(ProductRelated(**row))
+
+
+def refresh_top_k(product_ids):
+    """Recompute the stored top-K lists of ``product_ids`` from their pair counts"""
+    for product_id in product_ids:
+        rows = db.session.execute(
+            select(ProductPairCount.related_id, ProductPairCount.count)
+            .where(ProductPairCount.product_id == product_id, ProductPairCount.count > 0)
+            .order_by(ProductPairCount.count.desc(), ProductPairCount.related_id.desc())
+            .limit(RELATED_TOP_K)
+        ).all()
+        _store_neighbours(product_id, [{'product_id': related_id, 'count': count} for related_id, count in rows])
+
+
+def apply_order(items_json, sign=1):
+    """Add (sign=1) or remove (sign=-1) an order's product pairs and refresh the affected lists"""
+    product_ids = order_products(items_json)
+    if len(product_ids) < 2:
+        return
+    _add_counts({pair: sign for pair in _pairs(product_ids)})
+    if sign < 0:
+        ProductPairCount.query.filter(
+            ProductPairCount.product_id.in_(product_ids), ProductPairCount.count <= 0
+        ).delete(synchronize_session=False)
+    refresh_top_k(product_ids)
+
+
+@register_handler('order.completed')
+def on_order_completed(payload):
+    order = db.session.get(Order, payload['order_id'])
+    if order is not None and first_delivery('recommendations', 'order.completed', order.id):
+        apply_order(order.items, 1)
+
+
+@register_handler('order.refunded')
+def on_order_refunded(payload):
+    order = db.session.get(Order, payload['order_id'])
+    if order is not None and first_delivery('recommendations', 'order.refunded', order.id):
+        apply_order(order.items, -1)
+
+
+def related_products(product_id, limit=RELATED_TOP_K):
+    """Active products most often bought with ``product_id``; None when the product does not exist"""
+    related = db.session.get(ProductRelated, product_id)
+    if related is None:
+        return [] if db.session.get(Product, product_id) is not None else None
+
+    neighbours = related.data[:limit]
+    products = {
+        product.id: product
+        for product in Product.query.filter(
+            Product.id.in_([neighbour['product_id'] for neighbour in neighbours]),
+            Product.is_active.is_(True)
+        )
+    }
+    return [
+        dict(products[neighbour['product_id']].to_dict(), bought_together=neighbour['count'])
+        for neighbour in neighbours if neighbour['product_id'] in products
+    ]
+
+
+def _completed_order_items():
+    """Stream the items JSON of every completed order, live then archived"""
+    query = select(Order.items).where(Order.status == Order.STATUS_COMPLETED)
+    for (items,) in db.session.execute(query.execution_options(yield_per=RELATED_YIELD_PER)):
+        yield items
+
+    query = select(ArchivedOrder.payload).where(ArchivedOrder.status == Order.STATUS_COMPLETED)
+    for (payload,) in db.session.execute(query.execution_options(yield_per=RELATED_YIELD_PER)):
+        yield json.loads(zlib.decompress(payload)).get('items')
+
+
+def _rebuild_top_k():
+    """Write every product's top-K list from a single ordered pass over the pair table"""
+    query = select(ProductPairCount.product_id, ProductPairCount.related_id, ProductPairCount.count).where(
+        ProductPairCount.count > 0
+    ).order_by(
+        ProductPairCount.product_id, ProductPairCount.count.desc(), ProductPairCount.related_id.desc()
+    ).execution_options(yield_per=RELATED_YIELD_PER)
+
+    now = datetime.utcnow()
+    batch = []
+    current = None
+    neighbours = []
+    written = 0
+
+    def finish_product():
+        batch.append({'product_id': current, 'neighbours': json.dumps(neighbours), 'updated_at': now})
+
+    for product_id, related_id, count in db.session.execute(query):
+        if product_id != current:
+            if current is not None:
+                finish_product()
+            current, neighbours = product_id, []
+            if len(batch) >= WRITE_CHUNK:
+                db.session.execute(ProductRelated.__table__.insert(), batch)
+                written += len(batch)
+                batch = []
+        if len(neighbours) < RELATED_TOP_K:
+            neighbours.append({'product_id': related_id, 'count': count})
+
+    if current is not None:
+        finish_product()
+    if batch:
+        db.session.execute(ProductRelated.__table__.insert(), batch)
+        written += len(batch)
+    return written
+
+
+def rebuild():
+    """Recompute the co-occurrence index from every completed order.
+
+    Orders are streamed in batches and their pair counts written out
+    whenever RELATED_FLUSH_PAIRS distinct pairs are pending, so memory stays
+    bounded however long the order history is. Returns ``(orders, products)``.
+    """
+    ProductRelated.query.delete(synchronize_session=False)
+    ProductPairCount.query.delete(synchronize_session=False)
+
+    pending = Counter()
+    processed = 0
+    for items in _completed_order_items():
+        processed += 1
+        product_ids = order_products(items)
+        if len(product_ids) < 2:
+            continue
+        pending.update(_pairs(product_ids))
+        if len(pending) >= RELATED_FLUSH_PAIRS:
+            _add_counts(pending)
+            pending.clear()
+    _add_counts(pending)
+
+    products = _rebuild_top_k()
+    db.session.commit()
+    logger.info(f"Rebuilt related products for {products} products from {processed} orders")
+    return processed, products
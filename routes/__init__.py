@@ -0,0 +1,12 @@
+from .auth import auth_bp
+from .catalog import catalog_bp
+from .cart import cart_bp
+from .payments import payments_bp
+from .orders import orders_bp
+from .debug import debug_bp
+from .system import system_bp
+
+# system_bp holds the SPA catch-all route, so it is registered last
+BLUEPRINTS = [auth_bp, catalog_bp, cart_bp, payments_bp, orders_bp, debug_bp, system_bp]
+
+__all__ = ['auth_bp', 'catalog_bp', 'cart_bp', 'payments_bp', 'orders_bp', 'debug_bp', 'system_bp', 'BLUEPRINTS']
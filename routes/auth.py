@@ -0,0 +1,86 @@
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import create_access_token
+
+from cart_store import GUEST_PREFIX, current_cart_store
+from database import db
+from models import User
+from routes.cart import GUEST_TOKEN_PATTERN
+
+auth_bp = Blueprint('auth', __name__)
+
+@auth_bp.route('/v1/signup', methods=['POST'])
+def signup():
+    try:
+        data = request.get_json()
+        
+        if not data or not data.get('email') or not data.get('password'):
+            return jsonify({'error': 'Email and password are required'}), 400
+        
+        email = data['email'].lower().strip()
+        password = data['password']
+        
+        # Check if user already exists
+        if User.query.filter_by(email=email).first():
+            return jsonify({'error': 'Email already registered'}), 409
+        
+        # Create new user
+        user = User(email=email)
+        user.set_password(password)
+        
+        db.session.add(user)
+        db.session.commit()
+        
+        # Create access token
+        access_token = create_access_token(identity=user.id)
+        
+        return jsonify({
+            'message': 'User created successfully',
+            'access_token': access_token,
+            'user': user.to_dict()
+        }), 201
+        
+    except Exception as e:
+        current_app.logger.error(f"Signup error: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
+
+@auth_bp.route('/v1/signin', methods=['POST'])
+def signin():
+    try:
+        data = request.get_json()
+        
+        if not data or not data.get('email') or not data.get('password'):
+            return jsonify({'error': 'Email and password are required'}), 400
+        
+        email = data['email'].lower().strip()
+        password = data['password']
+        
+        # Find user
+        user = User.query.filter_by(email=email).first()
+        
+        if not user or not user.check_password(password):
+            return jsonify({'error': 'Invalid email or password'}), 401
+        
+        # Fold an anonymous guest cart into the user's cart
+        guest_token = request.headers.get('X-Guest-Cart', '')
+        cart_store = current_cart_store()
+        if cart_store.supports_guests and GUEST_TOKEN_PATTERN.fullmatch(guest_token):
+            try:
+                cart_store.merge(f'{GUEST_PREFIX}{guest_token}', user.id)
+                db.session.commit()
+            except Exception as e:
+                current_app.logger.error(f"Guest cart merge error: {str(e)}")
+                db.session.rollback()
+        
+        # Create access token
+        access_token = create_access_token(identity=user.id)
+        
+        return jsonify({
+            'message': 'Login successful',
+            'access_token': access_token,
+            'user': user.to_dict()
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Signin error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
@@ -0,0 +1,248 @@
+import re
+
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity, jwt_required
+
+from cart_store import GUEST_PREFIX, current_cart_store
+from database import db
+from models import Product
+
+cart_bp = Blueprint('cart', __name__)
+
+GUEST_TOKEN_PATTERN = re.compile(r'[A-Za-z0-9_-]{16,64}')
+
+def get_cart_owner():
+    """Resolve the cart owner: the signed-in user, or a guest cart token when supported"""
+    current_user_id = get_jwt_identity()
+    if current_user_id:
+        return current_user_id
+    guest_token = request.headers.get('X-Guest-Cart', '')
+    if current_cart_store().supports_guests and GUEST_TOKEN_PATTERN.fullmatch(guest_token):
+        return f'{GUEST_PREFIX}{guest_token}'
+    return None
+
+def cart_response(owner_id, message=None):
+    """Build the standard cart payload for an owner"""
+    cart_items = current_cart_store().get_items(owner_id)
+    payload = {
+        'cart_items': [item.to_dict() for item in cart_items],
+        'cart_total': sum(item.total_price for item in cart_items)
+    }
+    if message:
+        payload['message'] = message
+    return jsonify(payload), 200
+
+@cart_bp.route('/v1/cart', methods=['GET'])
+@jwt_required(optional=True)
+def get_cart():
+    try:
+        owner_id = get_cart_owner()
+        if not owner_id:
+            return jsonify({'error': 'Authorization token is required'}), 401
+        
+        return cart_response(owner_id)
+        
+    except Exception as e:
+        current_app.logger.error(f"Get cart error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@cart_bp.route('/v1/cart/add', methods=['POST'])
+@jwt_required(optional=True)
+def add_to_cart():
+    try:
+        owner_id = get_cart_owner()
+        cart_store = current_cart_store()
+        if not owner_id:
+            return jsonify({'error': 'Authorization token is required'}), 401
+        data = request.get_json()
+        
+        if not data or not data.get('product_id'):
+            return jsonify({'error': 'Product ID is required'}), 400
+        
+        product_id = data['product_id']
+        quantity = int(data.get('quantity', 1))
+        
+        if quantity <= 0:
+            return jsonify({'error': 'Quantity must be positive'}), 400
+        
+        # Check if product exists and is active
+        product = Product.query.filter_by(id=product_id, is_active=True).first()
+        if not product:
+            return jsonify({'error': 'Product not found or not available'}), 404
+        
+        # Check if total quantity would exceed stock
+        total_quantity = cart_store.get_quantities(owner_id).get(product_id, 0) + quantity
+        if total_quantity > product.stock_quantity:
+            return jsonify({'error': f'Only {product.stock_quantity} items in stock'}), 400
+        
+        cart_store.apply(owner_id, {product_id: total_quantity})
+        db.session.commit()
+        
+        return cart_response(owner_id, 'Item added to cart successfully')
+        
+    except ValueError:
+        return jsonify({'error': 'Invalid quantity format'}), 400
+    except Exception as e:
+        current_app.logger.error(f"Add to cart error: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
+
+@cart_bp.route('/v1/cart/update', methods=['PUT'])
+@jwt_required(optional=True)
+def update_cart_item():
+    try:
+        owner_id = get_cart_owner()
+        cart_store = current_cart_store()
+        if not owner_id:
+            return jsonify({'error': 'Authorization token is required'}), 401
+        data = request.get_json()
+        
+        if not data or not data.get('product_id') or not data.get('quantity'):
+            return jsonify({'error': 'Product ID and quantity are required'}), 400
+        
+        product_id = data['product_id']
+        quantity = int(data['quantity'])
+        
+        if quantity <= 0:
+            return jsonify({'error': 'Quantity must be positive'}), 400
+        
+        if product_id not in cart_store.get_quantities(owner_id):
+            return jsonify({'error': 'Cart item not found'}), 404
+        
+        # Check stock availability
+        product = db.session.get(Product, product_id)
+        if not product:
+            return jsonify({'error': 'Cart item not found'}), 404
+        if product.stock_quantity < quantity:
+            return jsonify({'error': f'Only {product.stock_quantity} items in stock'}), 400
+        
+        cart_store.apply(owner_id, {product_id: quantity})
+        db.session.commit()
+        
+        cart_item = cart_store.get_items(owner_id, [product_id])[0]
+        
+        return jsonify({
+            'message': 'Cart item updated successfully',
+            'cart_item': cart_item.to_dict()
+        }), 200
+        
+    except ValueError:
+        return jsonify({'error': 'Invalid quantity format'}), 400
+    except Exception as e:
+        current_app.logger.error(f"Update cart error: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
+
+@cart_bp.route('/v1/cart/remove', methods=['DELETE'])
+@jwt_required(optional=True)
+def remove_from_cart():
+    try:
+        owner_id = get_cart_owner()
+        cart_store = current_cart_store()
+        if not owner_id:
+            return jsonify({'error': 'Authorization token is required'}), 401
+        data = request.get_json()
+        
+        if not data or not data.get('product_id'):
+            return jsonify({'error': 'Product ID is required'}), 400
+        
+        product_id = data['product_id']
+        
+        if product_id not in cart_store.get_quantities(owner_id):
+            return jsonify({'error': 'Cart item not found'}), 404
+        
+        cart_store.apply(owner_id, {product_id: 0})
+        db.session.commit()
+        
+        return jsonify({'message': 'Item removed from cart'}), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Remove from cart error: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
+
+@cart_bp.route('/v1/cart/batch', methods=['POST'])
+@jwt_required(optional=True)
+def batch_cart():
+    """Apply a list of add/set/remove operations to the cart in one transaction"""
+    try:
+        owner_id = get_cart_owner()
+        cart_store = current_cart_store()
+        if not owner_id:
+            return jsonify({'error': 'Authorization token is required'}), 401
+        data = request.get_json()
+
+        operations = data.get('operations') if data else None
+        if not operations or not isinstance(operations, list):
+            return jsonify({'error': 'Operations list is required'}), 400
+
+        max_operations = current_app.config['CART_BATCH_MAX_OPERATIONS']
+        if len(operations) > max_operations:
+            return jsonify({'error': f'At most {max_operations} operations per batch'}), 400
+
+        # Validate operation shapes before touching the database
+        parsed = []
+        for index, operation in enumerate(operations):
+            if not isinstance(operation, dict):
+                return jsonify({'error': f'Operation {index} must be an object'}), 400
+            op = operation.get('op')
+            product_id = operation.get('product_id')
+            if op not in ('add', 'set', 'remove'):
+                return jsonify({'error': f'Operation {index} has invalid op'}), 400
+            if not product_id:
+                return jsonify({'error': f'Operation {index} requires product_id'}), 400
+            if not isinstance(product_id, str):
+                return jsonify({'error': f'Operation {index} product_id must be a string'}), 400
+            quantity = 0
+            if op != 'remove':
+                try:
+                    quantity = int(operation.get('quantity', 1 if op == 'add' else 0))
+                except (TypeError, ValueError):
+                    return jsonify({'error': f'Operation {index} has invalid quantity format'}), 400
+                if quantity < 0 or (op == 'add' and quantity == 0):
+                    return jsonify({'error': f'Operation {index} has invalid quantity'}), 400
+            parsed.append((op, product_id, quantity))
+
+        product_ids = {product_id for _, product_id, _ in parsed}
+
+        # One query for every referenced product
+        products = {
+            product.id: product
+            for product in Product.query.filter(
+                Product.id.in_(product_ids),
+                Product.is_active.is_(True)
+            ).all()
+        }
+
+        # Replay operations in order to get the final quantity per product
+        existing = cart_store.get_quantities(owner_id)
+        quantities = {product_id: existing.get(product_id, 0) for product_id in product_ids}
+        for index, (op, product_id, quantity) in enumerate(parsed):
+            if op == 'remove':
+                quantities[product_id] = 0
+                continue
+            if product_id not in products:
+                return jsonify({'error': f'Operation {index}: product not found or not available'}), 404
+            if op == 'add':
+                quantities[product_id] += quantity
+            else:
+                quantities[product_id] = quantity
+
+        for product_id, quantity in quantities.items():
+            product = products.get(product_id)
+            if product and quantity > product.stock_quantity:
+                return jsonify({'error': f'Only {product.stock_quantity} items in stock for {product.name}'}), 400
+
+        cart_store.apply(owner_id, {
+            product_id: quantity
+            for product_id, quantity in quantities.items()
+            if quantity != existing.get(product_id, 0)
+        })
+        db.session.commit()
+
+        return cart_response(owner_id, 'Cart updated successfully')
+
+    except Exception as e:
+        current_app.logger.error(f"Batch cart error: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
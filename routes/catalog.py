@@ -0,0 +1,257 @@
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask_jwt_extended import jwt_required
+
+import bootstrap
+import categories
+from database import db
+from models import Product
+import product_feed
+import recommendations
+from routes.cart import get_cart_owner
+from routes.helpers import allowed_file
+
+catalog_bp = Blueprint('catalog', __name__)
+
+@catalog_bp.route('/v1/products', methods=['GET'])
+def get_products():
+    try:
+        # Get query parameters for filtering
+        category = request.args.get('category')
+        active_only = request.args.get('active_only', 'true').lower() == 'true'
+        
+        query = Product.query
+        
+        if active_only:
+            query = query.filter_by(is_active=True)
+        
+        if category:
+            # Includes every subcategory, e.g. "Electronics" matches "Electronics > Audio"
+            query = categories.filter_by_category(query, category)
+        
+        # Read the feed position first so no change after the snapshot is missed
+        last_event_id = product_feed.latest_id()
+        products = query.order_by(Product.name).all()
+        
+        return jsonify({
+            'products': [product.to_dict() for product in products],
+            'last_event_id': last_event_id
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Get products error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@catalog_bp.route('/v1/bootstrap', methods=['GET'])
+@jwt_required(optional=True)
+def get_bootstrap():
+    """Everything the storefront needs for its first render, in one round trip"""
+    try:
+        category = request.args.get('category') or None
+        owner_id = get_cart_owner()
+        
+        # Catalog page and facets come from the worker cache when warm; the
+        # cart is per-owner and always read live, in the same session
+        payload = {
+            'catalog': bootstrap.catalog_page(category),
+            'categories': bootstrap.category_facets(),
+            'cart': bootstrap.cart_summary(owner_id) if owner_id else None,
+            'stripe': {'publicKey': current_app.config['STRIPE_PUBLISHABLE_KEY']}
+        }
+        
+        response = jsonify(payload)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.headers['Vary'] = 'Authorization, X-Guest-Cart'
+        return response, 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Bootstrap error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@catalog_bp.route('/v1/categories', methods=['GET'])
+def get_categories():
+    """The category tree with the number of active products under each node"""
+    try:
+        response = jsonify({'categories': categories.category_tree()})
+        response.headers['Cache-Control'] = f'public, max-age={int(categories.CATEGORY_CACHE_SECONDS)}'
+        return response, 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Get categories error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@catalog_bp.route('/v1/products/stream', methods=['GET'])
+def product_stream():
+    """Server-Sent Events feed of product stock and price changes"""
+    if not current_app.config['PRODUCT_STREAM_ENABLED']:
+        # 204 tells EventSource to stop reconnecting; pages keep the listing they loaded
+        return Response(status=204, headers={'Cache-Control': 'no-cache'})
+    
+    # EventSource sends Last-Event-ID on reconnect; the query parameter lets a
+    # fresh page resume from the event ID it loaded the catalog at
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        after_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({'error': 'Invalid Last-Event-ID'}), 400
+
+    return Response(
+        product_feed.sse_stream(product_feed.current_feed(), after_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@catalog_bp.route('/v1/products/<product_id>', methods=['GET'])
+def get_product(product_id):
+    try:
+        product = Product.query.get_or_404(product_id)
+        return jsonify(product.to_dict()), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Get product error: {str(e)}")
+        return jsonify({'error': 'Product not found'}), 404
+
+@catalog_bp.route('/v1/products/<product_id>/related', methods=['GET'])
+def get_related_products(product_id):
+    """Products most often bought together with this one, from the precomputed index"""
+    try:
+        limit = max(1, min(request.args.get('limit', 10, type=int), recommendations.RELATED_TOP_K))
+        related = recommendations.related_products(product_id, limit)
+        if related is None:
+            return jsonify({'error': 'Product not found'}), 404
+        
+        return jsonify({
+            'product_id': product_id,
+            'related': related
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Get related products error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@catalog_bp.route('/v1/products', methods=['POST'])
+@jwt_required()
+def create_product():
+    """Create a new product (admin functionality)"""
+    try:
+        # Check if multipart form data (for image upload)
+        if request.content_type and 'multipart/form-data' in request.content_type:
+            # Handle form data
+            name = request.form.get('name')
+            description = request.form.get('description')
+            price = float(request.form.get('price', 0))
+            category = request.form.get('category')
+            stock_quantity = int(request.form.get('stock_quantity', 0))
+            
+            # Handle image upload
+            image_url = None
+            if 'image' in request.files:
+                file = request.files['image']
+                if file and file.filename != '' and allowed_file(file.filename):
+                    # This part is removed as S3 is no longer used
+                    pass
+        else:
+            # Handle JSON data
+            data = request.get_json()
+            name = data.get('name')
+            description = data.get('description')
+            price = float(data.get('price', 0))
+            category = data.get('category')
+            stock_quantity = int(data.get('stock_quantity', 0))
+            image_url = data.get('image_url')
+        
+        if not name or price <= 0:
+            return jsonify({'error': 'Name and valid price are required'}), 400
+        
+        product = Product(
+            name=name,
+            description=description,
+            price=price,
+            category=category,
+            image_url=image_url,
+            stock_quantity=stock_quantity
+        )
+        
+        db.session.add(product)
+        try:
+            categories.link_product(product, category)
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        db.session.commit()
+        categories.clear_cache()
+        bootstrap.storefront_cache.clear()
+        
+        return jsonify({
+            'message': 'Product created successfully',
+            'product': product.to_dict()
+        }), 201
+        
+    except ValueError:
+        return jsonify({'error': 'Invalid price or stock quantity'}), 400
+    except Exception as e:
+        current_app.logger.error(f"Create product error: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
+
+@catalog_bp.route('/admin/seed-products', methods=['POST'])
+def seed_products():
+    """Seed initial products - for development/testing"""
+    try:
+        # Check if products already exist
+        if Product.query.count() > 0:
+            return jsonify({'message': 'Products already exist'}), 200
+        
+        # Sample products with S3 image URLs (you can update these later)
+        sample_products = [
+            {
+                'name': 'Wireless Headphones',
+                'description': 'High-quality wireless headphones with noise cancellation',
+                'price': 199.99,
+                'category': 'Electronics',
+                'stock_quantity': 50
+            },
+            {
+                'name': 'Smart Watch',
+                'description': 'Feature-rich smartwatch with health monitoring',
+                'price': 299.99,
+                'category': 'Electronics',
+                'stock_quantity': 30
+            },
+            {
+                'name': 'Coffee Maker',
+                'description': 'Professional-grade coffee maker for home use',
+                'price': 149.99,
+                'category': 'Home & Kitchen',
+                'stock_quantity': 25
+            },
+            {
+                'name': 'Running Shoes',
+                'description': 'Comfortable running shoes for all terrains',
+                'price': 129.99,
+                'category': 'Sports & Outdoors',
+                'stock_quantity': 75
+            },
+            {
+                'name': 'Backpack',
+                'description': 'Durable travel backpack with multiple compartments',
+                'price': 89.99,
+                'category': 'Travel',
+                'stock_quantity': 40
+            }
+        ]
+        
+        for product_data in sample_products:
+            product = Product(**product_data)
+            db.session.add(product)
+            categories.link_product(product, product.category)
+        
+        db.session.commit()
+        categories.clear_cache()
+        bootstrap.storefront_cache.clear()
+        
+        return jsonify({'message': 'Products seeded successfully'}), 201
+        
+    except Exception as e:
+        current_app.logger.error(f"Seed products error: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Failed to seed products'}), 500
@@ -0,0 +1,148 @@
+import os
+
+from flask import Blueprint, current_app, jsonify, request, send_file
+from flask_jwt_extended import jwt_required
+
+import deadlines
+import profiling
+from routes.helpers import admin_required
+
+debug_bp = Blueprint('debug', __name__)
+
+# Each request is served by one worker; responses carry its pid, and
+# profiles and snapshots can be fetched afterwards from any worker
+
+@debug_bp.route('/v1/admin/debug/profile', methods=['POST'])
+@jwt_required()
+@admin_required
+def start_profile():
+    """Start a time-boxed stack-sampling profile of the worker serving this request"""
+    try:
+        seconds = request.args.get('seconds', 10, type=int)
+        interval_ms = request.args.get('interval_ms', profiling.PROFILE_SAMPLE_INTERVAL_MS, type=float)
+        include_idle = request.args.get('idle', 'false').lower() == 'true'
+
+        meta = profiling.start_profile(seconds, interval_ms=interval_ms, include_idle=include_idle)
+        return jsonify(meta), 202
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except profiling.ProfilerBusy as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        current_app.logger.error(f"Start profile error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@debug_bp.route('/v1/admin/debug/profile/<profile_id>', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_profile(profile_id):
+    """Profile status, or its collapsed stacks / speedscope flamegraph once finished"""
+    try:
+        meta = profiling.profile_status(profile_id)
+        if meta is None:
+            return jsonify({'error': 'Profile not found'}), 404
+
+        output_format = request.args.get('format')
+        if not output_format:
+            return jsonify(meta), 200
+        if output_format not in profiling.PROFILE_FORMATS:
+            return jsonify({'error': f"Format must be one of: {', '.join(profiling.PROFILE_FORMATS)}"}), 400
+        if meta['status'] != 'done':
+            return jsonify(meta), 202 if meta['status'] == 'running' else 410
+
+        mimetype, suffix = profiling.PROFILE_FORMATS[output_format]
+        return send_file(
+            profiling.profile_output_path(profile_id, output_format),
+            mimetype=mimetype,
+            as_attachment=True,
+            download_name=f'profile-{profile_id}.{suffix}'
+        )
+
+    except FileNotFoundError:
+        return jsonify({'error': 'Profile output has been pruned'}), 410
+    except Exception as e:
+        current_app.logger.error(f"Get profile error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@debug_bp.route('/v1/admin/debug/memory', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_memory():
+    """Per-worker RSS plus GC and tracemalloc state of the serving worker"""
+    try:
+        return jsonify(profiling.memory_report()), 200
+    except Exception as e:
+        current_app.logger.error(f"Memory report error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@debug_bp.route('/v1/admin/debug/deadlines', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_deadlines():
+    """Route class budgets and requests failed by them on the serving worker"""
+    return jsonify({
+        'pid': os.getpid(),
+        'budgets_ms': deadlines.DEADLINE_BUDGETS_MS,
+        'exceeded': deadlines.stats()
+    }), 200
+
+@debug_bp.route('/v1/admin/debug/tracemalloc/<action>', methods=['POST'])
+@jwt_required()
+@admin_required
+def toggle_tracemalloc(action):
+    """Start or stop tracemalloc on the serving worker"""
+    try:
+        if action == 'start':
+            frames = request.args.get('frames', profiling.TRACEMALLOC_FRAMES, type=int)
+            return jsonify(profiling.start_tracing(frames)), 200
+        if action == 'stop':
+            return jsonify(profiling.stop_tracing()), 200
+        return jsonify({'error': 'Action must be start or stop'}), 404
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Tracemalloc {action} error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@debug_bp.route('/v1/admin/debug/tracemalloc/snapshots', methods=['POST'])
+@jwt_required()
+@admin_required
+def take_snapshot():
+    """Snapshot the serving worker's traced allocations and list the largest sites"""
+    try:
+        limit = min(request.args.get('limit', 20, type=int), 200)
+        group_by = request.args.get('group_by', 'lineno')
+        if group_by not in profiling.SNAPSHOT_GROUPINGS:
+            return jsonify({'error': f"group_by must be one of: {', '.join(profiling.SNAPSHOT_GROUPINGS)}"}), 400
+
+        return jsonify(profiling.take_snapshot(limit=limit, group_by=group_by)), 201
+
+    except RuntimeError as e:
+        return jsonify({'error': str(e), 'pid': os.getpid()}), 409
+    except Exception as e:
+        current_app.logger.error(f"Tracemalloc snapshot error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@debug_bp.route('/v1/admin/debug/tracemalloc/diff', methods=['GET'])
+@jwt_required()
+@admin_required
+def diff_snapshots():
+    """Allocation growth between two snapshots (?base=<id>&current=<id>)"""
+    try:
+        limit = min(request.args.get('limit', 20, type=int), 200)
+        group_by = request.args.get('group_by', 'lineno')
+        if group_by not in profiling.SNAPSHOT_GROUPINGS:
+            return jsonify({'error': f"group_by must be one of: {', '.join(profiling.SNAPSHOT_GROUPINGS)}"}), 400
+
+        diff = profiling.diff_snapshots(
+            request.args.get('base'), request.args.get('current'), limit=limit, group_by=group_by
+        )
+        return jsonify(diff), 200
+
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        current_app.logger.error(f"Tracemalloc diff error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
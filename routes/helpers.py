@@ -0,0 +1,29 @@
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, jsonify
+from flask_jwt_extended import get_jwt_identity
+
+from database import db
+from models import User
+
+def allowed_file(filename):
+    """Check if file extension is allowed"""
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+
+def admin_required(view):
+    """Restrict a JWT-protected route to users listed in ADMIN_EMAILS"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        user = db.session.get(User, get_jwt_identity())
+        if not user or user.email not in current_app.config['ADMIN_EMAILS']:
+            return jsonify({'error': 'Admin access required'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+def parse_date_arg(value):
+    """Parse an ISO date or datetime query value; returns None when absent"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value)
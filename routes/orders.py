@@ -0,0 +1,92 @@
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from flask_jwt_extended import get_jwt_identity, jwt_required
+
+from models import Order
+from order_export import EXPORT_FORMATS, generate_export
+import order_archive
+from routes.helpers import admin_required, parse_date_arg
+import sales_rollup
+
+orders_bp = Blueprint('orders', __name__)
+
+@orders_bp.route('/v1/orders', methods=['GET'])
+@jwt_required()
+def get_orders():
+    try:
+        current_user_id = get_jwt_identity()
+        include_archived = request.args.get('include_archived', 'false').lower() == 'true'
+        orders = Order.query.filter_by(user_id=current_user_id).order_by(Order.created_at.desc()).all()
+        order_dicts = [order.to_dict() for order in orders]
+        
+        # Archived orders are all older than live ones, so they go last
+        if include_archived:
+            order_dicts.extend(order.to_dict() for order in order_archive.archived_orders_for_user(current_user_id))
+        
+        return jsonify({
+            'orders': order_dicts
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Get orders error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@orders_bp.route('/v1/admin/orders/export', methods=['GET'])
+@jwt_required()
+@admin_required
+def export_orders():
+    """Stream orders as NDJSON or CSV, filtered by date range and status"""
+    try:
+        export_format = request.args.get('format', 'ndjson').lower()
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f"Format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+        
+        start = parse_date_arg(request.args.get('start'))
+        end = parse_date_arg(request.args.get('end'))
+        status = request.args.get('status')
+        include_items = request.args.get('include_items', 'false').lower() == 'true'
+        
+        if status and status not in Order.VALID_STATUSES:
+            return jsonify({'error': 'Invalid order status'}), 400
+        
+        body = generate_export(export_format, start=start, end=end, status=status, include_items=include_items)
+        filename = f"orders-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{export_format}"
+        
+        return Response(
+            stream_with_context(body),
+            mimetype=EXPORT_FORMATS[export_format],
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+        
+    except ValueError:
+        return jsonify({'error': 'Dates must be ISO 8601 (YYYY-MM-DD)'}), 400
+    except Exception as e:
+        current_app.logger.error(f"Export orders error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@orders_bp.route('/v1/admin/analytics', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_analytics():
+    """Sales dashboard data served from the rollup tables"""
+    try:
+        group_by = request.args.get('group_by', 'category')
+        if group_by not in ('day', 'category', 'product'):
+            return jsonify({'error': 'group_by must be one of: day, category, product'}), 400
+        
+        start, end = sales_rollup.default_range()
+        if request.args.get('start'):
+            start = parse_date_arg(request.args['start']).date()
+        if request.args.get('end'):
+            end = parse_date_arg(request.args['end']).date()
+        if end <= start:
+            return jsonify({'error': 'end must be after start'}), 400
+        
+        return jsonify(sales_rollup.query_analytics(start, end, group_by)), 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Analytics error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
@@ -0,0 +1,241 @@
+import json
+
+from flask import Blueprint, current_app, g, jsonify, request
+from flask_jwt_extended import get_jwt_identity, jwt_required
+
+from cart_store import current_cart_store
+from database import db
+from idempotency import idempotent
+from models import CartItem, Order
+import outbox
+from stripe_client import get_stripe
+
+payments_bp = Blueprint('payments', __name__)
+
+@payments_bp.route('/v1/stripe-config', methods=['GET'])
+def get_stripe_config():
+    return jsonify({
+        'publicKey': current_app.config['STRIPE_PUBLISHABLE_KEY']
+    })
+
+@payments_bp.route('/v1/create-payment-intent', methods=['POST'])
+@jwt_required()
+@idempotent
+def create_payment_intent():
+    stripe = get_stripe()
+    try:
+        current_user_id = get_jwt_identity()
+        
+        # Persist the cart before reading it relationally
+        current_cart_store().flush(current_user_id)
+        
+        # Get all cart items for the user
+        cart_items = CartItem.query.filter_by(user_id=current_user_id).all()
+        
+        if not cart_items:
+            return jsonify({'error': 'Cart is empty'}), 400
+        
+        # Verify stock availability
+        for item in cart_items:
+            if item.product.stock_quantity < item.quantity:
+                return jsonify({'error': f'Insufficient stock for {item.product.name}'}), 400
+        
+        # Calculate total in cents for Stripe
+        total_amount = sum(item.total_price for item in cart_items)
+        amount_cents = int(total_amount * 100)
+        
+        # Let Stripe dedupe retries of the same client request as well
+        stripe_options = {}
+        if g.get('idempotency_key'):
+            stripe_options['idempotency_key'] = f"{current_user_id}:{g.idempotency_key}"
+        
+        # Create payment intent
+        intent = stripe.PaymentIntent.create(
+            amount=amount_cents,
+            currency='usd',
+            metadata={
+                'user_id': current_user_id,
+                'cart_items_count': len(cart_items),
+                'request_id': g.get('request_id', '')
+            },
+            **stripe_options
+        )
+        
+        # Create pending order
+        order_items = [item.to_dict() for item in cart_items]
+        
+        order = Order(
+            user_id=current_user_id,
+            total_amount=total_amount,
+            status=Order.STATUS_PENDING,
+            stripe_payment_intent_id=intent['id'],
+            items=json.dumps(order_items)
+        )
+        
+        db.session.add(order)
+        db.session.commit()
+        
+        return jsonify({
+            'client_secret': intent['client_secret'],
+            'order_id': order.id
+        })
+        
+    except stripe.error.StripeError as e:
+        current_app.logger.error(f"Stripe error: {str(e)}")
+        return jsonify({'error': 'Payment processing error'}), 500
+    except Exception as e:
+        current_app.logger.error(f"Create payment intent error: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
+
+@payments_bp.route('/v1/confirm-payment', methods=['POST'])
+@jwt_required()
+@idempotent
+def confirm_payment():
+    stripe = get_stripe()
+    try:
+        data = request.get_json()
+        payment_intent_id = data.get('payment_intent_id')
+        
+        if not payment_intent_id:
+            return jsonify({'error': 'Payment intent ID required'}), 400
+        
+        # Find the order
+        order = Order.query.filter_by(stripe_payment_intent_id=payment_intent_id).first()
+        
+        if not order:
+            return jsonify({'error': 'Order not found'}), 404
+        
+        # Retrieve payment intent from Stripe
+        intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+        
+        # Lock the order only now, not across the Stripe call, and re-read it:
+        # a concurrent or repeated confirm may already have completed it
+        order = Order.query.filter_by(id=order.id).with_for_update().populate_existing().one()
+        if order.is_completed:
+            db.session.commit()
+            return jsonify({
+                'message': 'Payment successful',
+                'order': order.to_dict()
+            })
+        if order.status not in (Order.STATUS_PENDING, Order.STATUS_FAILED):
+            db.session.commit()
+            return jsonify({'error': f'Order is {order.status}'}), 409
+        
+        if intent['status'] == 'succeeded':
+            # Update order status
+            order.mark_completed()
+            
+            # Reduce stock for ordered items
+            current_cart_store().flush(order.user_id)
+            cart_items = CartItem.query.filter_by(user_id=order.user_id).all()
+            for item in cart_items:
+                item.product.reduce_stock(item.quantity)
+            
+            # Clear cart for the user
+            current_cart_store().clear(order.user_id)
+            
+            # Later side effects run in the outbox worker, committed atomically with the order
+            outbox.enqueue('order.completed', order.to_event_payload())
+            
+            db.session.commit()
+            
+            return jsonify({
+                'message': 'Payment successful',
+                'order': order.to_dict()
+            })
+        else:
+            order.mark_failed()
+            db.session.commit()
+            return jsonify({'error': 'Payment failed'}), 400
+            
+    except stripe.error.StripeError as e:
+        current_app.logger.error(f"Stripe error in confirm_payment: {str(e)}")
+        return jsonify({'error': 'Payment verification failed'}), 500
+    except Exception as e:
+        current_app.logger.error(f"Confirm payment error: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
+
+@payments_bp.route('/v1/checkout', methods=['POST'])
+@jwt_required()
+@idempotent
+def legacy_checkout():
+    try:
+        current_user_id = get_jwt_identity()
+        
+        # Persist the cart before reading it relationally
+        current_cart_store().flush(current_user_id)
+        
+        # Get all cart items for the user
+        cart_items = CartItem.query.filter_by(user_id=current_user_id).all()
+        
+        if not cart_items:
+            return jsonify({'error': 'Cart is empty'}), 400
+        
+        # Calculate total
+        total_amount = sum(item.total_price for item in cart_items)
+        
+        # Create order record (legacy route - keeping for backward compatibility)
+        order_items = [item.to_dict() for item in cart_items]
+        
+        order = Order(
+            user_id=current_user_id,
+            total_amount=total_amount,
+            status=Order.STATUS_COMPLETED,  # For legacy checkout without payment
+            items=json.dumps(order_items)
+        )
+        
+        # Clear cart
+        current_cart_store().clear(current_user_id)
+        
+        db.session.add(order)
+        db.session.flush()
+        outbox.enqueue('order.completed', order.to_event_payload())
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Checkout successful',
+            'order': order.to_dict()
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Legacy checkout error: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
+
+@payments_bp.route('/v1/stripe-webhook', methods=['POST'])
+def stripe_webhook():
+    stripe = get_stripe()
+    secret = current_app.config.get('STRIPE_WEBHOOK_SECRET')
+    if not secret:
+        return jsonify({'error': 'Webhook not configured'}), 503
+
+    payload = request.get_data(as_text=True)
+    try:
+        # Only a few plain fields are read, so skip building SDK objects
+        stripe.WebhookSignature.verify_header(payload, request.headers.get('Stripe-Signature', ''), secret)
+        event = json.loads(payload)
+    except (ValueError, stripe.error.SignatureVerificationError):
+        return jsonify({'error': 'Invalid signature'}), 400
+
+    try:
+        if event['type'] == 'charge.refunded':
+            charge = event['data']['object']
+            # Partial refunds keep the order; only a fully refunded charge reverses it
+            if charge.get('refunded') and charge.get('payment_intent'):
+                order = Order.query.filter_by(
+                    stripe_payment_intent_id=charge['payment_intent']
+                ).with_for_update().first()
+                # Stripe redelivers events, so only the first delivery refunds the order
+                if order is not None and order.is_completed:
+                    order.mark_refunded()
+                    outbox.enqueue('order.refunded', order.to_event_payload())
+                    db.session.commit()
+
+        return jsonify({'received': True})
+
+    except Exception as e:
+        current_app.logger.error(f"Stripe webhook error: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
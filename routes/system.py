@@ -0,0 +1,43 @@
+import os
+
+from flask import Blueprint, current_app, jsonify, send_from_directory
+from sqlalchemy import text
+
+from database import db
+
+system_bp = Blueprint('system', __name__)
+
+FRONTEND_BUILD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'frontend', 'build')
+
+@system_bp.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint"""
+    try:
+        disable_db = current_app.config['DISABLE_DB']
+        db_status = 'disabled' if disable_db else 'connected'
+        if not disable_db:
+            # Test database connection
+            db.session.execute(text('SELECT 1'))
+        return jsonify({
+            'status': 'healthy',
+            'message': 'Flask backend is running',
+            'database': db_status
+        }), 200
+    except Exception as e:
+        current_app.logger.error(f"Health check failed: {str(e)}")
+        return jsonify({
+            'status': 'unhealthy',
+            'message': 'Health check failed',
+            'error': str(e)
+        }), 503
+
+@system_bp.route('/')
+def serve_index():
+    return send_from_directory(FRONTEND_BUILD_DIR, 'index.html')
+
+@system_bp.route('/<path:path>')
+def serve_static_proxy(path):
+    full_path = os.path.join(FRONTEND_BUILD_DIR, path)
+    if os.path.exists(full_path) and os.path.isfile(full_path):
+        return send_from_directory(FRONTEND_BUILD_DIR, path)
+    return send_from_directory(FRONTEND_BUILD_DIR, 'index.html')
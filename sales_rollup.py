@@ -0,0 +1,222 @@
+import heapq
+import json
+import logging
+import os
+import zlib
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from operator import itemgetter
+
+from sqlalchemy import select
+
+from database import db
+from models import ArchivedOrder, Order, SalesDaily, SalesDailyCategory, SalesDailyProduct
+from outbox import first_delivery, register_handler
+
+logger = logging.getLogger(__name__)
+
+UNCATEGORIZED = 'Uncategorized'
+ROLLUP_YIELD_PER = int(os.environ.get('ROLLUP_YIELD_PER', 1000))
+ANALYTICS_MAX_DAYS = int(os.environ.get('ANALYTICS_MAX_DAYS', 366))
+METRICS = ('units', 'revenue', 'order_count')
+
+
+def order_deltas(day, items_json, sign=1):
+    """Aggregate one order's line items into per-day, per-product and per-category deltas"""
+    totals = {day: {'day': day, 'units': 0, 'revenue': Decimal('0'), 'order_count': sign}}
+    products = {}
+    categories = {}
+    for item in json.loads(items_json or '[]'):
+        product_id = item.get('product_id')
+        if not product_id:
+            continue
+        category = (item.get('product') or {}).get('category') or UNCATEGORIZED
+        units = sign * int(item.get('quantity') or 0)
+        revenue = sign * Decimal(str(item.get('total') or 0))
+
+        totals[day]['units'] += units
+        totals[day]['revenue'] += revenue
+
+        row = products.setdefault(product_id, {
+            'day': day, 'product_id': product_id, 'category': category,
+            'units': 0, 'revenue': Decimal('0'), 'order_count': sign
+        })
+        row['units'] += units
+        row['revenue'] += revenue
+
+        row = categories.setdefault(category, {
+            'day': day, 'category': category,
+            'units': 0, 'revenue': Decimal('0'), 'order_count': sign
+        })
+        row['units'] += units
+        row['revenue'] += revenue
+    return totals, products, categories
+
+
+def _merge_deltas(target, deltas):
+    for key, row in deltas.items():
+        existing = target.get(key)
+        if existing is None:
+            target[key] = dict(row)
+            continue
+        for metric in METRICS:
+            existing[metric] += row[metric]
+
+
+def _upsert(model, key_columns, rows):
+    """Add delta rows into a rollup table with one statement where the dialect allows"""
+    if not rows:
+        return
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(model).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={
+                metric: getattr(model, metric) + getattr(stmt.excluded, metric)
+                for metric in METRICS
+            } | {'updated_at': datetime.utcnow()}
+        )
+        db.session.execute(stmt)
+        return
+
+    # Portable fallback: lock and update existing rows, insert the rest
+    for row in rows:
+        record = db.session.get(model, tuple(row[column] for column in key_columns), with_for_update=True)
+        if record is None:
+            db.session.add(model(**row))
+            continue
+        for metric in METRICS:
+            setattr(record, metric, getattr(record, metric) + row[metric])
+
+
+def apply_order(order, sign=1):
+    """Add (sign=1) or remove (sign=-1) an order's contribution to the rollups"""
+    totals, products, categories = order_deltas(order.created_at.date(), order.items, sign)
+    _upsert(SalesDaily, ['day'], list(totals.values()))
+    _upsert(SalesDailyProduct, ['day', 'product_id'], list(products.values()))
+    _upsert(SalesDailyCategory, ['day', 'category'], list(categories.values()))
+
+
+@register_handler('order.completed')
+def on_order_completed(payload):
+    order = db.session.get(Order, payload['order_id'])
+    if order is not None and first_delivery('sales_rollup', 'order.completed', order.id):
+        apply_order(order, 1)
+
+
+@register_handler('order.refunded')
+def on_order_refunded(payload):
+    order = db.session.get(Order, payload['order_id'])
+    if order is not None and first_delivery('sales_rollup', 'order.refunded', order.id):
+        apply_order(order, -1)
+
+
+def _completed_orders(start, end):
+    """Stream ``(created_at, items_json)`` of completed orders, live and archived, in created_at order"""
+    def ordered(model, column):
+        query = select(model.created_at, column).where(model.status == Order.STATUS_COMPLETED)
+        if start:
+            query = query.where(model.created_at >= datetime.combine(start, time.min))
+        if end:
+            query = query.where(model.created_at < datetime.combine(end, time.min))
+        return db.session.execute(
+            query.order_by(model.created_at).execution_options(yield_per=ROLLUP_YIELD_PER)
+        )
+
+    archived = (
+        (created_at, json.loads(zlib.decompress(payload)).get('items'))
+        for created_at, payload in ordered(ArchivedOrder, ArchivedOrder.payload)
+    )
+    # Archived orders are older, but a day can straddle the archive cutoff
+    return heapq.merge(ordered(Order, Order.items), archived, key=itemgetter(0))
+
+
+def rebuild(start=None, end=None):
+    """Recompute rollups for completed orders in [start, end) from scratch.
+
+    Live and archived orders are streamed in created_at order and aggregated
+    one day at a time, so memory is bounded by a single day's products rather
+    than the number of orders. Returns the number of orders processed.
+    """
+    for model in (SalesDaily, SalesDailyProduct, SalesDailyCategory):
+        query = model.query
+        if start:
+            query = query.filter(model.day >= start)
+        if end:
+            query = query.filter(model.day < end)
+        query.delete(synchronize_session=False)
+
+    current_day = None
+    aggregates = ({}, {}, {})
+    processed = 0
+
+    def write_day():
+        for model, rows in zip((SalesDaily, SalesDailyProduct, SalesDailyCategory), aggregates):
+            if rows:
+                db.session.execute(model.__table__.insert(), list(rows.values()))
+
+    for created_at, items in _completed_orders(start, end):
+        day = created_at.date()
+        if day != current_day and current_day is not None:
+            write_day()
+            aggregates = ({}, {}, {})
+        current_day = day
+        for target, deltas in zip(aggregates, order_deltas(day, items)):
+            _merge_deltas(target, deltas)
+        processed += 1
+
+    if current_day is not None:
+        write_day()
+    db.session.commit()
+    logger.info(f"Rebuilt sales rollups from {processed} orders")
+    return processed
+
+
+def query_analytics(start, end, group_by='category'):
+    """Answer a dashboard query for days in [start, end) from the rollup tables"""
+    if (end - start).days > ANALYTICS_MAX_DAYS:
+        raise ValueError(f'Date range must be at most {ANALYTICS_MAX_DAYS} days')
+
+    if group_by == 'product':
+        rows = [
+            row.to_dict()
+            for row in SalesDailyProduct.query.filter(
+                SalesDailyProduct.day >= start, SalesDailyProduct.day < end
+            ).order_by(SalesDailyProduct.day, SalesDailyProduct.product_id)
+        ]
+    elif group_by == 'day':
+        rows = [
+            row.to_dict()
+            for row in SalesDaily.query.filter(
+                SalesDaily.day >= start, SalesDaily.day < end
+            ).order_by(SalesDaily.day)
+        ]
+    else:
+        rows = [
+            row.to_dict()
+            for row in SalesDailyCategory.query.filter(
+                SalesDailyCategory.day >= start, SalesDailyCategory.day < end
+            ).order_by(SalesDailyCategory.day, SalesDailyCategory.category)
+        ]
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'group_by': group_by,
+        'rows': rows,
+        'totals': {
+            'units': sum(row['units'] for row in rows),
+            'revenue': round(sum(row['revenue'] for row in rows), 2)
+        }
+    }
+
+
+def default_range(days=30):
+    """Last ``days`` days including today"""
+    end = datetime.utcnow().date() + timedelta(days=1)
+    return end - timedelta(days=days), end
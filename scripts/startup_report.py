@@ -0,0 +1,65 @@
+"""Measure backend cold-start cost in fresh interpreters.
+
+Usage: python scripts/startup_report.py [--runs N]
+
+Each run starts a new Python process and reports the median time to import
+the app module, build the app with create_app(), and import the Stripe SDK
+that the payment routes load lazily.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, resource, sys, time
+sys.path.insert(0, sys.argv[1])
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+flask_app = app.create_app()
+created = time.perf_counter()
+modules = len(sys.modules)
+stripe_loaded = 'stripe' in sys.modules
+import stripe
+stripe_done = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'stripe_import_ms': (stripe_done - created) * 1000,
+    'modules_after_create_app': modules,
+    'stripe_loaded_by_create_app': stripe_loaded,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+'''
+
+
+def run_probe():
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, ROOT],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    samples = [run_probe() for _ in range(args.runs)]
+    print(f'Startup report ({args.runs} runs, median)')
+    for key in ('import_ms', 'create_app_ms', 'stripe_import_ms', 'max_rss_mb'):
+        print(f'  {key:<28} {statistics.median(sample[key] for sample in samples):8.1f}')
+    print(f"  {'modules_after_create_app':<28} {samples[-1]['modules_after_create_app']:8d}")
+    print(f"  {'stripe_loaded_by_create_app':<28} {str(samples[-1]['stripe_loaded_by_create_app']):>8}")
+
+
+if __name__ == '__main__':
+    main()
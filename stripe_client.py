@@ -0,0 +1,58 @@
+import os
+
+# Upper bound for one Stripe HTTP call; requests with a deadline get less
+STRIPE_TIMEOUT_SECONDS = float(os.environ.get('STRIPE_TIMEOUT_SECONDS', 30))
+
+_stripe = None
+
+
+def _deadline_http_client(stripe):
+    """A requests-based Stripe client whose timeout shrinks to the request's remaining budget"""
+    import requests
+
+    import deadlines
+
+    class DeadlineRequestsClient(stripe.http_client.RequestsClient):
+        # The base class reads self._timeout for every call, including retries
+        @property
+        def _timeout(self):
+            remaining = deadlines.remaining_seconds()
+            if remaining is None:
+                return self._default_timeout
+            return min(self._default_timeout, max(remaining, 0.001))
+
+        @_timeout.setter
+        def _timeout(self, value):
+            self._default_timeout = value
+
+        def request(self, method, url, headers, post_data=None):
+            deadlines.check('stripe')
+            return super().request(method, url, headers, post_data)
+
+        def request_stream(self, method, url, headers, post_data=None):
+            deadlines.check('stripe')
+            return super().request_stream(method, url, headers, post_data)
+
+        def _handle_request_error(self, e):
+            if isinstance(e, requests.exceptions.Timeout):
+                remaining = deadlines.remaining_seconds()
+                if remaining is not None and remaining < self._default_timeout:
+                    deadlines.mark_exceeded('stripe')
+            super()._handle_request_error(e)
+
+    return DeadlineRequestsClient(timeout=STRIPE_TIMEOUT_SECONDS)
+
+
+def get_stripe():
+    """Import and configure the Stripe SDK on first use.
+
+    The SDK is large and only the payment routes need it, so importing it
+    lazily keeps it out of CLI commands, release steps and test startup.
+    """
+    global _stripe
+    if _stripe is None:
+        import stripe
+        stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
+        stripe.default_http_client = _deadline_http_client(stripe)
+        _stripe = stripe
+    return _stripe
@@ -0,0 +1,192 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, request
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._:-]{1,128}$')
+
+# Set per request (per thread or greenlet), read by the log filter and the SQL comment hook
+request_id_var = contextvars.ContextVar('request_id', default=None)
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id', 'taskName'}
+
+_listener = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp each record with the current request ID, including DB and Stripe library logs"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Enqueue records with args merged but the traceback and ``extra`` fields kept separate"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the message, request ID and any ``extra`` fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            entry['request_id'] = request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def _start_listener(handler):
+    """Drain the log queue on a background thread through ``handler``"""
+    global _listener
+    log_queue = queue.SimpleQueue()
+    for existing in logging.getLogger().handlers:
+        if isinstance(existing, logging.handlers.QueueHandler):
+            existing.queue = log_queue
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    return log_queue
+
+
+def _stop_listener():
+    # Registered once per configure_logging call, so it can run more than once
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_logging(level=logging.INFO, log_format=None):
+    """Route all logging through a queue so request threads never wait on stderr.
+
+    The QueueHandler only enqueues records; a listener thread formats and
+    writes them. Forked gunicorn workers do not inherit that thread, so a
+    fresh queue and listener are started in each child.
+    """
+    root = logging.getLogger()
+    if any(isinstance(handler, logging.handlers.QueueHandler) for handler in root.handlers):
+        return
+
+    log_format = (log_format or os.environ.get('LOG_FORMAT', 'json')).lower()
+    output = logging.StreamHandler(sys.stderr)
+    if log_format == 'json':
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s'))
+
+    queue_handler = _QueueHandler(queue.SimpleQueue())
+    # Runs in the calling thread, where the request's context variable is visible
+    queue_handler.addFilter(RequestIdFilter())
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _start_listener(output)
+    os.register_at_fork(after_in_child=lambda: _start_listener(output))
+    atexit.register(_stop_listener)
+
+
+def _tag_statement(conn, cursor, statement, parameters, context, executemany):
+    """Append the request ID as a SQL comment so it shows up in database logs"""
+    request_id = request_id_var.get()
+    if request_id:
+        # REQUEST_ID_PATTERN rules out anything that could close the comment
+        statement = f"{statement} /* request_id='{request_id}' */"
+    return statement, parameters
+
+
+def init_app(app):
+    """Assign request IDs, tag SQL with them and emit sampled access log lines"""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    if not event.contains(Engine, 'before_cursor_execute', _tag_statement):
+        event.listen(Engine, 'before_cursor_execute', _tag_statement, retval=True)
+
+    logger = logging.getLogger('access')
+    sample_rates = app.config['LOG_SAMPLE_RATES']
+    default_rate = app.config['LOG_SAMPLE_DEFAULT']
+
+    @app.before_request
+    def assign_request_id():
+        incoming = request.headers.get(REQUEST_ID_HEADER, '')
+        request_id = incoming if REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+        g.request_id = request_id
+        g.request_started = time.perf_counter()
+        g.request_id_token = request_id_var.set(request_id)
+
+    @app.after_request
+    def log_request(response):
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers[REQUEST_ID_HEADER] = request_id
+
+        # Errors are always logged; successes are sampled per endpoint
+        if response.status_code < 400:
+            rate = sample_rates.get(request.endpoint, default_rate)
+            if rate <= 0 or (rate < 1 and random.random() >= rate):
+                return response
+
+        started = g.get('request_started')
+        level = logging.ERROR if response.status_code >= 500 else (
+            logging.WARNING if response.status_code >= 400 else logging.INFO
+        )
+        logger.log(level, f"{request.method} {request.path} {response.status_code}", extra={
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2) if started else None,
+        })
+        return response
+
+    @app.teardown_request
+    def clear_request_id(exc):
+        token = g.pop('request_id_token', None)
+        if token is not None:
+            request_id_var.reset(token)
+
+
+def parse_sample_rates(value):
+    """Parse ``endpoint=rate,...`` (e.g. ``catalog.get_products=0.05,system.health_check=0``)"""
+    rates = {}
+    for item in (value or '').split(','):
+        endpoint, _, rate = item.strip().partition('=')
+        if endpoint and rate:
+            rates[endpoint] = float(rate)
+    return rates
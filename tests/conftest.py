@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from app import create_app
+import bootstrap
+import categories
+from database import db
+from models import Order, Product, User
+
+ADMIN_EMAIL = 'admin@example.com'
+PASSWORD = 'Passw0rd!x'
+
+
+@pytest.fixture
+def app():
+    """App on a fresh in-memory SQLite database"""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'ADMIN_EMAILS': {ADMIN_EMAIL},
+        'RATE_LIMITS_ENABLED': False,
+        'STRIPE_PUBLISHABLE_KEY': 'pk_test_123',
+    })
+    with app.app_context():
+        db.create_all()
+        bootstrap.storefront_cache.clear()
+        categories.clear_cache()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def signup(client, email):
+    """Sign up a user and return its Authorization header"""
+    response = client.post('/v1/signup', json={'email': email, 'password': PASSWORD})
+    assert response.status_code == 201, response.get_json()
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+
+@pytest.fixture
+def auth_headers(client):
+    return signup(client, 'shopper@example.com')
+
+
+@pytest.fixture
+def admin_headers(client):
+    return signup(client, ADMIN_EMAIL)
+
+
+@pytest.fixture
+def make_product(app):
+    """Create and commit a product; keyword arguments override the defaults"""
+    def make(name='Widget', price=10, category=None, stock_quantity=10, **kwargs):
+        product = Product(name=name, price=price, category=category, stock_quantity=stock_quantity, **kwargs)
+        db.session.add(product)
+        db.session.commit()
+        return product
+    return make
+
+
+@pytest.fixture
+def make_order(app):
+    """Create and commit an order for ``products``; keyword arguments override Order columns"""
+    user = User(email='buyer@example.com')
+    user.set_password(PASSWORD)
+    db.session.add(user)
+    db.session.commit()
+
+    def make(products, quantity=1, status=Order.STATUS_COMPLETED, **kwargs):
+        items = [{
+            'product_id': product.id,
+            'quantity': quantity,
+            'total': float(product.price) * quantity,
+            'product': product.to_dict()
+        } for product in products]
+        order = Order(
+            user_id=user.id, status=status, items=json.dumps(items),
+            total_amount=sum(item['total'] for item in items), **kwargs
+        )
+        db.session.add(order)
+        db.session.commit()
+        return order
+    return make
@@ -0,0 +1,66 @@
+import pytest
+
+import admission
+from app import create_app
+from database import db
+
+
+@pytest.fixture
+def limited_app(tmp_path, monkeypatch):
+    """App with rate limits on, a private bucket file and a small auth bucket"""
+    monkeypatch.setenv('RATE_LIMIT_STORE_PATH', str(tmp_path / 'buckets.db'))
+    monkeypatch.setitem(admission.ROUTE_CLASSES, 'auth', dict(admission.ROUTE_CLASSES['auth'], burst=2))
+
+    def make(**config):
+        app = create_app(dict({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'RATE_LIMITS_ENABLED': True,
+        }, **config))
+        with app.app_context():
+            db.create_all()
+        return app
+    return make
+
+
+def signin_statuses(client, forwarded_for, attempts=3):
+    return [
+        client.post(
+            '/v1/signin', json={'email': 'nobody@example.com', 'password': 'wrong'},
+            headers={'X-Forwarded-For': forwarded_for}
+        ).status_code
+        for _ in range(attempts)
+    ]
+
+
+def test_auth_buckets_are_per_forwarded_client(limited_app):
+    client = limited_app(TRUSTED_PROXY_HOPS=1).test_client()
+
+    assert signin_statuses(client, '203.0.113.1') == [401, 401, 429]
+    # A different client behind the same router keeps its own bucket
+    assert signin_statuses(client, '203.0.113.2', attempts=1) == [401]
+    # Only the hop the router appended is trusted; a spoofed first entry is ignored
+    assert signin_statuses(client, '198.51.100.9, 203.0.113.1', attempts=1) == [429]
+
+
+def test_forwarded_header_is_ignored_without_trusted_proxies(limited_app):
+    client = limited_app(TRUSTED_PROXY_HOPS=0).test_client()
+
+    assert signin_statuses(client, '203.0.113.1') == [401, 401, 429]
+    assert signin_statuses(client, '203.0.113.2', attempts=1) == [429]
+
+
+def test_gevent_workers_use_redis_or_never_wait_on_sqlite(tmp_path, monkeypatch):
+    monkeypatch.setenv('RATE_LIMIT_STORE_PATH', str(tmp_path / 'buckets.db'))
+    monkeypatch.delenv('RATE_LIMIT_REDIS_URL', raising=False)
+    monkeypatch.setenv('REDIS_URL', 'redis://localhost:6379/0')
+
+    monkeypatch.setattr(admission, '_gevent_patched', lambda: False)
+    assert isinstance(admission.get_bucket_store(), admission.SQLiteBucketStore)
+
+    monkeypatch.setattr(admission, '_gevent_patched', lambda: True)
+    assert isinstance(admission.get_bucket_store(), admission.RedisBucketStore)
+
+    monkeypatch.delenv('REDIS_URL')
+    store = admission.get_bucket_store()
+    assert isinstance(store, admission.SQLiteBucketStore) and store.busy_timeout == 0
@@ -0,0 +1,97 @@
+import io
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import aws_config
+
+BUCKET = 'shop-images'
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    """Moto-backed S3 with an empty bucket and fresh module caches"""
+    for name, value in {
+        'AWS_ACCESS_KEY_ID': 'testing', 'AWS_SECRET_ACCESS_KEY': 'testing', 'AWS_REGION': 'us-east-1'
+    }.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setattr(aws_config, '_clients', {})
+    aws_config.presigned_url_cache.clear()
+    with mock_aws():
+        boto3.client('s3', region_name='us-east-1').create_bucket(Bucket=BUCKET)
+        yield
+    aws_config.presigned_url_cache.clear()
+
+
+@pytest.fixture
+def manager(s3, monkeypatch):
+    manager = aws_config.S3Manager(bucket_name=BUCKET)
+    signed = []
+    sign = manager.client.generate_presigned_url
+
+    def counting(operation, Params, ExpiresIn):
+        signed.append(Params['Key'])
+        return sign(operation, Params=Params, ExpiresIn=ExpiresIn)
+
+    monkeypatch.setattr(manager.client, 'generate_presigned_url', counting)
+    manager.signed = signed
+    return manager
+
+
+def test_client_is_shared_per_region(s3):
+    client = aws_config.get_s3_client()
+
+    assert aws_config.get_s3_client('us-east-1') is client
+    assert aws_config.S3Manager(bucket_name=BUCKET).client is client
+    assert aws_config.get_s3_client('eu-west-1') is not client
+    assert client.meta.config.max_pool_connections == aws_config.S3_MAX_POOL_CONNECTIONS
+
+
+def test_upload_and_delete(manager):
+    url = manager.upload_file(io.BytesIO(b'png'), 'products/1.png', content_type='image/png')
+
+    assert url == f'https://{BUCKET}.s3.us-east-1.amazonaws.com/products/1.png'
+    head = manager.client.head_object(Bucket=BUCKET, Key='products/1.png')
+    assert head['ContentType'] == 'image/png'
+    assert manager.delete_file('products/1.png')
+
+
+def test_presigned_url_is_reused_until_refresh(manager, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(aws_config.time, 'time', lambda: now[0])
+
+    url = manager.generate_presigned_url('products/1.png', expiration=100)
+    assert 'products/1.png' in url
+    now[0] += 70
+    assert manager.generate_presigned_url('products/1.png', expiration=100) == url
+    assert manager.signed == ['products/1.png']
+
+    # Less than a quarter of the lifetime is left: sign a fresh URL
+    now[0] += 10
+    manager.generate_presigned_url('products/1.png', expiration=100)
+    assert manager.signed == ['products/1.png', 'products/1.png']
+
+
+def test_batch_signs_each_missing_object_once(manager):
+    manager.generate_presigned_url('a.png')
+
+    urls = manager.generate_presigned_urls(['a.png', 'b.png', 'b.png', None, 'c.png'])
+
+    assert list(urls) == ['a.png', 'b.png', 'c.png']
+    assert manager.signed == ['a.png', 'b.png', 'c.png']
+    assert manager.generate_presigned_urls(['c.png', 'b.png']) == {'c.png': urls['c.png'], 'b.png': urls['b.png']}
+    assert len(manager.signed) == 3
+
+
+def test_cache_evicts_least_recently_used():
+    cache = aws_config.PresignedUrlCache(maxsize=2)
+    for name in ('a', 'b'):
+        cache.put(('bucket', name, 3600), f'url-{name}', aws_config.time.time())
+
+    assert cache.get(('bucket', 'a', 3600)) == 'url-a'
+    cache.put(('bucket', 'c', 3600), 'url-c', aws_config.time.time())
+
+    assert cache.get(('bucket', 'b', 3600)) is None
+    assert cache.get(('bucket', 'a', 3600)) == 'url-a'
+    assert cache.get(('bucket', 'c', 3600)) == 'url-c'
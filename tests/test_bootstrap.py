@@ -0,0 +1,75 @@
+import bootstrap
+
+
+def get(client, headers=None, **params):
+    response = client.get('/v1/bootstrap', query_string=params, headers=headers or {})
+    assert response.status_code == 200, response.get_json()
+    return response
+
+
+def test_anonymous_payload_shape(client, make_product):
+    for i in range(bootstrap.BOOTSTRAP_PAGE_SIZE + 1):
+        make_product(name=f'Item {i:02d}', category='Books')
+    make_product(name='Hidden', category='Books', is_active=False)
+
+    response = get(client)
+
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    assert response.headers['Vary'] == 'Authorization, X-Guest-Cart'
+    payload = response.get_json()
+    assert set(payload) == {'catalog', 'categories', 'cart', 'stripe'}
+    assert payload['cart'] is None
+    assert payload['stripe'] == {'publicKey': 'pk_test_123'}
+    catalog = payload['catalog']
+    assert set(catalog) == {'products', 'has_more', 'last_event_id'}
+    assert len(catalog['products']) == bootstrap.BOOTSTRAP_PAGE_SIZE
+    assert catalog['products'][0]['name'] == 'Item 00'
+    assert catalog['has_more'] is True
+    assert payload['categories'] == [{'name': 'Books', 'count': bootstrap.BOOTSTRAP_PAGE_SIZE + 1}]
+
+
+def test_signed_in_payload_includes_the_cart(client, auth_headers, make_product):
+    product = make_product(price=4)
+    client.post('/v1/cart/add', json={'product_id': product.id, 'quantity': 3}, headers=auth_headers)
+
+    cart = get(client, auth_headers).get_json()['cart']
+
+    assert cart['item_count'] == 3
+    assert cart['cart_total'] == 12
+    assert [item['product_id'] for item in cart['cart_items']] == [product.id]
+
+
+def test_category_page_covers_the_subtree(client, auth_headers):
+    for name, category in (('Headphones', 'Electronics > Audio'), ('Watch', 'Electronics'), ('Tent', 'Outdoors')):
+        response = client.post('/v1/products', json={'name': name, 'price': 5, 'category': category},
+                               headers=auth_headers)
+        assert response.status_code == 201
+
+    payload = get(client, category='Electronics').get_json()
+
+    assert [product['name'] for product in payload['catalog']['products']] == ['Headphones', 'Watch']
+    assert {'name': 'Electronics', 'count': 2} in payload['categories']
+    assert {'name': 'Electronics > Audio', 'count': 1} in payload['categories']
+
+
+def test_unknown_category_is_empty_and_not_cached(client, make_product):
+    make_product(category='Books')
+    bootstrap.storefront_cache.clear()
+
+    catalog = get(client, category='Nope').get_json()['catalog']
+
+    assert catalog['products'] == [] and catalog['has_more'] is False
+    assert bootstrap.storefront_cache.get(('page', 'Nope', bootstrap.BOOTSTRAP_PAGE_SIZE)) is None
+
+
+def test_catalog_page_is_cached_until_products_change(client, auth_headers, make_product):
+    make_product(name='Anvil')
+    assert [p['name'] for p in get(client).get_json()['catalog']['products']] == ['Anvil']
+
+    # Written behind the API's back: the cached page is served
+    make_product(name='Bellows')
+    assert [p['name'] for p in get(client).get_json()['catalog']['products']] == ['Anvil']
+
+    # Creating through the API clears the cache
+    client.post('/v1/products', json={'name': 'Chisel', 'price': 5}, headers=auth_headers)
+    assert [p['name'] for p in get(client).get_json()['catalog']['products']] == ['Anvil', 'Bellows', 'Chisel']
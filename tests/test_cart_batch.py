@@ -0,0 +1,107 @@
+import pytest
+
+from cart_store import SQLAlchemyCartStore
+
+
+def cart_quantities(client, headers):
+    cart = client.get('/v1/cart', headers=headers).get_json()
+    return {item['product_id']: item['quantity'] for item in cart['cart_items']}
+
+
+def batch(client, headers, *operations):
+    return client.post('/v1/cart/batch', json={'operations': list(operations)}, headers=headers)
+
+
+@pytest.fixture
+def products(make_product):
+    return [make_product(name=name, stock_quantity=5) for name in ('Apple', 'Banana', 'Cherry')]
+
+
+def test_mixed_batch_is_replayed_in_order(client, auth_headers, products):
+    apple, banana, cherry = (product.id for product in products)
+    batch(client, auth_headers, {'op': 'add', 'product_id': apple}, {'op': 'add', 'product_id': banana})
+
+    response = batch(
+        client, auth_headers,
+        {'op': 'add', 'product_id': apple, 'quantity': 2},
+        {'op': 'set', 'product_id': banana, 'quantity': 4},
+        {'op': 'add', 'product_id': cherry},
+        {'op': 'remove', 'product_id': cherry},
+        {'op': 'add', 'product_id': cherry, 'quantity': 3},
+        {'op': 'remove', 'product_id': apple},
+        {'op': 'add', 'product_id': apple},
+    )
+
+    assert response.status_code == 200, response.get_json()
+    assert cart_quantities(client, auth_headers) == {apple: 1, banana: 4, cherry: 3}
+
+
+def test_one_failing_operation_rejects_the_whole_batch(client, auth_headers, products):
+    apple, banana, _ = (product.id for product in products)
+    batch(client, auth_headers, {'op': 'add', 'product_id': apple})
+
+    over_stock = batch(
+        client, auth_headers,
+        {'op': 'set', 'product_id': apple, 'quantity': 2},
+        {'op': 'add', 'product_id': banana, 'quantity': 6},
+    )
+    unknown = batch(
+        client, auth_headers,
+        {'op': 'add', 'product_id': banana},
+        {'op': 'add', 'product_id': '0190f7a2-0000-7000-8000-000000000000'},
+    )
+
+    assert over_stock.status_code == 400
+    assert unknown.status_code == 404
+    assert cart_quantities(client, auth_headers) == {apple: 1}
+
+
+def test_batch_rolls_back_when_the_write_fails(client, auth_headers, products, monkeypatch):
+    apple, banana, _ = (product.id for product in products)
+    batch(client, auth_headers, {'op': 'add', 'product_id': apple})
+    apply = SQLAlchemyCartStore.apply
+
+    def apply_then_fail(self, owner_id, changes):
+        apply(self, owner_id, changes)
+        raise RuntimeError('connection lost')
+
+    monkeypatch.setattr(SQLAlchemyCartStore, 'apply', apply_then_fail)
+    response = batch(
+        client, auth_headers,
+        {'op': 'remove', 'product_id': apple},
+        {'op': 'add', 'product_id': banana},
+    )
+    monkeypatch.undo()
+
+    assert response.status_code == 500
+    assert cart_quantities(client, auth_headers) == {apple: 1}
+
+
+def test_batch_size_is_limited(app, client, auth_headers, products):
+    app.config['CART_BATCH_MAX_OPERATIONS'] = 3
+    operation = {'op': 'add', 'product_id': products[0].id}
+
+    assert batch(client, auth_headers, *[operation] * 3).status_code == 200
+    response = batch(client, auth_headers, *[operation] * 4)
+
+    assert response.status_code == 400
+    assert 'At most 3 operations' in response.get_json()['error']
+
+
+@pytest.mark.parametrize('product_id', [['a'], {'id': 1}, 7])
+def test_non_string_product_id_is_reported_as_such(client, auth_headers, products, product_id):
+    response = batch(
+        client, auth_headers,
+        {'op': 'add', 'product_id': products[0].id},
+        {'op': 'add', 'product_id': product_id},
+    )
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Operation 1 product_id must be a string'
+
+
+def test_bad_quantity_names_the_operation(client, auth_headers, products):
+    response = batch(client, auth_headers, {'op': 'set', 'product_id': products[0].id, 'quantity': 'lots'})
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Operation 0 has invalid quantity format'
@@ -0,0 +1,126 @@
+import json
+import threading
+
+import pytest
+
+from cart_store import DIRTY_SET_KEY, GUEST_PREFIX, InMemoryKV, KVCartStore
+from database import db
+from models import CartItem, Order, User
+from tests.conftest import PASSWORD
+
+GUEST_TOKEN = 'guest-token-0123456789'
+
+
+@pytest.fixture
+def kv_store(app):
+    """Swap the app's cart store for a write-behind store on an in-process KV"""
+    store = KVCartStore(InMemoryKV())
+    app.extensions['cart_store'] = store
+    return store
+
+
+def table_quantities(user_id):
+    db.session.expire_all()
+    return {item.product_id: item.quantity for item in CartItem.query.filter_by(user_id=user_id)}
+
+
+def test_changes_are_written_behind_by_flush_dirty(client, auth_headers, kv_store, make_product):
+    widget = make_product(name='Widget')
+    gadget = make_product(name='Gadget')
+    user_id = User.query.filter_by(email='shopper@example.com').one().id
+
+    client.post('/v1/cart/add', json={'product_id': widget.id, 'quantity': 2}, headers=auth_headers)
+    client.post('/v1/cart/add', json={'product_id': gadget.id}, headers=auth_headers)
+    assert table_quantities(user_id) == {}
+    assert kv_store.client.smembers(DIRTY_SET_KEY) == {user_id}
+
+    assert kv_store.flush_dirty() == 1
+    assert table_quantities(user_id) == {widget.id: 2, gadget.id: 1}
+    assert kv_store.client.smembers(DIRTY_SET_KEY) == set()
+
+    client.delete('/v1/cart/remove', json={'product_id': gadget.id}, headers=auth_headers)
+    assert kv_store.flush_dirty() == 1
+    assert table_quantities(user_id) == {widget.id: 2}
+
+
+def test_guest_cart_is_merged_on_signin(client, auth_headers, kv_store, make_product):
+    widget = make_product(name='Widget')
+    gadget = make_product(name='Gadget')
+    guest_headers = {'X-Guest-Cart': GUEST_TOKEN}
+
+    client.post('/v1/cart/add', json={'product_id': widget.id}, headers=auth_headers)
+    client.post('/v1/cart/add', json={'product_id': widget.id, 'quantity': 2}, headers=guest_headers)
+    client.post('/v1/cart/add', json={'product_id': gadget.id}, headers=guest_headers)
+
+    response = client.post(
+        '/v1/signin', json={'email': 'shopper@example.com', 'password': PASSWORD}, headers=guest_headers
+    )
+    assert response.status_code == 200
+
+    cart = client.get('/v1/cart', headers=auth_headers).get_json()
+    assert {item['product_id']: item['quantity'] for item in cart['cart_items']} == {widget.id: 3, gadget.id: 1}
+    assert kv_store.get_quantities(f'{GUEST_PREFIX}{GUEST_TOKEN}') == {}
+
+
+def test_checkout_reads_the_flushed_cart(client, auth_headers, kv_store, make_product):
+    widget = make_product(name='Widget', price=5)
+    user_id = User.query.filter_by(email='shopper@example.com').one().id
+    client.post('/v1/cart/add', json={'product_id': widget.id, 'quantity': 3}, headers=auth_headers)
+
+    response = client.post('/v1/checkout', json={}, headers=auth_headers)
+
+    assert response.status_code == 200, response.get_json()
+    order = db.session.get(Order, response.get_json()['order']['id'])
+    assert float(order.total_amount) == 15.0
+    assert table_quantities(user_id) == {}
+    assert kv_store.get_quantities(user_id) == {}
+
+
+def test_concurrent_merges_into_one_cart_lose_nothing(app):
+    store = KVCartStore(InMemoryKV())
+    target = f'{GUEST_PREFIX}target'
+    sources = [f'{GUEST_PREFIX}source-{number}' for number in range(8)]
+    for source in sources:
+        store.apply(source, {'p1': 1, 'p2': 2})
+
+    threads = [threading.Thread(target=store.merge, args=(source, target)) for source in sources]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert store.get_quantities(target) == {'p1': 8, 'p2': 16}
+
+
+class RacingClient(InMemoryKV):
+    """Another writer changes ``race_key`` between a transaction's read and its EXEC, once"""
+
+    def __init__(self, race_key):
+        super().__init__()
+        self.race_key = race_key
+        self.attempts = 0
+
+    def transaction(self, func, *watches):
+        if watches != (self.race_key,):
+            return super().transaction(func, *watches)
+        while True:
+            self.attempts += 1
+            snapshot = {name: dict(value) for name, value in self._data.items() if isinstance(value, dict)}
+            func(self)
+            if self.attempts > 1:
+                return []
+            # Discard the attempt as a failed WATCH would, after the other write lands
+            self._data.update(snapshot)
+            self.hset(self.race_key, mapping={'p1': json.dumps({'q': 5, 'a': 0, 'u': 0})})
+
+
+def test_updates_are_recomputed_when_the_cart_changes_underneath(app):
+    owner = f'{GUEST_PREFIX}racing'
+    client = RacingClient(KVCartStore._key(owner))
+    store = KVCartStore(client)
+    store.apply(f'{GUEST_PREFIX}source', {'p1': 1})
+
+    store.merge(f'{GUEST_PREFIX}source', owner)
+
+    assert client.attempts == 2
+    assert store.get_quantities(owner) == {'p1': 6}
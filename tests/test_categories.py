@@ -0,0 +1,80 @@
+import categories
+from database import db
+from models import CategoryClosure, Product, ProductCategory
+
+
+def create(client, headers, name, category):
+    response = client.post('/v1/products', json={'name': name, 'price': 5, 'category': category}, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['product']
+
+
+def names(client, category):
+    response = client.get('/v1/products', query_string={'category': category})
+    assert response.status_code == 200
+    return sorted(product['name'] for product in response.get_json()['products'])
+
+
+def test_category_filter_covers_subtree(client, auth_headers):
+    create(client, auth_headers, 'Headphones', 'Electronics > Audio')
+    create(client, auth_headers, 'Earbuds', 'Electronics > Audio > In-ear')
+    create(client, auth_headers, 'Watch', 'Electronics > Wearables')
+    create(client, auth_headers, 'Tent', 'Outdoors')
+
+    assert names(client, 'Electronics') == ['Earbuds', 'Headphones', 'Watch']
+    assert names(client, 'Electronics > Audio') == ['Earbuds', 'Headphones']
+    assert names(client, 'Electronics>Audio>In-ear') == ['Earbuds']
+    assert names(client, 'Audio') == []
+
+
+def test_paths_are_normalized_and_closure_is_complete(client, auth_headers):
+    product = create(client, auth_headers, 'Earbuds', ' Electronics>Audio >In-ear ')
+    assert product['category'] == 'Electronics > Audio > In-ear'
+
+    leaf = categories.category_ids()['Electronics > Audio > In-ear']
+    depths = sorted(row.depth for row in CategoryClosure.query.filter_by(descendant_id=leaf))
+    assert depths == [0, 1, 2]
+
+
+def test_overlong_path_is_rejected(client, auth_headers):
+    response = client.post('/v1/products', json={'name': 'x', 'price': 5, 'category': 'A' * 101}, headers=auth_headers)
+    assert response.status_code == 400
+
+
+def test_category_tree_counts_active_products(client, auth_headers, make_product):
+    create(client, auth_headers, 'Headphones', 'Electronics > Audio')
+    create(client, auth_headers, 'Watch', 'Electronics > Wearables')
+    hidden = create(client, auth_headers, 'Old radio', 'Electronics > Audio')
+    make_product(name='Unused')
+    db.session.get(Product, hidden['id']).is_active = False
+    db.session.commit()
+    categories.clear_cache()
+
+    response = client.get('/v1/categories')
+    assert response.status_code == 200
+    assert 'max-age' in response.headers['Cache-Control']
+    (electronics,) = response.get_json()['categories']
+    assert electronics['path'] == 'Electronics'
+    assert electronics['product_count'] == 2
+    assert {child['name']: child['product_count'] for child in electronics['children']} == {
+        'Audio': 1, 'Wearables': 1
+    }
+
+
+def test_sync_links_products_created_outside_the_api(client, auth_headers, make_product):
+    make_product(name='Old laptop', category='Electronics')
+    make_product(name='Old speaker', category='Electronics>Audio')
+    create(client, auth_headers, 'New laptop', 'Electronics')
+    categories.clear_cache()
+
+    # The path is in the tree now, but only the API-created product is linked
+    assert names(client, 'Electronics') == ['New laptop']
+
+    assert categories.sync_products(batch_size=1) == (3, 2)
+    categories.clear_cache()
+    assert names(client, 'Electronics') == ['New laptop', 'Old laptop', 'Old speaker']
+    assert ProductCategory.query.count() == 3
+
+    # Idempotent
+    assert categories.sync_products() == (3, 2)
+    assert ProductCategory.query.count() == 3
@@ -0,0 +1,75 @@
+import time
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+from database import db
+import deadlines
+
+
+@pytest.fixture
+def slow_statements(app):
+    """Make every SQL statement take 60ms"""
+    def sleep(*args):
+        time.sleep(0.06)
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', sleep)
+    yield
+    event.remove(engine, 'before_cursor_execute', sleep)
+
+
+def test_request_within_budget_succeeds(client, make_product):
+    make_product()
+
+    response = client.get('/v1/products')
+
+    assert response.status_code == 200
+    assert 'Retry-After' not in response.headers
+
+
+def test_request_queued_past_its_budget_is_shed(client):
+    queued_at = int(time.time() * 1000) - 1000
+    before = deadlines.stats().get('browse:queue', 0)
+
+    response = client.get('/v1/products', headers={'X-Request-Start': f't={queued_at}'})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(deadlines.DEADLINE_RETRY_AFTER)
+    assert deadlines.stats()['browse:queue'] == before + 1
+
+
+def test_budget_spent_in_the_database_returns_503(client, make_product, slow_statements, monkeypatch):
+    make_product()
+    monkeypatch.setitem(deadlines.DEADLINE_BUDGETS_MS, 'browse', 50)
+    before = deadlines.stats().get('browse:db', 0)
+
+    response = client.get('/v1/products')
+
+    assert response.status_code == 503
+    assert response.get_json() == {'error': 'Request deadline exceeded, please retry'}
+    assert deadlines.stats()['browse:db'] == before + 1
+
+
+def test_routes_without_a_budget_are_not_limited(client, admin_headers, slow_statements):
+    response = client.get('/v1/admin/debug/memory', headers=admin_headers)
+
+    assert response.status_code == 200
+
+
+def test_sqlite_statement_is_interrupted_when_the_budget_runs_out(app):
+    db.session.remove()
+    deadline = deadlines.Deadline('browse', 30)
+    token = deadlines.deadline_var.set(deadline)
+    try:
+        with pytest.raises(OperationalError, match='interrupted'):
+            db.session.execute(text(
+                'WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 100000000) '
+                'SELECT count(*) FROM n'
+            ))
+    finally:
+        deadlines.deadline_var.reset(token)
+        db.session.rollback()
+
+    assert deadline.exceeded == 'db'
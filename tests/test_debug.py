@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+import profiling
+
+
+@pytest.fixture(autouse=True)
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+
+
+def test_debug_endpoints_require_admin(client, auth_headers):
+    response = client.get('/v1/admin/debug/memory', headers=auth_headers)
+    assert response.status_code == 403
+
+
+def test_memory_report(client, admin_headers):
+    response = client.get('/v1/admin/debug/memory', headers=admin_headers)
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report['pid'] > 0
+    assert 'gc' in report
+
+
+def test_profile_runs_and_exports_flamegraphs(client, admin_headers):
+    response = client.post('/v1/admin/debug/profile?seconds=1&interval_ms=5', headers=admin_headers)
+    assert response.status_code == 202
+    profile_id = response.get_json()['profile_id']
+
+    assert client.post('/v1/admin/debug/profile?seconds=1', headers=admin_headers).status_code == 409
+
+    give_up = time.monotonic() + 10
+    while True:
+        meta = client.get(f'/v1/admin/debug/profile/{profile_id}', headers=admin_headers).get_json()
+        if meta['status'] != 'running' or time.monotonic() > give_up:
+            break
+        time.sleep(0.1)
+    assert meta['status'] == 'done'
+    assert meta['samples'] > 0
+
+    collapsed = client.get(f'/v1/admin/debug/profile/{profile_id}?format=collapsed', headers=admin_headers)
+    assert collapsed.status_code == 200
+    assert collapsed.mimetype == 'text/plain'
+    speedscope = client.get(f'/v1/admin/debug/profile/{profile_id}?format=speedscope', headers=admin_headers)
+    assert speedscope.status_code == 200
+    assert client.get(f'/v1/admin/debug/profile/{profile_id}?format=svg', headers=admin_headers).status_code == 400
+
+
+def test_profile_rejects_out_of_range_duration(client, admin_headers):
+    response = client.post('/v1/admin/debug/profile?seconds=0', headers=admin_headers)
+    assert response.status_code == 400
+
+
+def test_tracemalloc_snapshot_diff(client, admin_headers):
+    assert client.post('/v1/admin/debug/tracemalloc/snapshots', headers=admin_headers).status_code == 409
+
+    assert client.post('/v1/admin/debug/tracemalloc/start', headers=admin_headers).status_code == 200
+    try:
+        base = client.post('/v1/admin/debug/tracemalloc/snapshots', headers=admin_headers)
+        assert base.status_code == 201
+        retained = [bytearray(1024) for _ in range(1000)]
+        current = client.post('/v1/admin/debug/tracemalloc/snapshots', headers=admin_headers)
+        assert current.status_code == 201
+
+        diff = client.get(
+            '/v1/admin/debug/tracemalloc/diff',
+            query_string={'base': base.get_json()['snapshot_id'], 'current': current.get_json()['snapshot_id']},
+            headers=admin_headers
+        )
+        assert diff.status_code == 200
+        assert diff.get_json()['top']
+        assert retained
+    finally:
+        client.post('/v1/admin/debug/tracemalloc/stop', headers=admin_headers)
+
+    missing = client.get('/v1/admin/debug/tracemalloc/diff?base=1-00000000&current=1-00000000', headers=admin_headers)
+    assert missing.status_code == 404
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from flask_jwt_extended import decode_token
+
+from database import db
+import idempotency
+from models import IdempotencyKey, Order
+
+KEY = 'checkout-1'
+
+
+@pytest.fixture
+def checkout(client, auth_headers, make_product):
+    product = make_product()
+    response = client.post('/v1/cart/add', json={'product_id': product.id}, headers=auth_headers)
+    assert response.status_code == 200, response.get_json()
+
+    def post():
+        return client.post('/v1/checkout', json={}, headers=dict(auth_headers, **{'Idempotency-Key': KEY}))
+    return post
+
+
+def stale_claim(app, auth_headers, lease_left=-1):
+    """An in-progress checkout key as left by a request that claimed it and died"""
+    with app.test_request_context('/v1/checkout', method='POST', json={}):
+        fingerprint = idempotency.request_fingerprint()
+    user_id = decode_token(auth_headers['Authorization'].split()[1])['sub']
+    record = IdempotencyKey.start(user_id, KEY, fingerprint, 3600, 60)
+    record.locked_until = datetime.utcnow() + timedelta(seconds=lease_left)
+    db.session.add(record)
+    db.session.commit()
+    return record
+
+
+def test_duplicate_replays_the_stored_response(checkout):
+    first = checkout()
+    second = checkout()
+
+    assert first.status_code == 200
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert second.get_json() == first.get_json()
+    assert Order.query.count() == 1
+
+
+def test_abandoned_key_is_taken_over(app, checkout, auth_headers):
+    stale_claim(app, auth_headers)
+
+    response = checkout()
+
+    assert response.status_code == 200
+    assert 'Idempotent-Replayed' not in response.headers
+    assert Order.query.count() == 1
+    record = IdempotencyKey.query.one()
+    assert record.is_completed and record.locked_until is None
+
+
+def test_key_within_its_lease_is_still_in_progress(app, checkout, auth_headers, monkeypatch):
+    monkeypatch.setattr(idempotency, 'IDEMPOTENCY_WAIT_TIMEOUT', 0.1)
+    stale_claim(app, auth_headers, lease_left=60)
+
+    response = checkout()
+
+    assert response.status_code == 409
+    assert Order.query.count() == 0
+
+
+def test_late_owner_does_not_overwrite_a_takeover(app, auth_headers):
+    record = stale_claim(app, auth_headers)
+    record_id, old_lease = record.id, record.locked_until
+    taken = idempotency._take_over(record)
+
+    assert taken is not None and taken.locked_until > old_lease
+    assert idempotency._owned(record_id, old_lease) is None
+    assert idempotency._owned(record_id, taken.locked_until) is not None
+    # A second retry racing on the same stale lease loses
+    stale = SimpleNamespace(id=record_id, locked_until=old_lease, key=KEY, user_id=taken.user_id)
+    assert idempotency._take_over(stale) is None
@@ -0,0 +1,63 @@
+import time
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
+
+import ids
+from database import db
+from models import Product
+
+
+def test_uuid7_sets_version_and_variant_bits():
+    value = ids.uuid7()
+
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+    assert abs((value.int >> 80) - time.time_ns() // 1_000_000) < 1000
+
+
+def test_uuid7_sorts_in_generation_order():
+    values = [ids.uuid7() for _ in range(2000)]
+
+    assert len(set(values)) == len(values)
+    assert sorted(values) == values
+    assert sorted(str(value) for value in values) == [str(value) for value in values]
+    assert sorted(value.bytes for value in values) == [value.bytes for value in values]
+
+
+def test_uuid7_stays_monotonic_when_the_counter_runs_out(monkeypatch):
+    # A frozen clock forces every ID into one millisecond, past the 12-bit counter
+    frozen_ns = (time.time_ns() // 1_000_000 + 60_000) * 1_000_000
+    monkeypatch.setattr(ids.time, 'time_ns', lambda: frozen_ns)
+    # Put the generator's clock back afterwards so later IDs are not minted in the future
+    monkeypatch.setattr(ids, '_last_ms', ids._last_ms)
+    monkeypatch.setattr(ids, '_counter', ids._counter)
+
+    values = [ids.uuid7() for _ in range(5000)]
+
+    assert sorted(values) == values and len(set(values)) == len(values)
+    assert (values[-1].int >> 80) > frozen_ns // 1_000_000
+
+
+def test_uuid_key_binds_strings_per_dialect():
+    key = ids.UUIDKey()
+    value = ids.uuid7()
+
+    assert key.process_bind_param(str(value).upper(), sqlite.dialect()) == value.bytes
+    assert key.process_bind_param(str(value).upper(), postgresql.dialect()) == str(value)
+    assert key.process_bind_param(value, sqlite.dialect()) == value.bytes
+    assert key.process_bind_param('not-a-uuid', postgresql.dialect()) == ids.NIL_UUID
+    assert key.process_bind_param(None, sqlite.dialect()) is None
+
+
+def test_uuid_key_round_trips_through_sqlite_as_16_bytes(make_product):
+    product_id = make_product().id
+
+    stored = db.session.execute(text('SELECT id FROM products')).scalar()
+    assert isinstance(stored, bytes) and stored == uuid.UUID(product_id).bytes
+
+    db.session.expire_all()
+    assert db.session.get(Product, product_id).id == product_id
+    assert Product.query.filter_by(id=product_id.upper()).one().id == product_id
+    assert Product.query.filter_by(id='not-a-uuid').first() is None
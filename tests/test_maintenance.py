@@ -0,0 +1,148 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import maintenance
+from database import db
+from models import Order, User
+
+
+class FakeIntentSource:
+    """Intent statuses split between the list window and individual retrieves"""
+
+    def __init__(self, listed=None, retrievable=None):
+        self.listed = listed or {}
+        self.retrievable = retrievable or {}
+        self.windows = []
+        self.retrieved = []
+
+    def statuses(self, intent_ids, created_from, created_to):
+        self.windows.append((created_from, created_to))
+        return {intent_id: self.listed[intent_id] for intent_id in intent_ids if intent_id in self.listed}
+
+    def retrieve(self, intent_id):
+        self.retrieved.append(intent_id)
+        return self.retrievable.get(intent_id)
+
+
+@pytest.fixture
+def pending_order(app, make_product):
+    user = User(email='buyer@example.com')
+    user.set_password('Passw0rd!x')
+    db.session.add(user)
+    product = make_product(stock_quantity=5)
+    db.session.commit()
+
+    def make(intent_id, hours_old=48):
+        order = Order(
+            user_id=user.id, total_amount=10, stripe_payment_intent_id=intent_id,
+            items=json.dumps([{'product_id': product.id, 'quantity': 1}]),
+            created_at=datetime.utcnow() - timedelta(hours=hours_old)
+        )
+        db.session.add(order)
+        db.session.commit()
+        return order.id
+    return make
+
+
+def status_of(order_id):
+    db.session.expire_all()
+    return db.session.get(Order, order_id).status
+
+
+def test_sweep_reconciles_by_intent_status(pending_order):
+    paid = pending_order('pi_paid')
+    abandoned = pending_order('pi_abandoned')
+    processing = pending_order('pi_processing')
+    fresh = pending_order('pi_fresh', hours_old=1)
+    source = FakeIntentSource(listed={
+        'pi_paid': 'succeeded', 'pi_abandoned': 'requires_payment_method', 'pi_processing': 'processing'
+    })
+
+    stats = maintenance.expire_pending_orders(source, ttl_hours=24)
+
+    assert stats['completed'] == 1 and stats['cancelled'] == 1 and stats['still_pending'] == 1
+    assert status_of(paid) == Order.STATUS_COMPLETED
+    assert status_of(abandoned) == Order.STATUS_CANCELLED
+    assert status_of(processing) == Order.STATUS_PENDING
+    assert status_of(fresh) == Order.STATUS_PENDING
+
+
+def test_intents_missing_from_the_window_are_retrieved_not_cancelled(pending_order):
+    paid = pending_order('pi_paid_late')
+    unreadable = pending_order('pi_unreadable')
+    deleted = pending_order('pi_deleted')
+    source = FakeIntentSource(retrievable={'pi_paid_late': 'succeeded', 'pi_deleted': maintenance.INTENT_MISSING})
+
+    stats = maintenance.expire_pending_orders(source, ttl_hours=24)
+
+    assert sorted(source.retrieved) == ['pi_deleted', 'pi_paid_late', 'pi_unreadable']
+    assert status_of(paid) == Order.STATUS_COMPLETED
+    assert status_of(unreadable) == Order.STATUS_PENDING
+    assert status_of(deleted) == Order.STATUS_CANCELLED
+    assert stats['unknown'] == 1
+
+
+def test_stripe_window_uses_utc_timestamps():
+    naive_utc = datetime(2026, 1, 1, 12, 0, 0)
+    expected = int(datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc).timestamp())
+    assert maintenance._unix_utc(naive_utc) == expected
+
+
+def test_intent_source_requires_a_secret_key(monkeypatch):
+    monkeypatch.delenv('STRIPE_SECRET_KEY', raising=False)
+    with pytest.raises(RuntimeError):
+        maintenance.get_intent_source()
+
+
+def test_sweep_command_refuses_to_run_without_stripe(app, monkeypatch):
+    monkeypatch.delenv('STRIPE_SECRET_KEY', raising=False)
+    result = app.test_cli_runner().invoke(args=['sweep'])
+    assert result.exit_code != 0
+    assert '--stripe-stub' in result.output
+
+
+def test_stripe_retrieve_maps_missing_intents(monkeypatch):
+    stripe = maintenance.get_stripe()
+
+    def retrieve(intent_id):
+        if intent_id == 'pi_gone':
+            raise stripe.error.InvalidRequestError('No such payment_intent', 'id', code='resource_missing')
+        if intent_id == 'pi_flaky':
+            raise stripe.error.APIConnectionError('connection reset')
+        return {'id': intent_id, 'status': 'succeeded'}
+
+    monkeypatch.setattr(stripe.PaymentIntent, 'retrieve', retrieve)
+    source = maintenance.StripeIntentSource()
+    assert source.retrieve('pi_gone') == maintenance.INTENT_MISSING
+    assert source.retrieve('pi_flaky') is None
+    assert source.retrieve('pi_ok') == 'succeeded'
+
+
+class FakeIntentList:
+    """A PaymentIntent list whose pages are counted as they are fetched"""
+
+    def __init__(self, count):
+        self.count = count
+        self.fetched = 0
+
+    def auto_paging_iter(self):
+        for number in range(self.count):
+            self.fetched += 1
+            yield {'id': f'pi_{number}', 'status': 'succeeded'}
+
+
+def test_stripe_list_keeps_only_the_batch_and_stops_early(monkeypatch):
+    intents = FakeIntentList(10000)
+    monkeypatch.setattr(maintenance.get_stripe().PaymentIntent, 'list', lambda **kwargs: intents)
+    source = maintenance.StripeIntentSource()
+    now = datetime.utcnow()
+
+    assert source.statuses(['pi_3', 'pi_7'], now, now) == {'pi_3': 'succeeded', 'pi_7': 'succeeded'}
+    assert intents.fetched == 8
+
+    intents.fetched = 0
+    monkeypatch.setattr(maintenance, 'STRIPE_LIST_MAX_INTENTS', 50)
+    assert source.statuses(['pi_3', 'pi_9999'], now, now) == {'pi_3': 'succeeded'}
+    assert intents.fetched == 50
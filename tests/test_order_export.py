@@ -0,0 +1,47 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from models import Order
+import order_archive
+from order_export import generate_export, iter_orders
+
+DAY = datetime(2024, 3, 5, 12)
+
+
+def test_export_includes_archived_orders(make_product, make_order):
+    book = make_product(name='Novel', price=12, category='Books')
+    first = make_order([book], quantity=2, created_at=datetime(2024, 3, 4, 9))
+    second = make_order([book], created_at=DAY.replace(hour=8), stripe_payment_intent_id='pi_archived')
+    third = make_order([book], created_at=DAY.replace(hour=20))
+    make_order([book], status=Order.STATUS_CANCELLED, created_at=DAY.replace(hour=21))
+    first_id, second_id, third_id = first.id, second.id, third.id
+
+    assert order_archive.archive_orders(DAY)['archived'] == 2
+
+    orders = list(iter_orders(status=Order.STATUS_COMPLETED, include_items=True))
+    assert [order['id'] for order in orders] == [first_id, second_id, third_id]
+    assert orders[0]['user_email'] == 'buyer@example.com'
+    assert orders[0]['total_amount'] == 24.0
+    assert orders[0]['items'][0]['quantity'] == 2
+    assert orders[1]['stripe_payment_intent_id'] == 'pi_archived'
+    assert orders[1]['created_at'] == DAY.replace(hour=8).isoformat()
+
+    windowed = list(iter_orders(start=datetime(2024, 3, 5), end=datetime(2024, 3, 6)))
+    assert [order['id'] for order in windowed][:2] == [second_id, third_id]
+    assert len(windowed) == 3
+    assert 'items' not in windowed[0]
+
+
+def test_export_formats_agree_on_archived_orders(make_product, make_order):
+    book = make_product(name='Novel', price=12, category='Books')
+    make_order([book], created_at=datetime(2024, 3, 4, 9))
+    make_order([book], created_at=DAY.replace(hour=20))
+    order_archive.archive_orders(DAY)
+
+    ndjson = [json.loads(line) for line in ''.join(generate_export('ndjson')).splitlines()]
+    rows = list(csv.DictReader(io.StringIO(''.join(generate_export('csv')))))
+
+    assert len(ndjson) == len(rows) == 2
+    assert [row['id'] for row in rows] == [order['id'] for order in ndjson]
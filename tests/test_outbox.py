@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import db
+from models import OutboxEvent
+import outbox
+
+
+@pytest.fixture
+def event(app, monkeypatch):
+    monkeypatch.setattr(outbox, 'OUTBOX_MAX_ATTEMPTS', 3)
+    monkeypatch.setattr(outbox, 'backoff_delay', lambda attempts: 0)
+    event = outbox.enqueue('test.event', {'n': 1})
+    db.session.commit()
+    return event.id
+
+
+def load(event_id):
+    db.session.expire_all()
+    return db.session.get(OutboxEvent, event_id)
+
+
+def expire_lease(event_id):
+    load(event_id).locked_until = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+
+def test_handler_runs_once(event, monkeypatch):
+    seen = []
+    monkeypatch.setitem(outbox._handlers, 'test.event', [seen.append])
+
+    assert outbox.run_batch() == (1, 1)
+    assert outbox.run_batch() == (0, 0)
+    assert seen == [{'n': 1}]
+    assert (load(event).status, load(event).attempts) == (OutboxEvent.STATUS_DONE, 1)
+
+
+def test_failing_handler_fails_after_max_attempts(event, monkeypatch):
+    def fail(payload):
+        raise RuntimeError('boom')
+    monkeypatch.setitem(outbox._handlers, 'test.event', [fail])
+
+    for attempt in (1, 2):
+        assert outbox.run_batch() == (1, 0)
+        assert (load(event).status, load(event).attempts) == (OutboxEvent.STATUS_PENDING, attempt)
+    assert outbox.run_batch() == (1, 0)
+
+    assert load(event).status == OutboxEvent.STATUS_FAILED
+    assert load(event).attempts == 3
+    assert load(event).last_error == 'boom'
+
+
+def test_event_that_kills_its_worker_is_given_up(event):
+    # Claimed and never finished, as when the handler takes the worker down
+    for attempt in (1, 2, 3):
+        assert outbox.claim_batch() == [event]
+        assert load(event).attempts == attempt
+        expire_lease(event)
+
+    assert outbox.claim_batch() == []
+    assert load(event).status == OutboxEvent.STATUS_FAILED
+    assert load(event).attempts == 3
+    assert 'Lease expired' in load(event).last_error
+
+
+def test_live_lease_is_not_reclaimed(event):
+    assert outbox.claim_batch() == [event]
+    assert outbox.claim_batch() == []
+    assert load(event).attempts == 1
@@ -0,0 +1,147 @@
+import hashlib
+import hmac
+import json
+import time
+
+import pytest
+
+from database import db
+from models import Order, OutboxEvent, SalesDaily
+import outbox
+import sales_rollup
+
+WEBHOOK_SECRET = 'whsec_test'
+
+
+@pytest.fixture
+def webhook(app, client):
+    app.config['STRIPE_WEBHOOK_SECRET'] = WEBHOOK_SECRET
+
+    def post(event, secret=WEBHOOK_SECRET):
+        body = json.dumps(event)
+        timestamp = int(time.time())
+        signature = hmac.new(secret.encode(), f'{timestamp}.{body}'.encode(), hashlib.sha256).hexdigest()
+        return client.post('/v1/stripe-webhook', data=body, headers={
+            'Content-Type': 'application/json',
+            'Stripe-Signature': f't={timestamp},v1={signature}'
+        })
+    return post
+
+
+def charge_refunded(payment_intent, refunded=True):
+    return {
+        'id': 'evt_test', 'object': 'event', 'type': 'charge.refunded',
+        'data': {'object': {
+            'id': 'ch_test', 'object': 'charge', 'payment_intent': payment_intent, 'refunded': refunded
+        }}
+    }
+
+
+@pytest.fixture
+def paid_order(make_product, make_order):
+    order = make_order([make_product(price=25)], quantity=2, stripe_payment_intent_id='pi_paid')
+    outbox.enqueue('order.completed', order.to_event_payload())
+    db.session.commit()
+    outbox.run_batch()
+    return order
+
+
+def refunded_events():
+    return OutboxEvent.query.filter_by(event_type='order.refunded').count()
+
+
+def test_webhook_rejects_bad_signature(paid_order, webhook):
+    response = webhook(charge_refunded('pi_paid'), secret='whsec_other')
+
+    assert response.status_code == 400
+    assert db.session.get(Order, paid_order.id).status == Order.STATUS_COMPLETED
+
+
+def test_webhook_requires_a_secret(app, webhook):
+    app.config['STRIPE_WEBHOOK_SECRET'] = None
+
+    assert webhook(charge_refunded('pi_paid')).status_code == 503
+
+
+def test_refund_reverses_the_sales_rollup(paid_order, webhook):
+    day = SalesDaily.query.one()
+    assert (day.units, day.order_count) == (2, 1)
+
+    response = webhook(charge_refunded('pi_paid'))
+
+    assert response.status_code == 200
+    assert db.session.get(Order, paid_order.id).status == Order.STATUS_REFUNDED
+    assert refunded_events() == 1
+    assert outbox.run_batch() == (1, 1)
+    db.session.expire_all()
+    day = SalesDaily.query.one()
+    assert (day.units, day.order_count, float(day.revenue)) == (0, 0, 0)
+    assert sales_rollup.rebuild() == 0
+
+
+def test_redelivered_refund_is_applied_once(paid_order, webhook):
+    webhook(charge_refunded('pi_paid'))
+    webhook(charge_refunded('pi_paid'))
+
+    assert refunded_events() == 1
+
+
+def test_partial_refund_keeps_the_order(paid_order, webhook):
+    assert webhook(charge_refunded('pi_paid', refunded=False)).status_code == 200
+
+    assert db.session.get(Order, paid_order.id).status == Order.STATUS_COMPLETED
+    assert refunded_events() == 0
+
+
+def test_refund_for_unknown_intent_is_acknowledged(app, webhook):
+    assert webhook(charge_refunded('pi_unknown')).status_code == 200
+    assert refunded_events() == 0
+
+
+@pytest.fixture
+def stripe_intents(monkeypatch):
+    """Stripe PaymentIntent create/retrieve backed by a dict of statuses"""
+    from stripe_client import get_stripe
+
+    stripe = get_stripe()
+    statuses = {}
+
+    def create(amount, **kwargs):
+        intent_id = f'pi_{len(statuses) + 1}'
+        statuses[intent_id] = 'requires_payment_method'
+        return {'id': intent_id, 'client_secret': f'{intent_id}_secret', 'amount': amount}
+
+    monkeypatch.setattr(stripe.PaymentIntent, 'create', create)
+    monkeypatch.setattr(stripe.PaymentIntent, 'retrieve', lambda intent_id: {'id': intent_id, 'status': statuses[intent_id]})
+    return statuses
+
+
+def test_confirming_twice_completes_the_order_once(client, auth_headers, make_product, stripe_intents):
+    product = make_product(price=10, stock_quantity=5)
+    client.post('/v1/cart/add', json={'product_id': product.id}, headers=auth_headers)
+    intent = client.post('/v1/create-payment-intent', headers=auth_headers).get_json()
+    stripe_intents['pi_1'] = 'succeeded'
+
+    first = client.post('/v1/confirm-payment', json={'payment_intent_id': 'pi_1'}, headers=auth_headers)
+    client.post('/v1/cart/add', json={'product_id': product.id}, headers=auth_headers)
+    second = client.post('/v1/confirm-payment', json={'payment_intent_id': 'pi_1'}, headers=auth_headers)
+
+    assert first.status_code == second.status_code == 200
+    assert second.get_json()['order'] == first.get_json()['order']
+    assert first.get_json()['order']['id'] == intent['order_id']
+    assert OutboxEvent.query.filter_by(event_type='order.completed').count() == 1
+    db.session.expire_all()
+    assert product.stock_quantity == 4
+    # The cart filled after the first confirm is left alone
+    assert len(client.get('/v1/cart', headers=auth_headers).get_json()['cart_items']) == 1
+
+
+def test_confirm_does_not_revive_a_refunded_order(client, auth_headers, make_product, make_order, stripe_intents):
+    order = make_order([make_product()], status=Order.STATUS_REFUNDED, stripe_payment_intent_id='pi_1')
+    stripe_intents['pi_1'] = 'succeeded'
+
+    response = client.post('/v1/confirm-payment', json={'payment_intent_id': 'pi_1'}, headers=auth_headers)
+
+    assert response.status_code == 409
+    assert db.session.get(Order, order.id).status == Order.STATUS_REFUNDED
+    assert OutboxEvent.query.count() == 0
@@ -0,0 +1,26 @@
+from database import db
+
+
+def test_stream_sends_retry_then_events(app, client, make_product):
+    product = make_product(stock_quantity=5)
+    last_event_id = client.get('/v1/products').get_json()['last_event_id']
+
+    product.stock_quantity = 4
+    db.session.commit()
+
+    response = client.get(f'/v1/products/stream?last_event_id={last_event_id}')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    frames = (frame.decode() for frame in response.response)
+    assert next(frames).startswith('retry:')
+    event = next(frames)
+    assert 'event: product' in event
+    assert product.id in event
+    response.close()
+
+
+def test_stream_disabled_answers_204(app, client):
+    app.config['PRODUCT_STREAM_ENABLED'] = False
+    response = client.get('/v1/products/stream')
+    assert response.status_code == 204
+    assert response.data == b''
@@ -0,0 +1,26 @@
+import pytest
+
+import query_plans
+
+
+@pytest.mark.parametrize('name', sorted(query_plans.HOT_QUERIES))
+def test_hot_query_uses_an_index(app, name):
+    plan, problems = query_plans.explain(query_plans.HOT_QUERIES[name]())
+
+    assert plan
+    assert problems == [], f'{name}:\n{plan}'
+
+
+def test_check_hot_queries_covers_every_query(app):
+    results = query_plans.check_hot_queries()
+
+    assert set(results) == set(query_plans.HOT_QUERIES)
+    assert all(not result['problems'] for result in results.values())
+
+
+def test_full_scan_is_reported(app):
+    from models import Product
+
+    _, problems = query_plans.explain(Product.query.filter_by(description='x').statement)
+
+    assert problems and problems[0].startswith('full scan')
@@ -0,0 +1,92 @@
+import pytest
+
+from database import db
+from models import Order, ProductPairCount, ProductRelated
+import outbox
+import recommendations
+
+
+def complete(order):
+    outbox.enqueue('order.completed', order.to_event_payload())
+    db.session.commit()
+    outbox.run_batch()
+
+
+def pair_counts():
+    db.session.expire_all()
+    return {(row.product_id, row.related_id): row.count for row in ProductPairCount.query}
+
+
+def related_lists():
+    db.session.expire_all()
+    return {row.product_id: row.data for row in ProductRelated.query}
+
+
+@pytest.fixture
+def products(make_product):
+    return [make_product(name=name) for name in ('Kettle', 'Teapot', 'Mug', 'Spoon')]
+
+
+def test_incremental_counts_match_a_rebuild(products, make_order):
+    kettle, teapot, mug, spoon = products
+    for basket in ([kettle, teapot], [kettle, teapot, mug], [mug, spoon], [kettle]):
+        complete(make_order(basket))
+    incremental_counts, incremental_lists = pair_counts(), related_lists()
+
+    assert recommendations.rebuild() == (4, 4)
+
+    assert pair_counts() == incremental_counts
+    assert related_lists() == incremental_lists
+    assert incremental_counts[(kettle.id, teapot.id)] == 2
+
+
+def test_related_endpoint_orders_by_count(client, products, make_order):
+    kettle, teapot, mug, _ = products
+    complete(make_order([kettle, teapot]))
+    complete(make_order([kettle, teapot, mug]))
+
+    response = client.get(f'/v1/products/{kettle.id}/related')
+
+    assert response.status_code == 200
+    related = response.get_json()['related']
+    assert [(item['id'], item['bought_together']) for item in related] == [(teapot.id, 2), (mug.id, 1)]
+
+
+def test_refund_removes_the_order_pairs(products, make_order):
+    kettle, teapot, mug, _ = products
+    complete(make_order([kettle, teapot]))
+    refunded = make_order([kettle, teapot, mug], stripe_payment_intent_id='pi_refund')
+    complete(refunded)
+
+    refunded.mark_refunded()
+    outbox.enqueue('order.refunded', refunded.to_event_payload())
+    db.session.commit()
+    outbox.run_batch()
+
+    assert pair_counts() == {(kettle.id, teapot.id): 1, (teapot.id, kettle.id): 1}
+    assert related_lists()[kettle.id] == [{'product_id': teapot.id, 'count': 1}]
+    assert mug.id not in related_lists()
+    assert db.session.get(Order, refunded.id).status == Order.STATUS_REFUNDED
+    # A rebuild skips the refunded order and lands on the same counts
+    recommendations.rebuild()
+    assert pair_counts() == {(kettle.id, teapot.id): 1, (teapot.id, kettle.id): 1}
+
+
+def test_redelivered_events_are_applied_once(products, make_order):
+    kettle, teapot, mug, _ = products
+    kept = make_order([kettle, teapot])
+    refunded = make_order([kettle, teapot, mug])
+    for order in (kept, refunded):
+        for _ in range(2):
+            outbox.enqueue('order.completed', order.to_event_payload())
+    refunded.mark_refunded()
+    for _ in range(2):
+        outbox.enqueue('order.refunded', refunded.to_event_payload())
+    db.session.commit()
+
+    assert outbox.run_batch() == (6, 6)
+    incremental_counts, incremental_lists = pair_counts(), related_lists()
+
+    assert incremental_counts == {(kettle.id, teapot.id): 1, (teapot.id, kettle.id): 1}
+    recommendations.rebuild()
+    assert (pair_counts(), related_lists()) == (incremental_counts, incremental_lists)
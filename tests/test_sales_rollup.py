@@ -0,0 +1,75 @@
+from datetime import date, datetime
+
+from database import db
+from models import ArchivedOrder, Order, SalesDaily, SalesDailyCategory
+import order_archive
+import sales_rollup
+
+DAY = datetime(2024, 3, 5, 12)
+
+
+def rollup_rows():
+    db.session.expire_all()
+    return {
+        'days': {row.day: (row.units, float(row.revenue), row.order_count) for row in SalesDaily.query},
+        'categories': {
+            (row.day, row.category): (row.units, row.order_count) for row in SalesDailyCategory.query
+        }
+    }
+
+
+def test_rebuild_includes_archived_orders(make_product, make_order):
+    book = make_product(name='Novel', price=12, category='Books')
+    pen = make_product(name='Pen', price=2, category='Office')
+    make_order([book], quantity=2, created_at=datetime(2024, 3, 4, 9))
+    make_order([book, pen], created_at=DAY.replace(hour=8))
+    make_order([pen], created_at=DAY.replace(hour=20))
+    make_order([pen], status=Order.STATUS_CANCELLED, created_at=DAY)
+
+    # Archive everything before noon, so 2024-03-05 is split across both tables
+    assert order_archive.archive_orders(DAY)['archived'] == 2
+    assert ArchivedOrder.query.count() == 2
+
+    assert sales_rollup.rebuild() == 3
+
+    rows = rollup_rows()
+    assert rows['days'] == {
+        date(2024, 3, 4): (2, 24.0, 1),
+        date(2024, 3, 5): (3, 16.0, 2),
+    }
+    assert rows['categories'][(date(2024, 3, 5), 'Office')] == (2, 2)
+    assert rows['categories'][(date(2024, 3, 5), 'Books')] == (1, 1)
+
+
+def test_rebuild_range_keeps_other_days(make_product, make_order):
+    book = make_product(name='Novel', price=12, category='Books')
+    make_order([book], created_at=datetime(2024, 3, 4, 9))
+    make_order([book], created_at=DAY)
+    order_archive.archive_orders(DAY.replace(hour=23))
+    sales_rollup.rebuild()
+
+    assert sales_rollup.rebuild(start=date(2024, 3, 5), end=date(2024, 3, 6)) == 1
+
+    assert set(rollup_rows()['days']) == {date(2024, 3, 4), date(2024, 3, 5)}
+
+
+def test_redelivered_events_are_applied_once(make_product, make_order):
+    import outbox
+
+    book = make_product(name='Novel', price=10, category='Books')
+    kept = make_order([book], created_at=DAY)
+    refunded = make_order([book], quantity=2, created_at=DAY)
+    for order in (kept, refunded):
+        for _ in range(2):
+            outbox.enqueue('order.completed', order.to_event_payload())
+    refunded.mark_refunded()
+    for _ in range(2):
+        outbox.enqueue('order.refunded', refunded.to_event_payload())
+    db.session.commit()
+
+    assert outbox.run_batch() == (6, 6)
+    incremental = rollup_rows()
+
+    assert incremental['days'] == {date(2024, 3, 5): (1, 10.0, 1)}
+    sales_rollup.rebuild()
+    assert rollup_rows() == incremental
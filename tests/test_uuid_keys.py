@@ -0,0 +1,67 @@
+import os
+
+import pytest
+from sqlalchemy import text
+
+from app import create_app
+from database import db
+from ids import UUIDKey, new_id
+import uuid_keys
+
+POSTGRES_URL = os.environ.get('TEST_POSTGRES_URL')
+
+
+def test_key_columns_match_the_models(app):
+    for table_name, (columns, key) in uuid_keys.KEY_COLUMNS.items():
+        table = db.metadata.tables[table_name]
+        assert all(isinstance(table.c[column].type, UUIDKey) for column in columns), table_name
+        assert all(column in table.c for column in key), table_name
+
+
+def test_backfill_is_a_no_op_off_postgres(app):
+    assert uuid_keys.pending_rows() == {}
+    assert uuid_keys.backfill() == {}
+
+
+@pytest.fixture
+def postgres_app():
+    """App on a scratch schema of TEST_POSTGRES_URL holding only pre-switch text keys"""
+    if not POSTGRES_URL:
+        pytest.skip('TEST_POSTGRES_URL is not set')
+    schema = f'uuid_backfill_{new_id()[-12:]}'
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': POSTGRES_URL,
+        'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'options': f'-csearch_path={schema}'}},
+    })
+    with app.app_context():
+        db.session.execute(text(f'CREATE SCHEMA {schema}'))
+        db.session.execute(text(
+            'CREATE TABLE orders (id varchar(36), user_id varchar(36), created_at timestamp, '
+            'id_uuid uuid, user_id_uuid uuid, PRIMARY KEY (id, created_at))'
+        ))
+        db.session.commit()
+        yield app
+        db.session.rollback()
+        db.session.execute(text(f'DROP SCHEMA {schema} CASCADE'))
+        db.session.commit()
+        db.session.remove()
+
+
+def test_backfill_fills_shadow_columns_in_batches(postgres_app):
+    rows = [{'id': new_id(), 'user_id': new_id()} for _ in range(7)]
+    db.session.execute(text(
+        "INSERT INTO orders (id, user_id, created_at) VALUES (:id, :user_id, now())"
+    ), rows)
+    # A row the sync trigger already covered is left alone
+    db.session.execute(text("UPDATE orders SET id_uuid = id::uuid, user_id_uuid = user_id::uuid WHERE id = :id"), rows[0])
+    db.session.commit()
+
+    assert uuid_keys.pending_rows() == {'orders': 6}
+    assert uuid_keys.backfill(batch_size=3) == {'orders': 6}
+
+    assert uuid_keys.pending_rows() == {'orders': 0}
+    mismatched = db.session.execute(text(
+        "SELECT count(*) FROM orders WHERE id_uuid::text <> id OR user_id_uuid::text <> user_id"
+    )).scalar()
+    assert mismatched == 0
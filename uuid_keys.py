@@ -0,0 +1,108 @@
+import logging
+import os
+import time
+
+from sqlalchemy import text
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+UUID_BACKFILL_BATCH_SIZE = int(os.environ.get('UUID_BACKFILL_BATCH_SIZE', 5000))
+
+# Text key columns converted to native uuid, with each table's primary key
+# used to walk it in batches. Keep in sync with the uuid_keys migrations.
+KEY_COLUMNS = {
+    'users': (['id'], ['id']),
+    'products': (['id'], ['id']),
+    'cart_items': (['id', 'user_id', 'product_id'], ['id']),
+    'orders': (['id', 'user_id'], ['id', 'created_at']),
+    'orders_archive': (['id', 'user_id'], ['id']),
+    'idempotency_keys': (['id', 'user_id'], ['id']),
+    'outbox_events': (['id'], ['id']),
+    'sales_daily_product': (['product_id'], ['day', 'product_id']),
+}
+
+
+def shadow_column(column):
+    """Name of the uuid column that replaces ``column`` during the migration"""
+    return f'{column}_uuid'
+
+
+def _shadowed_tables():
+    """Tables that still carry shadow columns, i.e. the expand step ran and contract has not"""
+    rows = db.session.execute(text(
+        "SELECT table_name, column_name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND column_name LIKE '%\\_uuid'"
+    )).all()
+    present = {(table, column) for table, column in rows}
+    return [
+        table for table, (columns, _) in KEY_COLUMNS.items()
+        if all((table, shadow_column(column)) in present for column in columns)
+    ]
+
+
+def pending_rows():
+    """Rows per table whose shadow uuid columns are not filled in yet"""
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return {}
+    pending = {}
+    for table in _shadowed_tables():
+        columns, _ = KEY_COLUMNS[table]
+        missing = ' OR '.join(f'{shadow_column(column)} IS NULL' for column in columns)
+        pending[table] = db.session.execute(text(f"SELECT count(*) FROM {table} WHERE {missing}")).scalar()
+    db.session.rollback()
+    return pending
+
+
+def backfill(batch_size=UUID_BACKFILL_BATCH_SIZE, pause=0.0):
+    """Copy text keys into their uuid shadow columns, one primary-key range per transaction.
+
+    Walks each table in primary key order so every batch is an index range
+    scan, and only touches rows whose shadow is still empty. The sync
+    trigger added by the expand migration covers rows written meanwhile.
+    Returns ``{table: rows_updated}``.
+    """
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return {}
+
+    stats = {}
+    for table in _shadowed_tables():
+        columns, key = KEY_COLUMNS[table]
+        key_list = ', '.join(key)
+        assignments = ', '.join(f'{shadow_column(column)} = {column}::uuid' for column in columns)
+        missing = ' OR '.join(f'{shadow_column(column)} IS NULL' for column in columns)
+        params = ', '.join(f':k{index}' for index in range(len(key)))
+        upper = ', '.join(f':u{index}' for index in range(len(key)))
+
+        cursor = None
+        stats[table] = 0
+        while True:
+            after = f"WHERE ({key_list}) > ({params}) " if cursor else ''
+            bounds = dict(zip((f'k{index}' for index in range(len(key))), cursor or ()))
+            last = db.session.execute(text(
+                f"SELECT {key_list} FROM {table} {after}ORDER BY {key_list} "
+                f"OFFSET :offset LIMIT 1"
+            ), {**bounds, 'offset': batch_size - 1}).first()
+
+            where = [f"({missing})"]
+            if cursor:
+                where.append(f"({key_list}) > ({params})")
+            if last is not None:
+                where.append(f"({key_list}) <= ({upper})")
+                bounds.update(zip((f'u{index}' for index in range(len(key))), last))
+            result = db.session.execute(
+                text(f"UPDATE {table} SET {assignments} WHERE {' AND '.join(where)}"),
+                bounds
+            )
+            db.session.commit()
+            stats[table] += result.rowcount
+
+            if last is None:
+                break
+            cursor = tuple(last)
+            if pause:
+                time.sleep(pause)
+
+        logger.info(f"Backfilled {stats[table]} rows of {table}")
+    return stats